@@ -0,0 +1,120 @@
+"""
+Throughput of the sync (threadpool) and async (aiosqlite) database stacks at 100/500/1000 concurrent clients.
+
+Both apps serve the card list of a seeded user through the same query helpers the API uses,
+src.db.queries.get_cards on a sync Session and src.db.async_queries.get_cards on an AsyncSession.
+
+    python -m benchmarks.async_vs_sync [requests_per_client]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from statistics import quantiles
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from fastapi import FastAPI, Depends
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from datetime import date
+
+from src.db.base import Base
+from src.db import queries, async_queries
+from src.models.user import User
+from src.models.wallet import Wallet
+from src.models.cards import Card
+from src.core.traceback import traceBack
+
+CLIENTS: tuple[int, ...] = (100, 500, 1000)
+
+def seed(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        user = User(first_name="Bench", last_name="User", email="bench@localhost.me", phone_number="+220000000",
+                    date_of_birth=date(1999, 1, 5), social_security="00000000", address="A", city="C",
+                    state="S", post_code="00-000", hashed_password="-")
+        db.add(user)
+        db.flush()
+
+        wallet = Wallet(user_id=user.id)
+        db.add(wallet)
+        db.flush()
+
+        db.add_all(Card(wallet_id=wallet.id, cardholder_name="Bench", cardholder_surname="User",
+                        number=f"{index:016d}", expiration_date="01/30", cvv="000") for index in range(5))
+        db.commit()
+
+    engine.dispose()
+
+def sync_app(path: str) -> FastAPI:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/card")
+    def cards(db: Session = Depends(get_db)):
+        user = User(id=1)
+        return [card.json() for card in queries.get_cards(user, db)]
+
+    return app
+
+def async_app(path: str) -> FastAPI:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    @app.get("/card")
+    async def cards(db: AsyncSession = Depends(get_db)):
+        user = User(id=1)
+        return [card.json() for card in await async_queries.get_cards(user, db)]
+
+    return app
+
+async def run(app: FastAPI, clients: int, requests_per_client: int) -> tuple[float, float, float]:
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            for _ in range(requests_per_client):
+                started = perf_counter()
+                response = await client.get("/card")
+                response.raise_for_status()
+                latencies.append(perf_counter() - started)
+
+        started = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = perf_counter() - started
+
+    percentiles = quantiles(latencies, n=100)
+    return len(latencies) / elapsed, percentiles[49] * 1000, percentiles[98] * 1000
+
+async def main(requests_per_client: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path)
+
+        for name, factory in (("sync ", sync_app), ("async", async_app)):
+            app = factory(path)
+            for clients in CLIENTS:
+                rps, p50, p99 = await run(app, clients, requests_per_client)
+                traceBack(f"{name} {clients:>5} clients: {rps:8.1f} req/s  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,83 @@
+"""
+Time of posting a payroll of card to card transfers: one CardsService.transfer_money_logic call and commit
+per transfer (what /card/transfer does per request) against a single CardsService.batch_transfer_logic call.
+
+    python -m benchmarks.batch_transfer [transfers]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from copy import copy
+from time import perf_counter
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.db.base import Base
+from src.db.session import build_async_engine
+from src.core.config import ENGINE_PROFILES
+from src.models.user import User
+from src.models.wallet import Wallet
+from src.models.cards import Card
+from src.schemas.cards import TransferRequest, BatchTransferRequest
+from src.services.cards import CardsService
+from src.core.traceback import traceBack
+
+PAYER_CARD: str = "4000000000000000"
+RECEIVERS: int = 200
+
+def receiver(index: int) -> str:
+    return f"5{index:015d}"
+
+def seed(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        db.add(User(id=1, first_name="Bench", last_name="Payer", email="bench@localhost.me", phone_number="+220000000",
+                    date_of_birth=date(1999, 1, 5), social_security="00000000", address="A", city="C",
+                    state="S", post_code="00-000", hashed_password="-"))
+        db.add(Wallet(id=1, user_id=1))
+        db.add(Card(wallet_id=1, cardholder_name="Bench", cardholder_surname="Payer", number=PAYER_CARD,
+                    expiration_date="01/30", cvv="000", balance=10 ** 9))
+        db.add_all(Card(wallet_id=1, cardholder_name="Bench", cardholder_surname=str(index), number=receiver(index),
+                        expiration_date="01/30", cvv="000", balance=0) for index in range(RECEIVERS))
+        db.commit()
+
+    engine.dispose()
+
+async def main(transfers: int) -> None:
+    payroll = [TransferRequest(from_card_number=PAYER_CARD, to_card_number=receiver(index % RECEIVERS), amount=10)
+               for index in range(transfers)]
+
+    for name in ("single", "batch"):
+        with tempfile.TemporaryDirectory() as directory:
+            profile = copy(ENGINE_PROFILES["wal"])
+            profile.URL = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            seed(profile.URL.removeprefix("sqlite:///"))
+
+            engine = build_async_engine(profile)
+            SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            user = User(id=1)
+
+            started = perf_counter()
+            if name == "single":
+                for transfer in payroll:
+                    async with SessionLocal() as db:
+                        await CardsService.transfer_money_logic(transfer, user, db)
+            else:
+                for offset in range(0, transfers, 1000):
+                    async with SessionLocal() as db:
+                        await CardsService.batch_transfer_logic(BatchTransferRequest(transfers=payroll[offset:offset + 1000]), user, db)
+            elapsed = perf_counter() - started
+
+            await engine.dispose()
+            traceBack(f"{name:<7} {transfers} transfers in {elapsed:6.2f} s  ({transfers / elapsed:9.1f} transfers/s)")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
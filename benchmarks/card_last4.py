@@ -0,0 +1,83 @@
+"""
+Time of GET /card/{four_digits} lookups for wallets with hundreds of cards (corporate virtual-card users):
+loading every card of the user and scanning numbers in Python (the old route) against the indexed
+(wallet_id, last4) query.
+
+    python -m benchmarks.card_last4 [cards per wallet] [lookups]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from copy import copy
+from random import Random
+from time import perf_counter
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.db.base import Base
+from src.db.session import build_async_engine
+from src.db.async_queries import get_cards, get_card_by_last4
+from src.core.config import ENGINE_PROFILES
+from src.models.user import User
+from src.models.wallet import Wallet
+from src.models.cards import Card
+from src.core.traceback import traceBack
+
+USERS: int = 20
+
+def number(user_id: int, index: int) -> str:
+    return f"4{user_id:07d}{index:08d}"
+
+def seed(path: str, cards: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        for user_id in range(1, USERS + 1):
+            db.add(User(id=user_id, first_name="Bench", last_name="Corp", email=f"bench{user_id}@localhost.me",
+                        phone_number=f"+22{user_id:07d}", date_of_birth=date(1999, 1, 5), social_security=f"{user_id:08d}",
+                        address="A", city="C", state="S", post_code="00-000", hashed_password="-"))
+            db.add(Wallet(id=user_id, user_id=user_id))
+            db.add_all(Card(wallet_id=user_id, cardholder_name="Bench", cardholder_surname=str(index), number=number(user_id, index),
+                            expiration_date="01/30", cvv="000", balance=0) for index in range(cards))
+        db.commit()
+
+    engine.dispose()
+
+async def scan(user: User, four_digits: str, db) -> Card | None:
+    cards = await get_cards(user, db)
+    return next((card for card in cards if card.number[-4:] == four_digits), None)
+
+async def main(cards: int, lookups: int) -> None:
+    random = Random(0)
+    requests = [(User(id=random.randint(1, USERS)), f"{random.randrange(cards + cards // 10):04d}") for _ in range(lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        profile = copy(ENGINE_PROFILES["wal"])
+        profile.URL = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed(profile.URL.removeprefix("sqlite:///"), cards)
+
+        engine = build_async_engine(profile)
+        SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        for name, lookup in (("scan", scan), ("indexed", get_card_by_last4)):
+            found = 0
+            started = perf_counter()
+            for user, four_digits in requests:
+                async with SessionLocal() as db:
+                    found += await lookup(user, four_digits, db) is not None
+            elapsed = perf_counter() - started
+
+            traceBack(f"{name:<8} {lookups} lookups in {elapsed:6.2f} s  ({lookups / elapsed:8.1f} lookups/s, {found} found)")
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 2000))
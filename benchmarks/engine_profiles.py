@@ -0,0 +1,149 @@
+"""
+Impact of the engine profiles (src.core.config.ENGINE_PROFILES) on the transfer and history endpoints.
+
+Every profile gets a fresh database seeded with two users and a transfer history, and the card router
+is driven by concurrent clients: transfers only, history only, then both at once.
+Reads go through the read-only pool of the profile, like in the API.
+
+    python -m benchmarks.engine_profiles [clients] [requests_per_client]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from copy import copy
+from datetime import date
+from statistics import quantiles
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncEngine
+
+from src.db.base import Base
+from src.db.session import build_engine, build_async_engine
+from src.db.dependencies import get_async_db, get_async_read_db
+from src.api.routes import cards as card_routes
+from src.api.utils.auth import create_access_token, principal_cache
+from src.core.config import ENGINE_PROFILES, EngineProfile
+from src.core.traceback import traceBack
+from src.models.user import User
+from src.models.wallet import Wallet
+from src.models.cards import Card
+from src.models.wallet_history import TransferHistory, TransactionType
+
+SENDER_CARD: str = "4000000000000001"
+RECEIVER_CARD: str = "4000000000000002"
+HISTORY_ROWS: int = 5000
+
+def seed(profile: EngineProfile) -> None:
+    engine = build_engine(profile)
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        cards = []
+        for index, number in enumerate((SENDER_CARD, RECEIVER_CARD)):
+            user = User(first_name="Bench", last_name=str(index), email=f"bench{index}@localhost.me",
+                        phone_number=f"+22000000{index}", date_of_birth=date(1999, 1, 5), social_security=f"0000000{index}",
+                        address="A", city="C", state="S", post_code="00-000", hashed_password="-")
+            db.add(user)
+            db.flush()
+
+            wallet = Wallet(user_id=user.id)
+            db.add(wallet)
+            db.flush()
+
+            cards.append(Card(wallet_id=wallet.id, cardholder_name="Bench", cardholder_surname=str(index),
+                              number=number, expiration_date="01/30", cvv="000", balance=10 ** 9))
+            db.add(cards[-1])
+            db.flush()
+
+        db.add_all(TransferHistory(transfer_type=TransactionType.TRANSFER,
+                                   from_card_id=cards[0].id, to_card_id=cards[1].id, amount=1)
+                   for _ in range(HISTORY_ROWS))
+        db.commit()
+
+    engine.dispose()
+
+def session_dependency(engine: AsyncEngine):
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    return get_db
+
+def build_app(profile: EngineProfile) -> tuple[FastAPI, list[AsyncEngine]]:
+    engine = build_async_engine(profile)
+    read_engine = build_async_engine(profile.read_only())
+
+    app = FastAPI()
+    app.include_router(card_routes.router, prefix="/card")
+    app.dependency_overrides[get_async_db] = session_dependency(engine)
+    app.dependency_overrides[get_async_read_db] = session_dependency(read_engine)
+
+    return app, [engine, read_engine]
+
+async def drive(client: httpx.AsyncClient, writers: int, readers: int, requests_per_client: int) -> dict[str, list]:
+    results: dict[str, list] = {"transfer": [], "history": [], "errors": []}
+
+    async def worker(kind: str):
+        for _ in range(requests_per_client):
+            started = perf_counter()
+            if kind == "transfer":
+                response = await client.post("/card/transfer", json={
+                    "from_card_number": SENDER_CARD, "to_card_number": RECEIVER_CARD, "amount": 1
+                })
+            else:
+                response = await client.post("/card/history", json={"card_number": SENDER_CARD})
+
+            if response.status_code != 200:
+                results["errors"].append(response.status_code)
+            else:
+                results[kind].append(perf_counter() - started)
+
+    await asyncio.gather(*([worker("transfer") for _ in range(writers)] + [worker("history") for _ in range(readers)]))
+    return results
+
+def report(profile: str, scenario: str, results: dict[str, list], elapsed: float) -> None:
+    for kind in ("transfer", "history"):
+        latencies = results[kind]
+        if len(latencies) < 2:
+            continue
+        percentiles = quantiles(latencies, n=100)
+        traceBack(f"{profile:<8} {scenario:<9} {kind:<8} {len(latencies) / elapsed:8.1f} req/s  "
+                  f"p50 {percentiles[49] * 1000:7.1f} ms  p99 {percentiles[98] * 1000:7.1f} ms  errors {len(results['errors'])}")
+
+async def main(clients: int, requests_per_client: int) -> None:
+    token = create_access_token({"sub": "bench0@localhost.me"})
+
+    for name, base in ENGINE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            profile = copy(base)
+            profile.URL = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            seed(profile)
+
+            app, engines = build_app(profile)
+            principal_cache.entries.clear()
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                                         base_url="http://bench",
+                                         cookies={"authorization": token}) as client:
+                for scenario, writers, readers in (("transfer", clients, 0),
+                                                   ("history", 0, clients),
+                                                   ("mixed", clients // 2, clients - clients // 2)):
+                    started = perf_counter()
+                    results = await drive(client, writers, readers, requests_per_client)
+                    report(name, scenario, results, perf_counter() - started)
+
+            for engine in engines:
+                await engine.dispose()
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(clients, requests_per_client))
@@ -0,0 +1,103 @@
+"""
+Memory and time of exporting the history of a card with a million transfers: the streaming CSV/NDJSON export
+(src.services.cards.history_export_chunks) against materializing ORM objects and dicts like the old /card/history did.
+Names and card numbers are resolved by the same joins in both.
+
+    python -m benchmarks.history_export [rows]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.db.base import Base
+from src.models.wallet_history import TransferHistory
+from src.db.async_queries import _history_view
+from src.services.cards import history_export_chunks
+from src.core.traceback import traceBack
+
+CARD_ID: int = 1
+OTHER_CARD_ID: int = 2
+
+def seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO cards (id, cardholder_name, cardholder_surname, number, expiration_date, cvv, balance, wallet_id) VALUES "
+            "(:card, 'Bench', '0', '4000000000000001', '01/30', '000', 0, 1), "
+            "(:other, 'Bench', '1', '4000000000000002', '01/30', '000', 0, 1)"
+        ), {"card": CARD_ID, "other": OTHER_CARD_ID})
+        connection.execute(text(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+            "INSERT INTO transfer_history (transfer_type, from_card_id, to_card_id, amount, time) "
+            "SELECT 'TRANSFER', "
+            "CASE WHEN n % 2 THEN :card ELSE :other END, "
+            "CASE WHEN n % 2 THEN :other ELSE :card END, "
+            "n % 1000, datetime('2020-01-01', '+' || n || ' seconds') FROM seq"
+        ), {"rows": rows, "card": CARD_ID, "other": OTHER_CARD_ID})
+
+    engine.dispose()
+
+async def stream(session_factory, export_format: str) -> int:
+    size = 0
+    async for chunk in history_export_chunks(CARD_ID, export_format, session_factory=session_factory):
+        size += len(chunk)
+    return size
+
+async def materialize(session_factory) -> int:
+    async with session_factory() as db:
+        records = (await db.execute(
+            _history_view()
+            .where((TransferHistory.from_card_id == CARD_ID) | (TransferHistory.to_card_id == CARD_ID))
+            .order_by(TransferHistory.time)
+        )).all()
+
+        rows = [{
+            "direction": "out" if record.from_card_id == CARD_ID else "in",
+            "from": record.from_user,
+            "from_card_number": record.from_card_number,
+            "to": record.to_user,
+            "to_card_number": record.to_card_number,
+            "transfer_type": record.transfer_type.name,
+            "amount": record.amount,
+            "time": record.time.isoformat()
+        } for record in records]
+
+    return len(rows)
+
+async def measure(name: str, job) -> None:
+    tracemalloc.start()
+    started = perf_counter()
+    result = await job
+    elapsed = perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    traceBack(f"{name:<12} {elapsed:7.2f} s  peak python memory {peak / 2 ** 20:8.1f} MiB  ({result})")
+
+async def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, rows)
+        traceBack(f"Seeded {rows} history rows")
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        await measure("csv", stream(session_factory, "csv"))
+        await measure("ndjson", stream(session_factory, "ndjson"))
+        await measure("materialize", materialize(session_factory))
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
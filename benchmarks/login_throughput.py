@@ -0,0 +1,55 @@
+"""
+Login throughput of the bcrypt process pool against worker count.
+
+Every login spends almost all of its CPU time in pwd_context.verify, so verifications per second
+of PasswordHasher is the ceiling of /auth/2fa/request throughput. The inline row is the old
+behaviour: verify called from the AnyIO threadpool of the API process.
+
+    python -m benchmarks.login_throughput [logins]
+"""
+import asyncio
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.api.utils.password import PasswordHasher, pwd_context
+from src.core.traceback import traceBack
+
+PASSWORD: str = "p455w0rd"
+
+async def inline(logins: int, hashed: str) -> float:
+    started = perf_counter()
+    await asyncio.gather(*(run_in_threadpool(pwd_context.verify, PASSWORD, hashed) for _ in range(logins)))
+    return logins / (perf_counter() - started)
+
+async def pooled(workers: int, logins: int, hashed: str) -> float:
+    hasher = PasswordHasher(workers=workers, queue_depth=logins)
+    await hasher.verify(PASSWORD, hashed)
+
+    try:
+        started = perf_counter()
+        await asyncio.gather(*(hasher.verify(PASSWORD, hashed) for _ in range(logins)))
+        return logins / (perf_counter() - started)
+    finally:
+        hasher.shutdown()
+
+async def main(logins: int) -> None:
+    hashed = pwd_context.hash(PASSWORD)
+    cores = os.cpu_count() or 1
+
+    traceBack(f"{logins} logins, {cores} cores")
+    traceBack(f"inline threadpool: {await inline(logins, hashed):8.1f} logins/s")
+
+    workers = 1
+    while True:
+        traceBack(f"pool, {workers:>2} workers: {await pooled(workers, logins, hashed):8.1f} logins/s")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,57 @@
+"""
+Time of encoding POST /card/history pages of 10k rows: FastAPI's default path (jsonable_encoder, then json.dumps
+of JSONResponse) against the precompiled TypeAdapter of ResponseEncoder.
+
+    python -m benchmarks.serialization [rows per page] [pages]
+"""
+import os
+import sys
+from json import dumps
+from time import perf_counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+
+from src.api.utils.serialization import ResponseEncoder
+from src.schemas.cards import HistoryPage
+from src.core.traceback import traceBack
+
+def page(rows: int) -> dict:
+    started = datetime(2025, 1, 1)
+    return {
+        "history": [
+            {
+                "direction": "out" if index % 3 else "in",
+                "from": "Bench Corp",
+                "from_card_number": "4000000000000001",
+                "to": "Deleted Card" if index % 7 == 0 else None,
+                "to_card_number": f"4{index:015d}",
+                "transfer_type": "TRANSFER",
+                "amount": index * 1.25,
+                "time": (started + timedelta(seconds=index)).isoformat()
+            }
+            for index in range(rows)
+        ],
+        "next_cursor": "MjAyNS0wMS0wMVQwMDowMDowMHwx"
+    }
+
+def default(content: dict) -> bytes:
+    return dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def main(rows: int, pages: int) -> None:
+    content = page(rows)
+    encoder = ResponseEncoder(HistoryPage)
+
+    for name, encode in (("default", default), ("adapter", encoder.encode)):
+        started = perf_counter()
+        for _ in range(pages):
+            size = len(encode(content))
+        elapsed = perf_counter() - started
+
+        traceBack(f"{name:<8} {pages} pages of {rows} rows in {elapsed:6.2f} s  ({elapsed / pages * 1000:8.2f} ms/page, {size / 1024:.0f} KiB)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
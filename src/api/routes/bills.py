@@ -1,19 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from src.models.user import User
-from src.schemas.bills import BillCreate, BillOut, BillPay
-from src.db.dependencies import get_db
+from src.schemas.bills import BillCreate, BillOut, BillPay, BillAutopay
+from src.db.dependencies import get_async_db, get_async_read_db
 from src.api.utils.auth import get_current_user_cookie
+from src.api.utils.idempotency import idempotency_store, idempotency_key, fingerprint
+from src.api.utils.serialization import ResponseEncoder
 from src.services.bills import BillsService
 
 router: APIRouter = APIRouter()
 
+bill_list: ResponseEncoder = ResponseEncoder(List[BillOut])
+
 @router.post(
             "/create",
             summary="Bill creation",
-            description="User must be logged into account to perform this option. Pass the BillCreate body schema to create bill in database",
+            description="User must be logged into account to perform this option. Pass the BillCreate body schema to create bill in database. Optional autopay_card_number links a card of the user which pays the bill on due date",
             response_description="Displaying the created bill",
             responses={
                 400: {"description": "Internal error accused by inprocessible data which crashed database"},
@@ -21,9 +25,9 @@ router: APIRouter = APIRouter()
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def create_bill(data: BillCreate, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def create_bill(data: BillCreate, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
     try:
-        return BillsService.create_bill(user, data, db)
+        return await BillsService.create_bill(user, data, db)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -32,7 +36,7 @@ def create_bill(data: BillCreate, user: User = Depends(get_current_user_cookie),
             summary="Bill list getter",
             description="User must be logged into account to perform this option. Returns the list of bills which user created earlier. Displays current values of each user\'s bills",
             response_description="List of Bill. Check BillOut schema",
-            response_model=List[BillOut],
+            response_model=bill_list.schema,
             responses={
                 400: {"description": "Internal error accused by inprocessible data which crashed database"},
                 406: {"description": "User for who bills will be shown has no wallet or actual bills"},
@@ -40,12 +44,26 @@ def create_bill(data: BillCreate, user: User = Depends(get_current_user_cookie),
             }
         )
       
-def get_user_bills(user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def get_user_bills(user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_read_db)):
     try:
-        return BillsService.get_user_bills(user, db)
+        return bill_list.response(await BillsService.get_user_bills(user, db))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post(
+            "/autopay",
+            summary="Bill autopay setup",
+            description="User must be logged into account to perform this option. Links a card of the user to the bill, the bill is paid from it automatically once due. Pass the BillAutopay body schema, null card_number turns autopay off. A bill the card cannot cover stays unpaid and is tried again on the next sweep",
+            response_description="Displaying the updated bill",
+            response_model=BillOut,
+            responses={
+                406: {"description": "Bill or card is not found in user wallet"},
+                401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
+            }
+        )
+async def set_bill_autopay(data: BillAutopay, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
+    return await BillsService.set_autopay(user, data.bill_id, data.card_number, db)
+
 @router.post(
             "/pay",
             summary="Paying of the bill",
@@ -55,11 +73,16 @@ def get_user_bills(user: User = Depends(get_current_user_cookie), db: Session =
                 400: {"description": "Internal error accused by inprocessible data which crashed database"},
                 406: {"description": "User for who bill will be paid has no wallet, card to pay or actual bills"},
                 403: {"description": "Forbidden wallet action. Bill is paid off or card which tried to pay with has no funds"},
+                422: {"description": "Idempotency-Key was already used for a different request"},
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def pay_bill(data: BillPay, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def pay_bill(data: BillPay, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db),
+                   key: str | None = Depends(idempotency_key)):
     try:
-        return BillsService.pay_bill(user, data.bill_id, data.card_number, db)
+        return await idempotency_store.run(key, user, fingerprint("/bills/pay", data), db,
+                                           lambda: BillsService.pay_bill(user, data.bill_id, data.card_number, db, commit=False))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,30 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.user import User
-from src.schemas.cards import TransferRequest, CardHistoryRequest, CardDelete
-from src.db.dependencies import get_db
+from src.schemas.cards import TransferRequest, BatchTransferRequest, CardIssueRequest, CardHistoryRequest, CardHistoryExportRequest, CardSummaryRequest, CardDelete, CardInfo, HistoryPage
+from src.db.dependencies import get_async_db, get_async_read_db
 from src.api.utils.auth import get_current_user_cookie
-from src.db.queries import get_cards
+from src.api.utils.idempotency import idempotency_store, idempotency_key, fingerprint
+from src.api.utils.serialization import ResponseEncoder
+from src.db.async_queries import get_card_by_last4
+from src.core.exceptions import card_last4_not_found
 from src.services.cards import CardsService
+from src.services.rollups import RollupsService
 
 router: APIRouter = APIRouter()
 
+card_list: ResponseEncoder = ResponseEncoder(list[CardInfo])
+history_page: ResponseEncoder = ResponseEncoder(HistoryPage)
+
 @router.get(
             "/{four_digits}",
             summary="Get single card by 4 last numbers",
-            description="User must be logged into account to perform this option. Provide into route of endpoint last 4 digits of card to get the card. Example: url/card/0443",
+            description="User must be logged into account to perform this option. Provide into route of endpoint last 4 digits of card to get the card. Example: url/card/0443. If several cards of the user end with the same digits, the oldest one is returned",
             response_description="Returns all card information",
             responses={
-                400: {"description": "Internal error accused by inprocessible data which crashed database"},
-                500: {"description": "Function is not properly implemented, yet"},
+                404: {"description": "User has no card ending with these digits"},
+                422: {"description": "four_digits is not 4 digits"},
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def get_card(four_digits: str, 
-             user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
-    cards = get_cards(user, db)
-    card = next((_card for _card in cards if _card.number[-4:] == four_digits), None)
+async def get_card(four_digits: str = Path(..., pattern=r"^\d{4}$"),
+                   user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_read_db)):
+    card = await get_card_by_last4(user, four_digits, db)
+    if not card:
+        raise card_last4_not_found
 
     return card.json()
 
@@ -39,13 +47,27 @@ def get_card(four_digits: str,
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def create_card(user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def create_card(user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
     try:
-        card = CardsService.create_card_logic(user, db)
+        card = await CardsService.create_card_logic(user, db)
         return card
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post(
+            "/create/batch",
+            summary="Bulk virtual card issuance",
+            description="User must be logged into account to perform this option. Issues up to 500 virtual cards at once using information about user in database. Pass CardIssueRequest body schema. Cards are issued with zero balance",
+            response_description="Returns amount of issued cards and their data",
+            responses={
+                400: {"description": "Card numbers are exhausted"},
+                406: {"description": "User for who cards will be created has no wallet"},
+                401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
+            }
+        )
+async def issue_cards(request: CardIssueRequest, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
+    return await CardsService.issue_cards_logic(request, user, db)
+
 @router.delete(
                 "/delete",
                 summary="Deleting card",
@@ -58,9 +80,9 @@ def create_card(user: User = Depends(get_current_user_cookie), db: Session = Dep
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def delete_card(card_delete: CardDelete, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def delete_card(card_delete: CardDelete, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
     try:
-        result = CardsService.delete_card_logic(user, card_delete.card_number, db)
+        result = await CardsService.delete_card_logic(user, card_delete.card_number, db)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -78,17 +100,40 @@ def delete_card(card_delete: CardDelete, user: User = Depends(get_current_user_c
                     401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
                 }
         )
-def transfer_money(transfer: TransferRequest,
-                   db: Session = Depends(get_db),
-                   user: User = Depends(get_current_user_cookie)):
-    CardsService.transfer_money_logic(transfer, user, db)
+async def transfer_money(transfer: TransferRequest,
+                         db: AsyncSession = Depends(get_async_db),
+                         user: User = Depends(get_current_user_cookie),
+                         key: str | None = Depends(idempotency_key)):
+    async def operation():
+        await CardsService.transfer_money_logic(transfer, user, db, commit=False)
+
+        return {
+            f"Transferred {transfer.amount}"
+        }
 
-    return {
-        f"Transferred {transfer.amount}"
-    }
+    return await idempotency_store.run(key, user, fingerprint("/card/transfer", transfer), db, operation)
+
+@router.post(
+                "/transfer/batch",
+                summary="Transfering money in a batch of transfers",
+                description="User must be logged into account to perform this option. Posts up to 1000 card to card transfers from user cards in one transaction. Pass BatchTransferRequest body schema. In atomic mode (default) all transfers are made or none, in best_effort mode every transfer which can be made is made. Transfers are applied in order, so money received earlier in the batch can be sent on",
+                response_description="Returns amount of posted and failed transfers and result of every transfer by its index",
+                responses={
+                    400: {"description": "Internal error accused by inprocessible data which crashed database"},
+                    403: {"description": "Atomic batch rejected, detail contains result of every transfer. Or balances kept changing during the batch"},
+                    401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
+                }
+        )
+async def batch_transfer_money(request: BatchTransferRequest,
+                               db: AsyncSession = Depends(get_async_db),
+                               user: User = Depends(get_current_user_cookie),
+                               key: str | None = Depends(idempotency_key)):
+    return await idempotency_store.run(key, user, fingerprint("/card/transfer/batch", request), db,
+                                       lambda: CardsService.batch_transfer_logic(request, user, db, commit=False))
 
 @router.get(
             "",
+            response_model=card_list.schema,
             summary="Get list of user\'s cards",
             description="User must be logged into account to perform this option. Getter for list of user cards. List contains of card data",
             response_description="Returns list of cards data",
@@ -98,24 +143,59 @@ def transfer_money(transfer: TransferRequest,
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def get_card_info(user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
-    return CardsService.get_card_info_logic(user, db)
+async def get_card_info(user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_read_db)):
+    return card_list.response(await CardsService.get_card_info_logic(user, db))
 
 @router.post(
             "/history",
+            response_model=history_page.schema,
             summary="Get transfer history",
-            description="User must be logged into account to perform this option. Getter for list of transfers performed by user with n-card. Pass CardHistoryRequest body schema",
-            response_description="Return list of transfers",
+            description="User must be logged into account to perform this option. Getter for a page of transfers performed by user with n-card, newest first. Pass CardHistoryRequest body schema. Optional filters: transfer_types, direction (in/out), date_from/date_to, amount_min/amount_max. To get the next page pass next_cursor of the previous response as cursor with the same filters",
+            response_description="Return page of transfers and next_cursor (null on the last page)",
             responses={
-                400: {"description": "Internal error accused by inprocessible data which crashed database"},
+                400: {"description": "Internal error accused by inprocessible data which crashed database, invalid cursor or unknown transfer type"},
                 406: {"description": "User for who this operation will be called has no wallet"},
                 401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
             }
         )
-def get_transfer_history(
+async def get_transfer_history(
     request: CardHistoryRequest,
     user: User = Depends(get_current_user_cookie),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    records = await CardsService.get_transfer_history_logic(request, user, db)
+    return history_page.response(records)
+
+@router.post(
+            "/history/export",
+            summary="Export full transfer history",
+            description="User must be logged into account to perform this option. Streams the whole history of n-card, oldest first, as CSV or NDJSON file. Pass CardHistoryExportRequest body schema. Optional date_from/date_to limit the period",
+            response_description="Returns text/csv or application/x-ndjson attachment",
+            responses={
+                406: {"description": "Card is not found in user wallet"},
+                401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
+            }
+        )
+async def export_transfer_history(
+    request: CardHistoryExportRequest,
+    user: User = Depends(get_current_user_cookie),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await CardsService.export_transfer_history_logic(request, user, db)
+
+@router.post(
+            "/summary",
+            summary="Monthly spending summary",
+            description="User must be logged into account to perform this option. Totals of n-card per month and transaction type, split into spent (outgoing) and received (incoming). Pass CardSummaryRequest body schema. Optional month_from/month_to (YYYY-MM) limit the period",
+            response_description="Returns list of months, newest first",
+            responses={
+                406: {"description": "Card is not found in user wallet"},
+                401: {"description": "Credential exception. User is not logged or cookie is corrupted"}
+            }
+        )
+async def get_spending_summary(
+    request: CardSummaryRequest,
+    user: User = Depends(get_current_user_cookie),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    records = CardsService.get_transfer_history_logic(request.card_number, user, db)
-    return records
\ No newline at end of file
+    return await RollupsService.summary(request, user, db)
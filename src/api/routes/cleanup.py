@@ -1,27 +1,54 @@
-from datetime import timedelta, datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.schemas.user import UserTemp as UnverifiedUser
-from src.db.dependencies import get_db
-from src.db.queries import get_expired_users
+from src.db.dependencies import get_db, get_async_db
+from src.services.credentials import CredentialService
+from src.services.user import UserService
+from src.api.utils.idempotency import IdempotencyStore
+from src.api.utils.autopay import autopay_worker
 
 router: APIRouter = APIRouter()
 
 @router.delete(
                 "/cleanup-unverified",
                 summary="Cleanup unverified users routine",
-                description="Endpoint created to cleanup users in 24h timespan. Used in routine",
+                description="Bulk removes users who did not verify email within UNVERIFIED_USER_TTL_HOURS (default 24) in chunks. The app scheduler runs it every CLEANUP_INTERVAL_SECONDS, the endpoint is kept for external routines",
                 response_description="Each time is called returns amount of users deleted"
         )
 def cleanup_unverified_users(db: Session = Depends(get_db)):
-    expiration_time = timedelta(hours=24)
-    threshold = datetime.now() - expiration_time
+    removed: int = UserService.sweep_unverified(db)
+    return {"message": f"Removed {removed} expired unverified users."}
 
-    expired_users: list[UnverifiedUser] = get_expired_users(db, threshold)
+@router.delete(
+                "/cleanup-credentials",
+                summary="Cleanup expired credentials routine",
+                description="Bulk removes expired password reset tokens and 2FA codes in chunks. Used in routine",
+                response_description="Each time is called returns amount of credentials deleted"
+        )
+def cleanup_expired_credentials(db: Session = Depends(get_db)):
+    removed: int = CredentialService.sweep_expired(db)
+    return {"message": f"Removed {removed} expired credentials."}
 
-    for user in expired_users:
-        db.delete(user)
+@router.delete(
+                "/cleanup-idempotency-keys",
+                summary="Cleanup expired idempotency keys routine",
+                description="Bulk removes stored responses of idempotent requests older than IDEMPOTENCY_TTL_SECONDS in chunks. Used in routine",
+                response_description="Each time is called returns amount of idempotency keys deleted"
+        )
+def cleanup_idempotency_keys(db: Session = Depends(get_db)):
+    removed: int = IdempotencyStore.sweep_expired(db)
+    return {"message": f"Removed {removed} expired idempotency keys."}
 
-    db.commit()
-    return {"message": f"Removed {len(expired_users)} expired unverified users."}
\ No newline at end of file
+@router.post(
+                "/autopay-bills",
+                summary="Bill autopay routine",
+                description="Pays every due unpaid bill linked to a card, in chunks of AUTOPAY_CHUNK_SIZE bills per transaction. Bills the card cannot cover stay unpaid until the next sweep. The app scheduler runs the same sweep every AUTOPAY_INTERVAL_SECONDS",
+                response_description="Each time is called returns amount of bills paid and left unpaid"
+        )
+async def autopay_bills(db: AsyncSession = Depends(get_async_db)):
+    result = await autopay_worker.run_once(db)
+    return {
+        "message": f"Paid {result['paid']} bills.",
+        **result
+    }
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from typing import Any
+
+from src.api.utils.auth import principal_cache
+from src.api.utils.password import password_hasher
+from src.api.utils.outbox import outbox_workers
+from src.api.utils.idempotency import idempotency_store
+from src.services.card_directory import card_directory_cache
+from src.api.utils.autopay import autopay_worker
+from src.api.utils.scheduler import scheduler
+from src.api.utils.mail import get_transport
+from src.db.session import async_engine, async_read_engine
+
+router: APIRouter = APIRouter()
+
+@router.get(
+            "/metrics",
+            summary="Runtime metrics",
+            description="Internal counters of in-process caches and worker pools. Used to size them under real load",
+            response_description="Returns metrics grouped by subsystem"
+        )
+def get_metrics() -> dict[str, Any]:
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_outbox": outbox_workers.stats(),
+        "card_directory": card_directory_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+        "autopay": autopay_worker.stats(),
+        "scheduler": scheduler.stats(),
+        "mail_transport": get_transport().stats(),
+        "database": {
+            "write_pool": async_engine.pool.status(),
+            "read_pool": async_read_engine.pool.status()
+        }
+    }
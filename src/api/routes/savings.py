@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.user import User
 from src.schemas.savings import Saving_Account_creation, Saving_Account_out, Saving_Account_TopUp, Saving_Account_Delete
-from src.db.dependencies import get_db
+from src.db.dependencies import get_async_db, get_async_read_db
 from src.api.utils.auth import get_current_user_cookie
+from src.api.utils.idempotency import idempotency_store, idempotency_key, fingerprint
+from src.api.utils.serialization import ResponseEncoder
 from src.services.savings import SavingsService
 from typing import List
 
 router: APIRouter = APIRouter()
+
+saving_account_list: ResponseEncoder = ResponseEncoder(List[Saving_Account_out])
+
 @router.post(
                 "/create",
                 summary="Creation of saving account",
@@ -19,9 +24,9 @@ router: APIRouter = APIRouter()
                     406: {"description": "User for who this operation will be called has no wallet"}
                 }
             )
-def create_saving_account(data: Saving_Account_creation, db: Session = Depends(get_db), user: User = Depends(get_current_user_cookie)):
+async def create_saving_account(data: Saving_Account_creation, db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user_cookie)):
     try:
-        saving_account = SavingsService.create_saving_account(user, data, db)
+        saving_account = await SavingsService.create_saving_account(user, data, db)
         return saving_account
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -29,7 +34,7 @@ def create_saving_account(data: Saving_Account_creation, db: Session = Depends(g
 
 @router.get(
                 "",
-                response_model=List[Saving_Account_out],
+                response_model=saving_account_list.schema,
                 summary="Getter for savings",
                 description="User must be logged into account to perform this option.",
                 response_description="Returns list of Saving_Account_out. Check schema",
@@ -39,9 +44,9 @@ def create_saving_account(data: Saving_Account_creation, db: Session = Depends(g
                     406: {"description": "User for who this operation will be called has no wallet or saving account"}
                 }
             )
-def get_saving_accounts(user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def get_saving_accounts(user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_read_db)):
     try:
-        return SavingsService.get_user_saving_accounts(user, db)
+        return saving_account_list.response(await SavingsService.get_user_saving_accounts(user, db))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -54,13 +59,18 @@ def get_saving_accounts(user: User = Depends(get_current_user_cookie), db: Sessi
                     400: {"description": "Internal error accused by inprocessible data which crashed database"},
                     401: {"description": "Account is not exists, user not logged into account or provided data is incorrect"},
                     403: {"description": "Forbidden wallet action. Savings are not existed or card which tried to pay with has no funds"},
-                    406: {"description": "User for who this operation will be called has no wallet or saving account"}
+                    406: {"description": "User for who this operation will be called has no wallet or saving account"},
+                    422: {"description": "Idempotency-Key was already used for a different request"}
                 }
             )
-def topUp_saving_account(data: Saving_Account_TopUp, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def topUp_saving_account(data: Saving_Account_TopUp, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db),
+                  key: str | None = Depends(idempotency_key)):
 
     try:
-        return SavingsService.add_funds(data, user, db)
+        return await idempotency_store.run(key, user, fingerprint("/savings/topUp", data), db,
+                                           lambda: SavingsService.add_funds(data, user, db, commit=False))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -73,13 +83,18 @@ def topUp_saving_account(data: Saving_Account_TopUp, user: User = Depends(get_cu
                     400: {"description": "Internal error accused by inprocessible data which crashed database"},
                     401: {"description": "Account is not exists, user not logged into account or provided data is incorrect"},
                     403: {"description": "Forbidden wallet action. Card is not exists or savings which tried to decrease of has no funds"},
-                    406: {"description": "User for who this operation will be called has no wallet or saving account"}
+                    406: {"description": "User for who this operation will be called has no wallet or saving account"},
+                    422: {"description": "Idempotency-Key was already used for a different request"}
                 }
             )
-def decrease_saving_account(data: Saving_Account_TopUp, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def decrease_saving_account(data: Saving_Account_TopUp, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db),
+                  key: str | None = Depends(idempotency_key)):
 
     try:
-        return SavingsService.take_funds(data, user, db)
+        return await idempotency_store.run(key, user, fingerprint("/savings/decrease", data), db,
+                                           lambda: SavingsService.take_funds(data, user, db, commit=False))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -95,8 +110,8 @@ def decrease_saving_account(data: Saving_Account_TopUp, user: User = Depends(get
                     406: {"description": "User for who this operation will be called has no wallet"}
                 }
             )
-def delete_saving_account(data: Saving_Account_Delete, user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
+async def delete_saving_account(data: Saving_Account_Delete, user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_db)):
     try:
-        return SavingsService.delete_saving_account_logic(user, data.saving_account_id, db)
+        return await SavingsService.delete_saving_account_logic(user, data.saving_account_id, db)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Cookie
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas.user import UserCreate, UserLogin, UserTemp, UserPasswordReset
-from src.db.dependencies import get_db
+from src.db.dependencies import get_db, get_async_read_db
 from src.services.user import UserService
 from src.models.user import User
 from src.api.utils.auth import get_current_user_cookie
@@ -29,11 +30,12 @@ def register_user(user: UserTemp, db: Session = Depends(get_db)):
                 description="Account being created with full provided information about user. Additionally to user information, verification code from email is passed. Check UserCreate schema. Pass UserCreate body schema",
                 response_description="Returns positive status of registration and cookie for first account access",
                 responses={
-                    406: {"description": "Bad verification code or this account is not needed for account"}
+                    406: {"description": "Bad verification code or this account is not needed for account"},
+                    503: {"description": "Password hashing pool is saturated. Retry later"}
                 }
             )
-def verify_email(user: UserCreate, db: Session = Depends(get_db)):
-    UserService.verify_email(user, db)
+async def verify_email(user: UserCreate, db: Session = Depends(get_db)):
+    await UserService.verify_email(user, db)
     user_data = UserLogin(email=user.email, password=user.password)
     return UserService.login(user_data.email, db)
 
@@ -43,11 +45,12 @@ def verify_email(user: UserCreate, db: Session = Depends(get_db)):
                 description="First step for login to send verification code. Pass email and password fields of UserLogin body schema",
                 response_description="Returns positive status of first step",
                 responses={
-                    401: {"description": "Account is not exists or provided data is incorrect"}
+                    401: {"description": "Account is not exists or provided data is incorrect"},
+                    503: {"description": "Password hashing pool is saturated. Retry later"}
                 }
             )
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    return UserService.twofa_request(user_data, db)
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+    return await UserService.twofa_request(user_data, db)
 
 @router.post(
                 "/2fa/confirm",
@@ -70,8 +73,8 @@ def twofa_confirm(user_data: UserLogin, db: Session = Depends(get_db)):
                     401: {"description": "Account is not exists, user not logged into account or provided data is incorrect"}
                 }
             )
-def get_user_base_data(user: User = Depends(get_current_user_cookie), db: Session = Depends(get_db)):
-    return UserService.get_user_base_data(user, db)
+async def get_user_base_data(user: User = Depends(get_current_user_cookie), db: AsyncSession = Depends(get_async_read_db)):
+    return await UserService.get_user_base_data(user, db)
 
 @router.post(
                 "/reset",
@@ -91,11 +94,12 @@ def reset_password_request(user_reset: UserTemp, db: Session = Depends(get_db)):
                 description="Confirmation of password resetting. Pass UserPasswordReset body schema",
                 response_description="Returns positive status of process",
                 responses={
-                    401: {"description": "Account is not requests password reset or token is incorrect"}
+                    401: {"description": "Account is not requests password reset or token is incorrect"},
+                    503: {"description": "Password hashing pool is saturated. Retry later"}
                 }
             )
-def reset_password_confirm(password_form: UserPasswordReset, db: Session = Depends(get_db)):
-    return UserService.reset_password_confirm(password_form, db)
+async def reset_password_confirm(password_form: UserPasswordReset, db: Session = Depends(get_db)):
+    return await UserService.reset_password_confirm(password_form, db)
 
 @router.post(
                 "/logout",
@@ -103,5 +107,5 @@ def reset_password_confirm(password_form: UserPasswordReset, db: Session = Depen
                 description="User must be logged into account to perform this option.",
                 response_description="Deleting the cookie"
             )
-def logout():
-    return UserService.logout()
\ No newline at end of file
+def logout(token: str = Cookie(None, alias="authorization")):
+    return UserService.logout(token)
\ No newline at end of file
@@ -4,17 +4,66 @@ from typing import Any
 from fastapi import Depends, Cookie, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from random import choices, shuffle
 from string import digits, ascii_uppercase
 
 from src.models.user import User
 from src.core.config import settings
 from src.core.exceptions import credentials_exception
-from src.db.dependencies import get_db
+from src.db.dependencies import get_db, get_async_read_db
 from src.db.queries import get_user_by_email
+from src.db import async_queries
+from src.core.cache import LRUCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+class PrincipalCache:
+    """
+    Caches the decoded claims of a token together with a detached snapshot of its user,
+    so authenticated requests skip jwt.decode and the users lookup while the entry is alive.
+    Entries are keyed by token signature and live no longer than the token itself.
+    The cache is per process: invalidate_token and invalidate_user (logout, password reset) evict entries of the
+    current worker only, other uvicorn workers accept the cached principal until PRINCIPAL_CACHE_TTL_SECONDS
+    runs out, which is why that TTL is kept short (10 s by default, at most 30 s).
+    """
+    def __init__(self, max_size: int, ttl: int):
+        self.entries: LRUCache = LRUCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def signature(token: str) -> str:
+        return token.rsplit(".", 1)[-1]
+
+    def get(self, token: str) -> User | None:
+        entry = self.entries.get(self.signature(token))
+        if entry is None or entry["token"] != token:
+            return None
+
+        return entry["user"]
+
+    def put(self, token: str, claims: dict[str, Any], user: User) -> None:
+        ttl = self.entries.ttl
+        expires = claims.get("exp")
+        if expires is not None:
+            ttl = min(ttl, expires - datetime.now(timezone.utc).timestamp())
+        if ttl <= 0:
+            return
+
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        self.entries.set(self.signature(token), {"token": token, "claims": claims, "user": snapshot}, ttl=ttl)
+
+    def invalidate_token(self, token: str | None) -> None:
+        if token:
+            self.entries.pop(self.signature(token))
+
+    def invalidate_user(self, email: str) -> int:
+        return self.entries.discard_where(lambda _, entry: entry["claims"].get("sub") == email)
+
+    def stats(self) -> dict[str, int | float]:
+        return self.entries.stats()
+
+principal_cache: PrincipalCache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)) -> str:
     to_encode = data.copy()
 
@@ -31,14 +80,13 @@ def create_verification_code() -> str:
     shuffle(code)
     return ''.join(code)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def decode_token(token: str | None) -> dict[str, Any]:
     if not token:
         raise credentials_exception("Not a valid token")
-    
+
     try:
         payload: dict[str, Any] = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM, options={"verify_exp": True})
-        email: str = payload.get("sub")
-        if not email:
+        if not payload.get("sub"):
             raise credentials_exception()
     
     except ExpiredSignatureError:
@@ -46,14 +94,37 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception()
 
-    user = get_user_by_email(email, db)
+    return payload
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    cached: User | None = principal_cache.get(token) if token else None
+    if cached is not None:
+        return cached
+
+    payload: dict[str, Any] = decode_token(token)
+
+    user = get_user_by_email(payload["sub"], db)
     if user is None:
         raise credentials_exception()
+
+    principal_cache.put(token, payload, user)
     
     return user
 
-def get_current_user_cookie(token: str = Cookie(None, alias="authorization"), db: Session = Depends(get_db)) -> User:
+async def get_current_user_cookie(token: str = Cookie(None, alias="authorization"), db: AsyncSession = Depends(get_async_read_db)) -> User:
+    cached: User | None = principal_cache.get(token) if token else None
+    if cached is not None:
+        return cached
+
     try:
-        return get_current_user(token, db)
+        payload: dict[str, Any] = decode_token(token)
     except HTTPException as e:
-        raise credentials_exception(e.detail)
\ No newline at end of file
+        raise credentials_exception(e.detail)
+
+    user = await async_queries.get_user_by_email(payload["sub"], db)
+    if user is None:
+        raise credentials_exception()
+
+    principal_cache.put(token, payload, user)
+
+    return user
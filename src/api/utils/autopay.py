@@ -0,0 +1,58 @@
+from time import perf_counter
+from typing import Any, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.session import AsyncSessionLocal
+from src.services.autopay import AutopayService
+from src.core.config import settings
+
+class AutopayWorker:
+    """
+    Runs bill autopay sweeps and keeps their throughput counters. Sweeps are started by the app scheduler
+    every AUTOPAY_INTERVAL_SECONDS or by the /autopay-bills routine. AutopayService claims bills, so sweeps
+    running at the same time never pay twice.
+    """
+    def __init__(self,
+                 session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+                 chunk_size: int = settings.AUTOPAY_CHUNK_SIZE):
+        self.session_factory: Callable[[], AsyncSession] = session_factory
+        self.chunk_size: int = chunk_size
+
+        self.sweeps: int = 0
+        self.paid: int = 0
+        self.amount: float = 0
+        self.insufficient_funds: int = 0
+        self.conflicts: int = 0
+        self.busy_seconds: float = 0
+        self.last_sweep_seconds: float = 0
+
+    async def run_once(self, db: AsyncSession | None = None) -> dict[str, float]:
+        started = perf_counter()
+        if db is None:
+            async with self.session_factory() as db:
+                result = await AutopayService.sweep(db, chunk_size=self.chunk_size)
+        else:
+            result = await AutopayService.sweep(db, chunk_size=self.chunk_size)
+
+        self.last_sweep_seconds = perf_counter() - started
+        self.busy_seconds += self.last_sweep_seconds
+        self.sweeps += 1
+        self.paid += result["paid"]
+        self.amount += result["amount"]
+        self.insufficient_funds += result["insufficient_funds"]
+        self.conflicts += result["conflicts"]
+
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sweeps": self.sweeps,
+            "paid": self.paid,
+            "amount": round(self.amount, 2),
+            "insufficient_funds": self.insufficient_funds,
+            "conflicts": self.conflicts,
+            "last_sweep_seconds": round(self.last_sweep_seconds, 4),
+            "bills_per_second": round(self.paid / self.busy_seconds, 2) if self.busy_seconds else 0.0
+        }
+
+autopay_worker: AutopayWorker = AutopayWorker()
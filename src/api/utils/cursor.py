@@ -0,0 +1,15 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+from json import dumps, loads
+
+from src.core.exceptions import bad_requset
+
+def encode_cursor(time: datetime, id: int) -> str:
+    return urlsafe_b64encode(dumps([time.isoformat(), id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        time, id = loads(urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(time), int(id)
+    except Exception:
+        raise bad_requset("Invalid cursor")
@@ -0,0 +1,137 @@
+import asyncio
+from hashlib import sha256
+from json import dumps, loads
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+from fastapi import Header
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.user import User
+from src.models.idempotency import IdempotencyRecord
+from src.db.async_queries import get_idempotency_record, delete_idempotency_record
+from src.db.queries import delete_expired_idempotency_records
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.core.exceptions import idempotency_key_reused
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def fingerprint(scope: str, payload: BaseModel) -> str:
+    return sha256(f"{scope}:{payload.model_dump_json()}".encode()).hexdigest()
+
+def idempotency_key(key: str | None = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)) -> str | None:
+    return key
+
+class IdempotencyStore:
+    """
+    Runs a money-moving operation at most once per (user, Idempotency-Key) and replays its stored response.
+    The operation must not commit: the store commits its changes together with the key and the response, so
+    a key is never claimed without its response. Lookups go through an in-process LRU, then the idempotency_keys
+    table. Duplicates arriving while the first request runs in this process wait for its result; a duplicate
+    racing in another process loses on the unique (user_id, key) index and is rolled back.
+    """
+    def __init__(self, max_size: int, ttl: int):
+        self.ttl: int = ttl
+        self.responses: LRUCache = LRUCache(max_size=max_size, ttl=ttl)
+        self.in_flight: dict[tuple[int, str], asyncio.Future] = {}
+        self.executed: int = 0
+        self.replayed: int = 0
+        self.coalesced: int = 0
+
+    async def run(self, key: str | None, user: User, request_fingerprint: str, db: AsyncSession,
+                  operation: Callable[[], Awaitable[Any]]) -> Any:
+        if key is None:
+            result = await operation()
+            await db.commit()
+            return result
+
+        cache_key = (user.id, key)
+        entry = self.responses.get(cache_key)
+        if entry is not None:
+            return self._replay(entry, request_fingerprint)
+
+        running = self.in_flight.get(cache_key)
+        if running is not None:
+            self.coalesced += 1
+            return self._replay(await asyncio.shield(running), request_fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[cache_key] = future
+        try:
+            entry, replayed = await self._execute(user.id, key, request_fingerprint, db, operation)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+            # waiters re-raise it, nobody else has to
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[cache_key]
+
+        self.responses.set(cache_key, entry)
+        return self._replay(entry, request_fingerprint) if replayed else entry["response"]
+
+    async def _execute(self, user_id: int, key: str, request_fingerprint: str, db: AsyncSession,
+                       operation: Callable[[], Awaitable[Any]]) -> tuple[dict, bool]:
+        record = await get_idempotency_record(user_id, key, db)
+        if record is not None and record.expires_at > utcnow():
+            return self._stored(record), True
+        if record is not None:
+            await delete_idempotency_record(user_id, key, db)
+
+        try:
+            response = jsonable_encoder(await operation())
+            # money moves, the key is claimed and the response is stored in one transaction
+            db.add(IdempotencyRecord(
+                user_id=user_id, key=key, fingerprint=request_fingerprint, response=dumps(response),
+                expires_at=utcnow() + timedelta(seconds=self.ttl)
+            ))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            record = await get_idempotency_record(user_id, key, db)
+            if record is None:
+                raise
+            return self._stored(record), True
+
+        self.executed += 1
+        return {"fingerprint": request_fingerprint, "response": response}, False
+
+    @staticmethod
+    def _stored(record: IdempotencyRecord) -> dict:
+        return {"fingerprint": record.fingerprint, "response": loads(record.response)}
+
+    def _replay(self, entry: dict, request_fingerprint: str) -> Any:
+        if entry["fingerprint"] != request_fingerprint:
+            raise idempotency_key_reused
+        self.replayed += 1
+        return entry["response"]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.responses.stats(),
+            "in_flight": len(self.in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced
+        }
+
+    @staticmethod
+    def sweep_expired(db: Session, chunk_size: int = 1000) -> int:
+        threshold = utcnow()
+        removed = 0
+
+        while True:
+            deleted = delete_expired_idempotency_records(db, threshold, chunk_size)
+            db.commit()
+            removed += deleted
+
+            if deleted < chunk_size:
+                return removed
+
+idempotency_store: IdempotencyStore = IdempotencyStore(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_TTL_SECONDS)
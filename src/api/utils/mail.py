@@ -3,58 +3,296 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.message import EmailMessage
 from pathlib import Path
+from base64 import urlsafe_b64encode
+from hashlib import sha256
 from enum import StrEnum
+from datetime import datetime, timezone
+from json import dumps, loads
+from threading import Lock
+from queue import LifoQueue, Empty
+from time import monotonic, time_ns
+from typing import Any
+from functools import lru_cache
+from jinja2 import Template
+from cryptography.fernet import Fernet
+from sqlalchemy.orm import Session
 
 from src.core.config import settings
 from src.core.traceback import traceBack, TrackType
+from src.models.outbox import EmailOutbox, OutboxStatus
 
 class EmailType(StrEnum):
     REGISTRATION = "email/code.html"
     PASSWORD_RESET = "email/reset.html"
     TWOFA = "email/2fa.html"
 
-class EmailServer:
+class MailCircuitOpenError(Exception):
+    pass
+
+class MailTransport:
+    """Delivery backend of built messages. Implementations must be safe to call from several threads."""
+    def send_message(self, msg: EmailMessage | MIMEMultipart) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+class InMemoryTransport(MailTransport):
+    """Keeps sent messages in a list. Meant for tests and local runs without a mail server."""
     def __init__(self):
-        self.connect()
+        self.messages: list[EmailMessage | MIMEMultipart] = []
+        self._lock: Lock = Lock()
+
+    def send_message(self, msg: EmailMessage | MIMEMultipart) -> None:
+        with self._lock:
+            self.messages.append(msg)
+
+    def stats(self) -> dict[str, Any]:
+        return {"sent": len(self.messages)}
+
+class FileSpoolTransport(MailTransport):
+    """Writes every message as an .eml file into the spool directory."""
+    def __init__(self, directory: str = settings.MAIL_SPOOL_DIR):
+        self.directory: Path = Path(directory)
+        self.sent: int = 0
+        self._lock: Lock = Lock()
+
+    def send_message(self, msg: EmailMessage | MIMEMultipart) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.sent += 1
+            path = self.directory / f"{time_ns()}-{self.sent}.eml"
+        path.write_bytes(msg.as_bytes())
+
+    def stats(self) -> dict[str, Any]:
+        return {"directory": str(self.directory), "sent": self.sent}
+
+class CircuitBreaker:
+    """Stops connection attempts after `threshold` consecutive failures, lets one trial through after `reset_timeout`."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold: int = threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: str = CircuitBreaker.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.trips: int = 0
+        self._lock: Lock = Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN and monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != CircuitBreaker.OPEN:
+                    self.trips += 1
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = monotonic()
+
+class SMTPConnection:
+    def __init__(self, index: int, host: str, port: int, starttls: bool, username: str | None, password: str | None):
+        self.index: int = index
+        self.host: str = host
+        self.port: int = port
+        self.starttls: bool = starttls
+        self.username: str | None = username
+        self.password: str | None = password
+        self.smtp: SMTP | None = None
+        self.created_at: float = monotonic()
+        self.last_used: float = 0.0
+
+        self.sends: int = 0
+        self.failures: int = 0
+        self.reconnects: int = 0
+        self.healthchecks: int = 0
+        self.send_seconds: float = 0.0
+        self.max_send_seconds: float = 0.0
 
     def connect(self) -> None:
-        self.smtp = SMTP("smtp.gmail.com", 587)
-        self.smtp.starttls()
-        self.smtp.login(settings.EMAIL, settings.EMAIL_PASSWORD)
-    
+        self.close()
+        self.smtp = SMTP(self.host, self.port, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if self.starttls:
+            self.smtp.starttls()
+        if self.username:
+            self.smtp.login(self.username, self.password)
+        self.reconnects += 1
+        self.last_used = monotonic()
+
     def is_connected(self) -> bool:
+        self.healthchecks += 1
         try:
             status = self.smtp.noop()[0]
             return 200 <= status <= 299
         except:
             return False
 
-    def send_message(self, msg: EmailMessage | MIMEMultipart) -> None:
-        if self.smtp is None or not self.is_connected():
-            self.connect()
+    def send(self, msg: EmailMessage | MIMEMultipart) -> None:
+        started = monotonic()
         try:
             self.smtp.send_message(msg)
-        except Exception as e:
-            traceBack(f"Resending after reconnect: {e}", type=TrackType.ERROR)
-            self.connect()
-            self.smtp.send_message(msg)
+        except Exception:
+            self.failures += 1
+            raise
+
+        elapsed = monotonic() - started
+        self.sends += 1
+        self.send_seconds += elapsed
+        self.max_send_seconds = max(self.max_send_seconds, elapsed)
+        self.last_used = monotonic()
 
-    def __del__(self):
+    def close(self) -> None:
         if self.smtp:
             try:
                 self.smtp.quit()
             except:
                 pass
-    
-email_service: EmailServer = EmailServer()
+        self.smtp = None
 
-def send_email(email: str, title: str, email_type: EmailType, **kwargs) -> None:
-    template = settings.TEMPLATES.get_template(str(email_type))
-    css = Path("src/static/styles/email.css").read_text()
+    def stats(self) -> dict[str, Any]:
+        uptime = monotonic() - self.created_at
+        return {
+            "connection": self.index,
+            "connected": self.smtp is not None,
+            "sends": self.sends,
+            "failures": self.failures,
+            "reconnects": self.reconnects,
+            "healthchecks": self.healthchecks,
+            "avg_latency_ms": round(self.send_seconds / self.sends * 1000, 2) if self.sends else 0.0,
+            "max_latency_ms": round(self.max_send_seconds * 1000, 2),
+            "sends_per_minute": round(self.sends / uptime * 60, 2) if uptime else 0.0
+        }
+
+class SMTPConnectionPool(MailTransport):
+    """
+    N authenticated SMTP connections used concurrently. A connection is health-checked with NOOP
+    only after it sat idle for `healthcheck_idle` seconds, not before every message.
+    Repeated connect/send failures open the circuit breaker and sends fail fast until it recovers.
+    """
+    def __init__(self,
+                 size: int = settings.SMTP_POOL_SIZE,
+                 host: str = settings.SMTP_HOST,
+                 port: int = settings.SMTP_PORT,
+                 starttls: bool = settings.SMTP_STARTTLS,
+                 username: str | None = settings.EMAIL,
+                 password: str | None = settings.EMAIL_PASSWORD,
+                 healthcheck_idle: float = settings.SMTP_HEALTHCHECK_IDLE_SECONDS,
+                 acquire_timeout: float = settings.SMTP_ACQUIRE_TIMEOUT_SECONDS,
+                 breaker: CircuitBreaker | None = None):
+        self.healthcheck_idle: float = healthcheck_idle
+        self.acquire_timeout: float = acquire_timeout
+        self.breaker: CircuitBreaker = breaker or CircuitBreaker(settings.SMTP_BREAKER_THRESHOLD,
+                                                                 settings.SMTP_BREAKER_RESET_SECONDS)
+        self.connections: list[SMTPConnection] = [
+            SMTPConnection(index, host, port, starttls, username, password) for index in range(size)
+        ]
+        self._idle: LifoQueue[SMTPConnection] = LifoQueue()
+        for connection in self.connections:
+            self._idle.put(connection)
+
+    def _prepare(self, connection: SMTPConnection) -> None:
+        if connection.smtp is None:
+            connection.connect()
+        elif monotonic() - connection.last_used >= self.healthcheck_idle and not connection.is_connected():
+            connection.connect()
+
+    def send_message(self, msg: EmailMessage | MIMEMultipart) -> None:
+        if not self.breaker.allow():
+            raise MailCircuitOpenError("SMTP circuit is open, mail is not sent")
+
+        try:
+            connection = self._idle.get(timeout=self.acquire_timeout)
+        except Empty:
+            raise TimeoutError("No idle SMTP connection in pool")
+
+        try:
+            try:
+                self._prepare(connection)
+                connection.send(msg)
+            except Exception as e:
+                traceBack(f"Resending after reconnect on connection {connection.index}: {e}", type=TrackType.ERROR)
+                connection.connect()
+                connection.send(msg)
+        except Exception:
+            connection.close()
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self.connections),
+            "idle": self._idle.qsize(),
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "connections": [connection.stats() for connection in self.connections]
+        }
+
+TRANSPORTS: dict[str, type[MailTransport]] = {
+    "smtp": SMTPConnectionPool,
+    "memory": InMemoryTransport,
+    "spool": FileSpoolTransport,
+}
+
+_transport: MailTransport | None = None
+_transport_lock: Lock = Lock()
+
+def get_transport() -> MailTransport:
+    """Transport chosen by settings.MAIL_TRANSPORT, created on first use. Nothing connects before the first send."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = TRANSPORTS[settings.MAIL_TRANSPORT]()
+            traceBack(f"Mail transport: {settings.MAIL_TRANSPORT}")
+        return _transport
+
+def close_transport() -> None:
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = None
+
+@lru_cache(maxsize=None)
+def _template(email_type: EmailType) -> Template:
+    return settings.TEMPLATES.get_template(str(email_type))
+
+@lru_cache(maxsize=1)
+def _inline_css() -> str:
+    return Path("src/static/styles/email.css").read_text()
+
+def build_email(email: str, title: str, email_type: EmailType, **kwargs) -> MIMEMultipart:
+    template = _template(email_type)
+    css = _inline_css()
 
     message = MIMEMultipart("alternative")
     message["Subject"] = title
-    message["From"] = settings.EMAIL
+    message["From"] = settings.EMAIL or settings.SMTP_FALLBACK_SENDER
     message["To"] = email
 
     code = kwargs.get("code")
@@ -67,7 +305,38 @@ def send_email(email: str, title: str, email_type: EmailType, **kwargs) -> None:
 
     message.attach(mime_html)
 
-    try:
-        email_service.send_message(message)
-    except Exception as e:
-        traceBack(f"Mail has not been sended: {e}", type=TrackType.ERROR)
\ No newline at end of file
+    return message
+
+@lru_cache(maxsize=1)
+def _context_cipher() -> Fernet:
+    return Fernet(urlsafe_b64encode(sha256(f"email-outbox:{settings.SECRET_KEY}".encode()).digest()))
+
+def seal_context(context: dict[str, Any]) -> str:
+    """Encrypts template context (2FA codes, reset links) before it is written to the outbox."""
+    return _context_cipher().encrypt(dumps(context).encode()).decode()
+
+def open_context(context: str | None) -> dict[str, Any]:
+    if not context:
+        return {}
+    if context.startswith("{"):
+        # queued as plain JSON before contexts were encrypted
+        return loads(context)
+    return loads(_context_cipher().decrypt(context.encode()))
+
+def queue_email(email: str, title: str, email_type: EmailType, db: Session, **kwargs) -> EmailOutbox:
+    """
+    Adds the mail to the outbox in the caller's transaction, so it is sent only if the business change commits.
+    The context is stored encrypted and cleared once the mail is sent or dropped.
+    Delivery is done by the outbox workers, call `outbox_workers.notify()` after commit to wake them up.
+    """
+    entry = EmailOutbox(
+        recipient=email,
+        subject=title,
+        email_type=email_type.name,
+        context=seal_context(kwargs),
+        status=OutboxStatus.PENDING,
+        next_attempt_at=datetime.now(timezone.utc).replace(tzinfo=None)
+    )
+
+    db.add(entry)
+    return entry
\ No newline at end of file
@@ -0,0 +1,175 @@
+from threading import Thread, Event, Lock
+from datetime import datetime, timedelta, timezone
+from random import uniform
+from typing import Callable
+from sqlalchemy import update, select, and_, or_
+from sqlalchemy.orm import Session
+
+from src.db.session import SessionLocal
+from src.models.outbox import EmailOutbox, OutboxStatus
+from src.api.utils import mail
+from src.core.config import settings
+from src.core.traceback import traceBack, TrackType
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class OutboxWorkerPool:
+    """
+    Background threads draining the email outbox. Entries are claimed with a single conditional
+    UPDATE, so several workers (and several app processes) never deliver the same entry twice.
+    A claim is a lease: entries of a crashed worker become due again after `lease_seconds`, which has to be
+    longer than the slowest send or a slow entry is claimed again and delivered twice.
+    """
+    def __init__(self,
+                 workers: int = settings.OUTBOX_WORKERS,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 sender=None,
+                 poll_interval: float = settings.OUTBOX_POLL_SECONDS,
+                 max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+                 backoff: float = settings.OUTBOX_BACKOFF_SECONDS,
+                 backoff_max: float = settings.OUTBOX_BACKOFF_MAX_SECONDS,
+                 lease_seconds: float = settings.OUTBOX_LEASE_SECONDS):
+        self.workers: int = workers
+        self.session_factory: Callable[[], Session] = session_factory
+        self._sender = sender
+        self.poll_interval: float = poll_interval
+        self.max_attempts: int = max_attempts
+        self.backoff: float = backoff
+        self.backoff_max: float = backoff_max
+        self.lease_seconds: float = lease_seconds
+
+        self._threads: list[Thread] = []
+        self._wakeup: Event = Event()
+        self._stopping: Event = Event()
+        self._lock: Lock = Lock()
+        self.sent: int = 0
+        self.retried: int = 0
+        self.failed: int = 0
+
+    @property
+    def sender(self):
+        return self._sender if self._sender is not None else mail.get_transport()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = Thread(target=self._run, name=f"outbox-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        traceBack(f"Email outbox started with {self.workers} workers")
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def drain(self) -> int:
+        processed = 0
+        while self.process_next():
+            processed += 1
+        return processed
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.process_next():
+                    continue
+            except Exception as e:
+                traceBack(f"Outbox worker error: {e}", type=TrackType.ERROR)
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim(self, db: Session):
+        now = _utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(or_(
+                and_(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.next_attempt_at <= now),
+                and_(EmailOutbox.status == OutboxStatus.SENDING, EmailOutbox.locked_until <= now)
+            ))
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        entry = db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == due)
+            .values(
+                status=OutboxStatus.SENDING,
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+                attempts=EmailOutbox.attempts + 1
+            )
+            .returning(EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject,
+                       EmailOutbox.email_type, EmailOutbox.context, EmailOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+
+        return entry
+
+    def _finish(self, db: Session, entry_id: int, **values) -> None:
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == entry_id)
+            .values(locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def process_next(self) -> bool:
+        db: Session = self.session_factory()
+        try:
+            entry = self._claim(db)
+            if entry is None:
+                return False
+
+            try:
+                message = mail.build_email(entry.recipient, entry.subject, mail.EmailType[entry.email_type],
+                                           **mail.open_context(entry.context))
+                self.sender.send_message(message)
+            except Exception as e:
+                self._fail(db, entry, e)
+                return True
+
+            self._finish(db, entry.id, status=OutboxStatus.SENT, context=None, sent_at=_utcnow(), last_error=None)
+            with self._lock:
+                self.sent += 1
+            return True
+        finally:
+            db.close()
+
+    def _fail(self, db: Session, entry, error: Exception) -> None:
+        if entry.attempts >= self.max_attempts:
+            traceBack(f"Mail to {entry.recipient} dropped after {entry.attempts} attempts: {error}", type=TrackType.ERROR)
+            self._finish(db, entry.id, status=OutboxStatus.FAILED, context=None, last_error=str(error)[:500])
+            with self._lock:
+                self.failed += 1
+            return
+
+        delay = min(self.backoff * 2 ** (entry.attempts - 1), self.backoff_max)
+        delay += uniform(0, delay / 10)
+
+        traceBack(f"Mail to {entry.recipient} failed, retry in {delay:.1f}s: {error}", type=TrackType.ERROR)
+        self._finish(db, entry.id, status=OutboxStatus.PENDING, last_error=str(error)[:500],
+                     next_attempt_at=_utcnow() + timedelta(seconds=delay))
+        with self._lock:
+            self.retried += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed
+            }
+
+outbox_workers: OutboxWorkerPool = OutboxWorkerPool()
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+from passlib.context import CryptContext
+
+from src.core.config import settings
+from src.core.exceptions import hashing_pool_saturated
+from src.core.traceback import traceBack
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so hashing never holds the GIL of the API process.
+    At most `workers + queue_depth` operations may be in flight, anything above is rejected with 503.
+    """
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers: int = workers
+        self.queue_depth: int = queue_depth
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock: Lock = Lock()
+        self._pending: int = 0
+        self.completed: int = 0
+        self.failed: int = 0
+        self.rejected: int = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+                traceBack(f"Password hashing pool started with {self.workers} workers")
+            return self._executor
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise hashing_pool_saturated
+            self._pending += 1
+
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            succeeded = True
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+
+password_hasher: PasswordHasher = PasswordHasher(settings.HASH_POOL_WORKERS, settings.HASH_POOL_QUEUE_DEPTH)
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import socket
+from uuid import uuid4
+from random import uniform
+from time import perf_counter, monotonic
+from datetime import datetime, timedelta, timezone
+from inspect import iscoroutinefunction
+from typing import Any, Callable
+from sqlalchemy.orm import Session
+
+from src.db.session import SessionLocal
+from src.db.queries import acquire_scheduler_lease, release_scheduler_lease
+from src.core.config import settings
+from src.core.traceback import traceBack, TrackType
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Job:
+    """A periodic job. Runs are spread by ±`jitter` of the interval so that jobs started together drift apart."""
+    def __init__(self, name: str, interval: float, function: Callable[[], Any], jitter: float):
+        self.name: str = name
+        self.interval: float = interval
+        self.function: Callable[[], Any] = function
+        self.jitter: float = jitter
+        # the first run waits a random part of the jitter window, not the whole interval
+        self.next_run: float = monotonic() + uniform(0, interval * jitter)
+        self.task: asyncio.Task | None = None
+
+        self.runs: int = 0
+        self.failures: int = 0
+        self.last_result: Any = None
+        self.last_error: str | None = None
+        self.last_started_at: datetime | None = None
+        self.last_duration: float = 0
+        self.total_duration: float = 0
+
+    def schedule_next(self) -> None:
+        self.next_run = monotonic() + self.interval * uniform(1 - self.jitter, 1 + self.jitter)
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration_seconds": round(self.last_duration, 4),
+            "average_duration_seconds": round(self.total_duration / self.runs, 4) if self.runs else 0.0,
+            "last_result": self.last_result,
+            "last_error": self.last_error
+        }
+
+class Scheduler:
+    """
+    Runs periodic jobs in the app event loop. Every app process runs a scheduler, but only the holder of the
+    scheduler lease (a row in scheduler_leases) starts jobs, so a job never runs in two workers at once.
+    The leader renews the lease every tick; if it dies, another worker takes over once the lease expires.
+    Sync jobs run in a thread, so a long cleanup never blocks request handling or lease renewal.
+    """
+    def __init__(self,
+                 name: str = "scheduler",
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 tick: float = settings.SCHEDULER_TICK_SECONDS,
+                 lease_seconds: float = settings.SCHEDULER_LEASE_SECONDS,
+                 jitter: float = settings.SCHEDULER_JITTER):
+        self.name: str = name
+        self.session_factory: Callable[[], Session] = session_factory
+        self.tick_seconds: float = tick
+        self.lease_seconds: float = lease_seconds
+        self.jitter: float = jitter
+        self.owner: str = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+        self.jobs: dict[str, Job] = {}
+        self.is_leader: bool = False
+        self._task: asyncio.Task | None = None
+
+    def add_job(self, name: str, interval: float, function: Callable[[], Any]) -> None:
+        if interval <= 0:
+            return
+        self.jobs[name] = Job(name, interval, function, self.jitter)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=self.name)
+        traceBack(f"Scheduler {self.owner} started with jobs {list(self.jobs)}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        running = [job.task for job in self.jobs.values() if job.running]
+        if running:
+            await asyncio.wait(running, timeout=self.lease_seconds)
+        if self.is_leader:
+            await asyncio.to_thread(self._release)
+            self.is_leader = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                traceBack(f"Scheduler tick error: {e}", type=TrackType.ERROR)
+                self.is_leader = False
+
+            await asyncio.sleep(self.tick_seconds)
+
+    async def tick(self) -> None:
+        leader = await asyncio.to_thread(self._hold_lease)
+        if leader != self.is_leader:
+            traceBack(f"Scheduler {self.owner} {'became' if leader else 'is no longer'} the leader")
+        self.is_leader = leader
+        if not leader:
+            return
+
+        now = monotonic()
+        for job in self.jobs.values():
+            if not job.running and job.next_run <= now:
+                job.task = asyncio.create_task(self._run_job(job), name=f"{self.name}-{job.name}")
+
+    async def _run_job(self, job: Job) -> None:
+        job.last_started_at = _utcnow()
+        started = perf_counter()
+        try:
+            if iscoroutinefunction(job.function):
+                job.last_result = await job.function()
+            else:
+                job.last_result = await asyncio.to_thread(job.function)
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)[:500]
+            traceBack(f"Scheduled job {job.name} failed: {e}", type=TrackType.ERROR)
+        finally:
+            job.last_duration = perf_counter() - started
+            job.total_duration += job.last_duration
+            job.runs += 1
+            job.schedule_next()
+
+    def _hold_lease(self) -> bool:
+        now = _utcnow()
+        db: Session = self.session_factory()
+        try:
+            acquired = acquire_scheduler_lease(db, self.name, self.owner, now, now + timedelta(seconds=self.lease_seconds))
+            db.commit()
+            return acquired
+        finally:
+            db.close()
+
+    def _release(self) -> None:
+        db: Session = self.session_factory()
+        try:
+            release_scheduler_lease(db, self.name, self.owner)
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "leader": self.is_leader,
+            "jobs": {name: job.stats() for name, job in self.jobs.items()}
+        }
+
+def session_job(routine: Callable[[Session], Any]) -> Callable[[], Any]:
+    """Wraps a sync routine taking a session into a job which opens its own session."""
+    def job() -> Any:
+        db: Session = SessionLocal()
+        try:
+            return routine(db)
+        finally:
+            db.close()
+
+    return job
+
+scheduler: Scheduler = Scheduler()
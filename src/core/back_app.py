@@ -1,19 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.db.session import engine
-from src.db.base import Base
+from src.db.session import engine, async_engine, async_read_engine
+from src.db.migrate import check_schema
 from src.api.routes import user as user_routes
 from src.api.routes import cleanup as jobs_routes
 from src.api.routes import cards as card_routes
 from src.api.routes import savings as savings_routes
 from src.api.routes import bills as bills_routes
+from src.api.routes import metrics as metrics_routes
+from src.api.utils.password import password_hasher
+from src.api.utils.outbox import outbox_workers
+from src.api.utils.autopay import autopay_worker
+from src.api.utils.scheduler import scheduler, session_job
+from src.api.utils.idempotency import IdempotencyStore
+from src.services.user import UserService
+from src.services.credentials import CredentialService
+from src.services.history_archive import HistoryArchiveService
+from src.api.utils.mail import close_transport
 from src.core.config import settings
 
+def register_jobs() -> None:
+    scheduler.add_job("cleanup-unverified", settings.CLEANUP_INTERVAL_SECONDS, session_job(UserService.sweep_unverified))
+    scheduler.add_job("cleanup-credentials", settings.CLEANUP_INTERVAL_SECONDS, session_job(CredentialService.sweep_expired))
+    scheduler.add_job("cleanup-idempotency-keys", settings.CLEANUP_INTERVAL_SECONDS, session_job(IdempotencyStore.sweep_expired))
+    scheduler.add_job("autopay-bills", settings.AUTOPAY_INTERVAL_SECONDS, autopay_worker.run_once)
+    scheduler.add_job("archive-history", settings.HISTORY_ARCHIVE_INTERVAL_SECONDS, session_job(HistoryArchiveService.archive))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    outbox_workers.start()
+    if settings.SCHEDULER_ENABLED:
+        register_jobs()
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    outbox_workers.stop()
+    close_transport()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
 class BackendApp(FastAPI):
     def __init__(self):
-        super().__init__()
+        super().__init__(lifespan=lifespan)
         self.__initializeRoutes(super())
         super().add_middleware(
             CORSMiddleware,
@@ -23,12 +55,13 @@ class BackendApp(FastAPI):
             allow_headers=["*"],
         )
 
-        Base.metadata.create_all(bind=engine)
+        check_schema(engine, auto_upgrade=settings.AUTO_MIGRATE)
         super().mount("/static", StaticFiles(directory="src/static"), name="static")
 
     def __initializeRoutes(self, app: FastAPI) -> None:
         app.include_router(user_routes.router, prefix="/auth", tags=["auth"])
         app.include_router(jobs_routes.router, tags=["miscallenious"])
+        app.include_router(metrics_routes.router, tags=["miscallenious"])
         app.include_router(card_routes.router, prefix="/card", tags=["card"])
         app.include_router(savings_routes.router, prefix="/savings", tags=["savings"])
         app.include_router(bills_routes.router, prefix="/bills", tags=["bills"])
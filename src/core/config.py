@@ -1,4 +1,5 @@
 import os
+from copy import copy
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI
@@ -6,6 +7,76 @@ from fastapi.templating import Jinja2Templates
 
 from src.core.traceback import traceBack, TrackType
 
+class EngineProfile:
+    """Connection settings of a database engine. Pragmas are applied to every new SQLite connection."""
+    def __init__(self,
+                 url: str = "sqlite:///./bank.db",
+                 pool_size: int = 5,
+                 max_overflow: int = 10,
+                 journal_mode: str = "WAL",
+                 synchronous: str = "NORMAL",
+                 mmap_size: int = 256 * 1024 * 1024,
+                 cache_size: int = -64000,
+                 busy_timeout: int = 5000,
+                 read_only: bool = False):
+        self.URL: str = url
+        self.POOL_SIZE: int = pool_size
+        self.MAX_OVERFLOW: int = max_overflow
+        self.JOURNAL_MODE: str = journal_mode
+        self.SYNCHRONOUS: str = synchronous
+        self.MMAP_SIZE: int = mmap_size
+        self.CACHE_SIZE: int = cache_size
+        self.BUSY_TIMEOUT: int = busy_timeout
+        self.READ_ONLY: bool = read_only
+
+    @property
+    def ASYNC_URL(self) -> str:
+        return self.URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+    def pragmas(self) -> dict[str, str | int]:
+        # journal mode is stored in the database file, only the writer may switch it
+        if self.READ_ONLY:
+            return {
+                "query_only": "ON",
+                "mmap_size": self.MMAP_SIZE,
+                "cache_size": self.CACHE_SIZE,
+                "busy_timeout": self.BUSY_TIMEOUT
+            }
+
+        return {
+            "journal_mode": self.JOURNAL_MODE,
+            "synchronous": self.SYNCHRONOUS,
+            "mmap_size": self.MMAP_SIZE,
+            "cache_size": self.CACHE_SIZE,
+            "busy_timeout": self.BUSY_TIMEOUT
+        }
+
+    def read_only(self, url: str | None = None, pool_size: int | None = None, max_overflow: int | None = None) -> "EngineProfile":
+        profile = copy(self)
+        profile.URL = url or self._read_only_url()
+        profile.POOL_SIZE = self.POOL_SIZE if pool_size is None else pool_size
+        profile.MAX_OVERFLOW = self.MAX_OVERFLOW if max_overflow is None else max_overflow
+        profile.READ_ONLY = True
+        return profile
+
+    def _read_only_url(self) -> str:
+        if not self.URL.startswith("sqlite:///") or ":memory:" in self.URL:
+            return self.URL
+
+        path = self.URL[len("sqlite:///"):]
+        if path.startswith("file:"):
+            return self.URL
+        return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+ENGINE_PROFILES: dict[str, EngineProfile] = {
+    # sqlite defaults, rollback journal with an fsync on every commit; 5 s busy timeout as pysqlite's default timeout gave
+    "legacy": EngineProfile(journal_mode="DELETE", synchronous="FULL", mmap_size=0, cache_size=-2000, busy_timeout=5000),
+    # readers never block the writer, fsync only at checkpoints
+    "wal": EngineProfile(),
+    # WAL with an fsync on every commit
+    "durable": EngineProfile(synchronous="FULL")
+}
+
 class Settings:
     def __init__(self):
         env_path: Path = Path(__file__).resolve().parents[2] / ".env" / "var.env"
@@ -16,18 +87,86 @@ class Settings:
         else:
             traceBack(".env not loaded, using os variables if exists. Check for variables if errors are raised")
 
-        self.DATABASE_URL: str = "sqlite:///./bank.db"
+        self.DB_PROFILE: str = os.getenv("DB_PROFILE", "wal")
+        self.ENGINE: EngineProfile = self._get_engine_profile()
+        self.DATABASE_URL: str = self.ENGINE.URL
+        self.ASYNC_DATABASE_URL: str = self.ENGINE.ASYNC_URL
+        self.READ_ENGINE: EngineProfile = self.ENGINE.read_only(
+            url=os.getenv("DATABASE_READ_URL"),
+            pool_size=int(os.getenv("DB_READ_POOL_SIZE", 10)),
+            max_overflow=int(os.getenv("DB_READ_MAX_OVERFLOW", 20))
+        )
         self.SECRET_KEY: str = os.getenv("SECRET_KEY", "fallback-key")
         self.ALGORITHM: str = "HS256"
         self.ACCESS_TOKEN_EXPIRE_MINUTES: int = 45
+        self.RESET_TOKEN_EXPIRE_MINUTES: int = 60
+        self.TWOFA_CODE_EXPIRE_MINUTES: int = 60
+        self.PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+        # logout and password reset evict principals in their own process only, other workers keep them until expiry
+        self.PRINCIPAL_CACHE_TTL_SECONDS: int = min(int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 10)), 30)
+        self.HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1))
+        self.HASH_POOL_QUEUE_DEPTH: int = int(os.getenv("HASH_POOL_QUEUE_DEPTH", 64))
         self.EMAIL: str = os.getenv("EMAIL")
         self.EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD")
+        self.MAIL_TRANSPORT: str = os.getenv("MAIL_TRANSPORT", "smtp")
+        self.MAIL_SPOOL_DIR: str = os.getenv("MAIL_SPOOL_DIR", "mail_spool")
+        self.SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
+        self.SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "1") not in ("0", "false", "False")
+        self.SMTP_FALLBACK_SENDER: str = "noreply@localhost"
+        self.SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 4))
+        self.SMTP_HEALTHCHECK_IDLE_SECONDS: float = float(os.getenv("SMTP_HEALTHCHECK_IDLE_SECONDS", 30))
+        self.SMTP_ACQUIRE_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_ACQUIRE_TIMEOUT_SECONDS", 10))
+        self.SMTP_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+        self.SMTP_BREAKER_THRESHOLD: int = int(os.getenv("SMTP_BREAKER_THRESHOLD", 5))
+        self.SMTP_BREAKER_RESET_SECONDS: float = float(os.getenv("SMTP_BREAKER_RESET_SECONDS", 30))
+        self.OUTBOX_WORKERS: int = int(os.getenv("OUTBOX_WORKERS", self.SMTP_POOL_SIZE))
+        self.OUTBOX_POLL_SECONDS: float = float(os.getenv("OUTBOX_POLL_SECONDS", 5))
+        self.OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 6))
+        self.OUTBOX_BACKOFF_SECONDS: float = float(os.getenv("OUTBOX_BACKOFF_SECONDS", 5))
+        self.OUTBOX_BACKOFF_MAX_SECONDS: float = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 600))
+        # a claim must outlive the slowest send: waiting for a pooled connection, a health check, connect
+        # (connect, STARTTLS, login) and send, then one reconnect and resend, each step up to SMTP_TIMEOUT_SECONDS
+        self.OUTBOX_LEASE_SECONDS: float = float(os.getenv("OUTBOX_LEASE_SECONDS",
+                                                           self.SMTP_ACQUIRE_TIMEOUT_SECONDS + 10 * self.SMTP_TIMEOUT_SECONDS))
+        self.HISTORY_EXPORT_CHUNK_SIZE: int = int(os.getenv("HISTORY_EXPORT_CHUNK_SIZE", 1000))
+        self.CARD_NUMBER_PREFIX: str = os.getenv("CARD_NUMBER_PREFIX", "400000")
+        self.CARD_DIRECTORY_CACHE_SIZE: int = int(os.getenv("CARD_DIRECTORY_CACHE_SIZE", 16384))
+        self.CARD_DIRECTORY_CACHE_TTL_SECONDS: int = int(os.getenv("CARD_DIRECTORY_CACHE_TTL_SECONDS", 300))
+        self.BATCH_TRANSFER_RETRIES: int = int(os.getenv("BATCH_TRANSFER_RETRIES", 3))
+        self.IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+        self.IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 4096))
+        self.SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "1") not in ("0", "false", "False")
+        self.SCHEDULER_TICK_SECONDS: float = float(os.getenv("SCHEDULER_TICK_SECONDS", 5))
+        self.SCHEDULER_LEASE_SECONDS: float = float(os.getenv("SCHEDULER_LEASE_SECONDS", 30))
+        self.SCHEDULER_JITTER: float = float(os.getenv("SCHEDULER_JITTER", 0.1))
+        self.CLEANUP_INTERVAL_SECONDS: float = float(os.getenv("CLEANUP_INTERVAL_SECONDS", 3600))
+        self.UNVERIFIED_USER_TTL_HOURS: int = int(os.getenv("UNVERIFIED_USER_TTL_HOURS", 24))
+        self.AUTOPAY_INTERVAL_SECONDS: float = float(os.getenv("AUTOPAY_INTERVAL_SECONDS", 300))
+        self.AUTOPAY_CHUNK_SIZE: int = int(os.getenv("AUTOPAY_CHUNK_SIZE", 500))
+        self.HISTORY_HOT_DAYS: int = int(os.getenv("HISTORY_HOT_DAYS", 365))
+        self.HISTORY_ARCHIVE_CHUNK_SIZE: int = int(os.getenv("HISTORY_ARCHIVE_CHUNK_SIZE", 1000))
+        self.HISTORY_ARCHIVE_INTERVAL_SECONDS: float = float(os.getenv("HISTORY_ARCHIVE_INTERVAL_SECONDS", 86400))
         self.IS_DEPLOYED: bool = os.getenv("DEPLOY") is not None
+        self.AUTO_MIGRATE: bool = os.getenv("AUTO_MIGRATE", os.getenv("DEBUG", "0")).lower() in ("1", "true", "yes")
         self.ORIGINS: list[str] = self._get_origins()
         traceBack(f"Loaded origins {self.ORIGINS}")
         self.APP: FastAPI = None
         self.TEMPLATES: Jinja2Templates = Jinja2Templates(directory="src/templates")
     
+    def _get_engine_profile(self) -> EngineProfile:
+        if self.DB_PROFILE not in ENGINE_PROFILES:
+            traceBack(f"Unknown DB_PROFILE {self.DB_PROFILE}, using wal", type=TrackType.ERROR)
+            self.DB_PROFILE = "wal"
+
+        profile = copy(ENGINE_PROFILES[self.DB_PROFILE])
+        profile.URL = os.getenv("DATABASE_URL", profile.URL)
+        profile.POOL_SIZE = int(os.getenv("DB_POOL_SIZE", profile.POOL_SIZE))
+        profile.MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", profile.MAX_OVERFLOW))
+        profile.BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", profile.BUSY_TIMEOUT))
+
+        return profile
+
     def _get_origins(self) -> list[str]:
         origins = []
         
@@ -33,6 +33,11 @@ card_not_found: HTTPException = HTTPException(
     detail="Card not found"
 )
 
+card_last4_not_found: HTTPException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="No card ending with these digits"
+)
+
 cannot_delete_card_with_balance: HTTPException = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail="Cannot delete card with non-zero balance"
@@ -43,14 +48,31 @@ saving_account_not_found: HTTPException = HTTPException(
     detail="Saving account not found"
 )
 
+bill_not_found: HTTPException = HTTPException(
+    status_code=status.HTTP_406_NOT_ACCEPTABLE,
+    detail="Bill not found"
+)
+
 cannot_delete_saving_account_with_balance: HTTPException = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail="Cannot delete saving account with non-zero balance"
 )
 
+hashing_pool_saturated: HTTPException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Authentication service is busy, try again later",
+    headers={"Retry-After": "1"}
+)
 
-
+idempotency_key_reused: HTTPException = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+    detail="Idempotency-Key was already used for a different request"
+)
 
 def forbidden_wallet_action(reason: str) -> HTTPException:
     return HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
-                         detail=reason)
\ No newline at end of file
+                         detail=reason)
+
+def batch_rejected(results: list[dict]) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                         detail={"reason": "Batch rejected, no transfer was made", "results": results})
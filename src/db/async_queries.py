@@ -0,0 +1,473 @@
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+from sqlalchemy import select, insert, update, delete, case, func, tuple_, Row, Select, Table
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.models.wallet import Wallet
+from src.models.wallet_history import TransferHistory, TransactionType, CounterpartyType
+from src.models.cards import Card
+from src.models.user import User
+from src.models.savings import Saving_account
+from src.models.bills import Bills
+from src.models.rollups import SpendingRollup
+from src.models.archive import HistoryArchive, history_archive_table
+from src.models.idempotency import IdempotencyRecord
+from src.models.card_directory import CardDirectory
+from src.models.card_sequence import CardNumberSequence
+
+async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
+    return await db.scalar(select(User).where(User.email == email))
+
+async def get_wallet(user: User, db: AsyncSession) -> Wallet | None:
+    return await db.scalar(select(Wallet).where(Wallet.user_id == user.id).limit(1))
+
+async def get_cards(user: User, db: AsyncSession) -> list[Card]:
+    result = await db.scalars(
+        select(Card)
+        .join(Wallet, Card.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id)
+    )
+    return list(result.all())
+
+async def get_card_by_id(user: User, card_id: int, db: AsyncSession) -> Card | None:
+    return await db.scalar(
+        select(Card)
+        .join(Wallet, Card.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id, Card.id == card_id)
+        .limit(1)
+    )
+
+async def get_card_by_last4(user: User, last4: str, db: AsyncSession) -> Card | None:
+    return await db.scalar(
+        select(Card)
+        .join(Wallet, Card.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id, Card.last4 == last4)
+        .order_by(Card.id)
+        .limit(1)
+    )
+
+async def get_card_by_number(user: User, card_number: str, db: AsyncSession) -> Card | None:
+    return await db.scalar(
+        select(Card)
+        .join(Wallet, Card.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id, Card.number == card_number)
+        .limit(1)
+    )
+
+async def reserve_card_accounts(prefix: str, count: int, db: AsyncSession) -> int:
+    """
+    Reserves `count` consecutive account numbers of `prefix` and returns the first one. The sequence of a new prefix
+    starts after the highest number already issued under it, so numbers issued before the sequence never collide.
+    """
+    reserved = await db.scalar(
+        update(CardNumberSequence)
+        .where(CardNumberSequence.prefix == prefix)
+        .values(next_account=CardNumberSequence.next_account + count)
+        .returning(CardNumberSequence.next_account)
+    )
+    if reserved is not None:
+        return reserved - count
+
+    # the highest issued number of the prefix, by a single descending seek on the number index (':' sorts right after '9')
+    highest = await db.scalar(
+        select(Card.number)
+        .where(Card.number >= prefix, Card.number < prefix + ":")
+        .order_by(Card.number.desc())
+        .limit(1)
+    )
+    start = int(highest[len(prefix):-1]) + 1 if highest and highest[len(prefix):-1].isdigit() else 0
+
+    statement = sqlite_insert(CardNumberSequence).values(prefix=prefix, next_account=start + count)
+    reserved = await db.scalar(
+        statement.on_conflict_do_update(
+            index_elements=[CardNumberSequence.prefix],
+            set_={"next_account": CardNumberSequence.next_account + count}
+        ).returning(CardNumberSequence.next_account)
+    )
+    return reserved - count
+
+async def insert_cards(rows: list[dict], db: AsyncSession) -> list[Row]:
+    """
+    Inserts cards in one statement. Python column defaults do not run for multi-row VALUES, so rows carry every
+    column incl. last4, and card directory rows must be inserted by the caller, no ORM event runs here.
+    """
+    result = await db.execute(insert(Card).values(rows).returning(Card.id, Card.number))
+    return list(result.all())
+
+async def insert_card_directory_entries(rows: list[dict], db: AsyncSession) -> None:
+    await db.execute(insert(CardDirectory).values(rows))
+
+async def get_card_directory_entries(numbers: list[str], db: AsyncSession) -> list[Row]:
+    """Card id, wallet, owner and holder name of every existing card of `numbers`, by primary key of one table."""
+    result = await db.execute(
+        select(CardDirectory.number, CardDirectory.card_id, CardDirectory.wallet_id, CardDirectory.user_id, CardDirectory.holder_name)
+        .where(CardDirectory.number.in_(numbers))
+    )
+    return list(result.all())
+
+HOT_HISTORY: Table = TransferHistory.__table__
+
+async def get_history_archives(db: AsyncSession, date_from: datetime | None = None,
+                               date_to: datetime | None = None) -> list[HistoryArchive]:
+    """Archives overlapping [date_from, date_to), newest first."""
+    conditions = []
+    if date_to is not None:
+        conditions.append(HistoryArchive.period_start < date_to)
+    if date_from is not None:
+        conditions.append(HistoryArchive.period_end > date_from)
+
+    result = await db.scalars(select(HistoryArchive).where(*conditions).order_by(HistoryArchive.period_start.desc()))
+    return list(result.all())
+
+def _history_view(history: Table = HOT_HISTORY) -> Select:
+    """
+    History rows with display names and card numbers resolved by one outer join per referenced table.
+    Labels stored in the row win over the counterparty name, they belong to sides which no longer resolve.
+    """
+    from_card = aliased(Card)
+    to_card = aliased(Card)
+    counterparty = case(
+        (history.c.counterparty_type == CounterpartyType.SAVING_ACCOUNT, "Saving Account - " + Saving_account.name),
+        (history.c.counterparty_type == CounterpartyType.BILL, "Bill - " + Bills.name)
+    )
+
+    return (
+        select(
+            history.c.id, history.c.time, history.c.transfer_type, history.c.from_card_id,
+            func.coalesce(from_card.cardholder_name + " " + from_card.cardholder_surname,
+                          history.c.from_user, counterparty).label("from_user"),
+            func.coalesce(from_card.number, history.c.from_user_card_number).label("from_card_number"),
+            func.coalesce(to_card.cardholder_name + " " + to_card.cardholder_surname,
+                          history.c.to_user, counterparty).label("to_user"),
+            func.coalesce(to_card.number, history.c.to_user_card_number).label("to_card_number"),
+            history.c.amount
+        )
+        .select_from(history)
+        .outerjoin(from_card, from_card.id == history.c.from_card_id)
+        .outerjoin(to_card, to_card.id == history.c.to_card_id)
+        .outerjoin(Saving_account, (history.c.counterparty_type == CounterpartyType.SAVING_ACCOUNT) &
+                   (Saving_account.id == history.c.counterparty_id))
+        .outerjoin(Bills, (history.c.counterparty_type == CounterpartyType.BILL) &
+                   (Bills.id == history.c.counterparty_id))
+    )
+
+async def get_transfer_history_rows(ids: list[int], db: AsyncSession, history: Table = HOT_HISTORY) -> list[Row]:
+    """Resolved history rows of the given ids, newest first, fetched in one query."""
+    result = await db.execute(
+        _history_view(history)
+        .where(history.c.id.in_(ids))
+        .order_by(history.c.time.desc(), history.c.id.desc())
+    )
+    return list(result.all())
+
+async def get_card_transfer_history_page(card: Card, db: AsyncSession, limit: int,
+                                         after: tuple[datetime, int] | None = None,
+                                         direction: str | None = None,
+                                         transfer_types: list[TransactionType] | None = None,
+                                         date_from: datetime | None = None, date_to: datetime | None = None,
+                                         amount_min: float | None = None, amount_max: float | None = None) -> list[Row]:
+    """
+    Newest first page of the card history, strictly older than the `after` = (time, id) keyset.
+    Every direction walks its own (card id, time) index with a LIMIT, so a page costs the same for any card age.
+    Archives are read newest first and only until the page is full with rows newer than them.
+    Names are resolved afterwards for the rows of the page only.
+    """
+    def conditions(history: Table) -> list:
+        result = []
+        if after is not None:
+            result.append(tuple_(history.c.time, history.c.id) < after)
+        if transfer_types:
+            result.append(history.c.transfer_type.in_(transfer_types))
+        if date_from is not None:
+            result.append(history.c.time >= date_from)
+        if date_to is not None:
+            result.append(history.c.time < date_to)
+        if amount_min is not None:
+            result.append(history.c.amount >= amount_min)
+        if amount_max is not None:
+            result.append(history.c.amount <= amount_max)
+        return result
+
+    archives = [
+        archive for archive in await get_history_archives(db, date_from, date_to)
+        if after is None or archive.period_start <= after[0]
+    ]
+    keys: list[tuple[datetime, int, Table]] = []
+
+    for history, period_end in [(HOT_HISTORY, None), *((history_archive_table(archive.table_name), archive.period_end) for archive in archives)]:
+        if period_end is not None and len(keys) == limit and keys[-1][0] >= period_end:
+            break
+
+        sides = {"out": history.c.from_card_id, "in": history.c.to_card_id}
+        for side, column in sides.items():
+            if direction is not None and side != direction:
+                continue
+            result = await db.execute(
+                select(history.c.time, history.c.id)
+                .where(column == card.id, *conditions(history))
+                .order_by(history.c.time.desc(), history.c.id.desc())
+                .limit(limit)
+            )
+            keys.extend((time, id, history) for time, id in result.all())
+
+        # both directions of a transfer to the same card meet here, ids are unique across hot and archive tables
+        keys = sorted({key[:2]: key for key in keys}.values(), key=lambda key: key[:2], reverse=True)[:limit]
+
+    tables: dict[str, tuple[Table, list[int]]] = {}
+    for _, id, history in keys:
+        tables.setdefault(history.name, (history, []))[1].append(id)
+
+    rows = []
+    for history, ids in tables.values():
+        rows.extend(await get_transfer_history_rows(ids, db, history))
+    return sorted(rows, key=lambda row: (row.time, row.id), reverse=True)
+
+async def stream_card_transfer_history(card_id: int, db: AsyncSession, chunk_size: int,
+                                       date_from: datetime | None = None, date_to: datetime | None = None) -> AsyncIterator[Sequence[Row]]:
+    """
+    Oldest first resolved rows of the card history as chunks of plain column tuples, fetched from the cursor
+    `chunk_size` rows at a time. Archives of the requested period are read first, then the hot table.
+    """
+    archives = await get_history_archives(db, date_from, date_to)
+
+    for history in [*(history_archive_table(archive.table_name) for archive in reversed(archives)), HOT_HISTORY]:
+        conditions = [(history.c.from_card_id == card_id) | (history.c.to_card_id == card_id)]
+        if date_from is not None:
+            conditions.append(history.c.time >= date_from)
+        if date_to is not None:
+            conditions.append(history.c.time < date_to)
+
+        result = await db.stream(
+            _history_view(history)
+            .where(*conditions)
+            .order_by(history.c.time, history.c.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+async def detach_card_history(card: Card, db: AsyncSession) -> None:
+    """Stores the name and number of a card being deleted into its history rows, which stop referencing it."""
+    name = f"{card.cardholder_name} {card.cardholder_surname}"
+    for history in [HOT_HISTORY, *(history_archive_table(archive.table_name) for archive in await get_history_archives(db))]:
+        for column, values in (
+            (history.c.from_card_id, {"from_card_id": None, "from_user_card_number": card.number, "from_user": name}),
+            (history.c.to_card_id, {"to_card_id": None, "to_user_card_number": card.number, "to_user": name})
+        ):
+            await db.execute(update(history).where(column == card.id).values(**values))
+
+async def detach_saving_account_history(saving_account: Saving_account, db: AsyncSession) -> None:
+    """Stores the label of a saving account being deleted into the counterparty side of its history rows."""
+    label = f"Saving Account - {saving_account.name}"
+    for history in [HOT_HISTORY, *(history_archive_table(archive.table_name) for archive in await get_history_archives(db))]:
+        withdraw = history.c.transfer_type == TransactionType.SAVINGS_WITHDRAW
+        await db.execute(
+            update(history)
+            .where(history.c.counterparty_type == CounterpartyType.SAVING_ACCOUNT,
+                   history.c.counterparty_id == saving_account.id)
+            .values(
+                counterparty_id=None,
+                from_user=case((withdraw, label), else_=history.c.from_user),
+                to_user=case((withdraw, history.c.to_user), else_=label)
+            )
+        )
+
+async def get_saving_accounts(user: User, db: AsyncSession) -> list[Saving_account]:
+    result = await db.scalars(
+        select(Saving_account)
+        .join(Wallet, Saving_account.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id)
+    )
+    return list(result.all())
+
+async def get_saving_account_by_id(user: User, account_id: int, db: AsyncSession) -> Saving_account | None:
+    return await db.scalar(
+        select(Saving_account)
+        .join(Wallet, Saving_account.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id, Saving_account.id == account_id)
+        .limit(1)
+    )
+
+async def get_bill_by_id(user: User, bill_id: int, db: AsyncSession) -> Bills | None:
+    return await db.scalar(
+        select(Bills)
+        .join(Wallet, Bills.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id, Bills.id == bill_id)
+        .limit(1)
+    )
+
+async def get_bills(user: User, db: AsyncSession) -> list[Bills]:
+    result = await db.scalars(
+        select(Bills)
+        .join(Wallet, Bills.wallet_id == Wallet.id)
+        .where(Wallet.user_id == user.id)
+    )
+    return list(result.all())
+
+def _user_wallets(user: User):
+    return select(Wallet.id).where(Wallet.user_id == user.id)
+
+def _card_filter(number: str | None, card_id: int | None, owner: User | None):
+    # both given: the id must still belong to the number, card ids of deleted cards may be reused
+    condition = Card.number == number if number is not None else Card.id == card_id
+    if number is not None and card_id is not None:
+        condition &= Card.id == card_id
+    if owner is not None:
+        condition &= Card.wallet_id.in_(_user_wallets(owner))
+    return condition
+
+async def debit_card(amount: float, db: AsyncSession, number: str | None = None, card_id: int | None = None,
+                     owner: User | None = None) -> Row | None:
+    """Takes `amount` from the card only if it has enough funds. Returns the card row with its new balance."""
+    return (await db.execute(
+        update(Card)
+        .where(_card_filter(number, card_id, owner), Card.balance >= amount)
+        .values(balance=Card.balance - amount)
+        .returning(Card.id, Card.number, Card.cardholder_name, Card.cardholder_surname, Card.balance)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def credit_card(amount: float, db: AsyncSession, number: str | None = None, card_id: int | None = None,
+                      owner: User | None = None) -> Row | None:
+    return (await db.execute(
+        update(Card)
+        .where(_card_filter(number, card_id, owner))
+        .values(balance=Card.balance + amount)
+        .returning(Card.id, Card.number, Card.cardholder_name, Card.cardholder_surname, Card.balance)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def get_cards_by_numbers(numbers: list[str], db: AsyncSession) -> list[Row]:
+    """Id, number, balance and owner of every existing card of `numbers`, in one query."""
+    result = await db.execute(
+        select(Card.id, Card.number, Card.balance, Wallet.user_id)
+        .join(Wallet, Card.wallet_id == Wallet.id)
+        .where(Card.number.in_(numbers))
+    )
+    return list(result.all())
+
+async def apply_card_deltas(deltas: dict[int, float], db: AsyncSession) -> set[int]:
+    """
+    Adds `deltas` (card id -> amount, negative for debits) to the balances in one statement. A card is changed
+    only if its balance stays non-negative. Returns ids of the changed cards.
+    """
+    delta = case(deltas, value=Card.id)
+    result = await db.execute(
+        update(Card)
+        .where(Card.id.in_(deltas), Card.balance + delta >= 0)
+        .values(balance=Card.balance + delta)
+        .returning(Card.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars().all())
+
+async def insert_transfer_history(rows: list[dict], db: AsyncSession) -> None:
+    await db.execute(insert(TransferHistory).values(rows))
+
+async def debit_saving_account(user: User, account_id: int, amount: float, db: AsyncSession) -> Row | None:
+    return (await db.execute(
+        update(Saving_account)
+        .where(Saving_account.id == account_id, Saving_account.wallet_id.in_(_user_wallets(user)),
+               Saving_account.balance >= amount)
+        .values(balance=Saving_account.balance - amount)
+        .returning(Saving_account.id, Saving_account.name, Saving_account.balance)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def credit_saving_account(user: User, account_id: int, amount: float, db: AsyncSession) -> Row | None:
+    return (await db.execute(
+        update(Saving_account)
+        .where(Saving_account.id == account_id, Saving_account.wallet_id.in_(_user_wallets(user)))
+        .values(balance=Saving_account.balance + amount)
+        .returning(Saving_account.id, Saving_account.name, Saving_account.balance)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def mark_bill_paid(user: User, bill_id: int, db: AsyncSession) -> Row | None:
+    """Flips an unpaid bill of the user to paid. Returns None if the bill is missing or already paid."""
+    return (await db.execute(
+        update(Bills)
+        .where(Bills.id == bill_id, Bills.wallet_id.in_(_user_wallets(user)), Bills.paid == False)
+        .values(paid=True)
+        .returning(Bills.id, Bills.name, Bills.amount)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def set_bill_autopay(user: User, bill_id: int, card_id: int | None, db: AsyncSession) -> Row | None:
+    return (await db.execute(
+        update(Bills)
+        .where(Bills.id == bill_id, Bills.wallet_id.in_(_user_wallets(user)))
+        .values(autopay_card_id=card_id)
+        .returning(Bills.id, Bills.name, Bills.amount, Bills.due_date, Bills.paid, Bills.autopay_card_id)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+async def detach_card_autopay(card_id: int, db: AsyncSession) -> None:
+    await db.execute(
+        update(Bills)
+        .where(Bills.autopay_card_id == card_id)
+        .values(autopay_card_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_due_autopay_bills(now: datetime, db: AsyncSession, limit: int,
+                                after: tuple[datetime, int] | None = None) -> list[Row]:
+    """Unpaid autopay bills due by `now` in (due_date, id) order, the next `limit` after the `after` key."""
+    conditions = [Bills.paid == False, Bills.due_date <= now, Bills.autopay_card_id.is_not(None)]
+    if after is not None:
+        conditions.append(tuple_(Bills.due_date, Bills.id) > after)
+
+    result = await db.execute(
+        select(Bills.id, Bills.amount, Bills.due_date, Bills.autopay_card_id)
+        .where(*conditions)
+        .order_by(Bills.due_date, Bills.id)
+        .limit(limit)
+    )
+    return list(result.all())
+
+async def get_card_balances(card_ids: list[int], db: AsyncSession) -> dict[int, float]:
+    result = await db.execute(select(Card.id, Card.balance).where(Card.id.in_(card_ids)))
+    return dict(result.all())
+
+async def claim_bills(bill_ids: list[int], db: AsyncSession) -> list[Row]:
+    """Flips the still unpaid bills of `bill_ids` to paid in one statement. Returns the flipped ones."""
+    result = await db.execute(
+        update(Bills)
+        .where(Bills.id.in_(bill_ids), Bills.paid == False, Bills.autopay_card_id.is_not(None))
+        .values(paid=True)
+        .returning(Bills.id, Bills.amount, Bills.autopay_card_id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.all())
+
+async def add_to_rollups(rows: list[dict], db: AsyncSession) -> None:
+    statement = sqlite_insert(SpendingRollup).values(rows)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[SpendingRollup.card_id, SpendingRollup.month, SpendingRollup.transfer_type, SpendingRollup.direction],
+        set_={"total": SpendingRollup.total + statement.excluded.total, "count": SpendingRollup.count + statement.excluded.count}
+    ))
+
+async def get_rollups(card_id: int, db: AsyncSession, month_from: str | None = None, month_to: str | None = None) -> list[SpendingRollup]:
+    conditions = [SpendingRollup.card_id == card_id]
+    if month_from is not None:
+        conditions.append(SpendingRollup.month >= month_from)
+    if month_to is not None:
+        conditions.append(SpendingRollup.month <= month_to)
+
+    result = await db.scalars(select(SpendingRollup).where(*conditions).order_by(SpendingRollup.month.desc()))
+    return list(result.all())
+
+async def delete_rollups(card_id: int, db: AsyncSession) -> None:
+    await db.execute(delete(SpendingRollup).where(SpendingRollup.card_id == card_id))
+
+async def get_idempotency_record(user_id: int, key: str, db: AsyncSession) -> IdempotencyRecord | None:
+    return await db.scalar(
+        select(IdempotencyRecord)
+        .where(IdempotencyRecord.user_id == user_id, IdempotencyRecord.key == key)
+        .limit(1)
+    )
+
+async def delete_idempotency_record(user_id: int, key: str, db: AsyncSession) -> None:
+    await db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.user_id == user_id, IdempotencyRecord.key == key))
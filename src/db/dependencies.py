@@ -1,11 +1,20 @@
-from typing import Generator, Any
+from typing import Generator, AsyncGenerator, Any
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.session import SessionLocal
+from src.db.session import SessionLocal, AsyncSessionLocal, AsyncReadSessionLocal
 
 def get_db() -> Generator[Any | Session, Any, None]:
     db: Session = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,114 @@
+"""
+Schema migration runner. Run once at deploy time, before the app starts:
+
+    python -m src.db.migrate upgrade [--target VERSION]
+    python -m src.db.migrate status
+
+Maintenance which rewrites whole tables is kept here as well, away from the API:
+
+    python -m src.db.migrate rebuild-rollups
+    python -m src.db.migrate archive-history
+"""
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from sqlalchemy import Engine, MetaData, Table, Column, Integer, String, DateTime, select, func, insert
+
+from src.db.migrations import Migration, load_migrations
+from src.core.traceback import traceBack, TrackType
+
+schema_version: Table = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+def current_version(engine: Engine) -> int:
+    schema_version.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        return connection.scalar(select(func.coalesce(func.max(schema_version.c.version), 0)))
+
+def pending_migrations(engine: Engine, target: int | None = None) -> list[Migration]:
+    version = current_version(engine)
+    return [
+        migration for migration in load_migrations()
+        if migration.version > version and (target is None or migration.version <= target)
+    ]
+
+def upgrade(engine: Engine, target: int | None = None) -> list[int]:
+    applied = []
+
+    for migration in pending_migrations(engine, target):
+        traceBack(f"Applying migration {migration.version:04d}: {migration.description}")
+        with engine.connect() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_version).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            ))
+            connection.commit()
+        applied.append(migration.version)
+
+    return applied
+
+def check_schema(engine: Engine, auto_upgrade: bool = False) -> None:
+    pending = pending_migrations(engine)
+    if not pending:
+        return
+
+    if auto_upgrade:
+        upgrade(engine)
+        return
+
+    raise SchemaOutdatedError(
+        f"Database schema is {len(pending)} migration(s) behind, run `python -m src.db.migrate upgrade`"
+    )
+
+def main(argv: list[str] | None = None) -> int:
+    from src.db.session import engine
+
+    parser = ArgumentParser(prog="python -m src.db.migrate", description="Database schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    commands.add_parser("status", help="show current version and pending migrations")
+    commands.add_parser("rebuild-rollups", help="recompute spending rollups from the whole transfer history")
+    commands.add_parser("archive-history", help="move transfer history older than HISTORY_HOT_DAYS into archive tables")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, args.target)
+        traceBack(f"Applied {len(applied)} migration(s), schema version {current_version(engine)}")
+        return 0
+
+    if args.command == "rebuild-rollups":
+        from sqlalchemy.orm import Session
+        from src.services.rollups import RollupsService
+
+        with Session(engine) as db:
+            last_id = RollupsService.rebuild(db)
+        traceBack(f"Rebuilt rollups up to history record {last_id}")
+        return 0
+
+    if args.command == "archive-history":
+        from sqlalchemy.orm import Session
+        from src.services.history_archive import HistoryArchiveService
+
+        with Session(engine) as db:
+            moved = HistoryArchiveService.archive(db)
+        traceBack(f"Archived {moved} history records")
+        return 0
+
+    traceBack(f"Schema version {current_version(engine)}")
+    pending = pending_migrations(engine)
+    for migration in pending:
+        traceBack(f"Pending {migration.version:04d}: {migration.description}", type=TrackType.ERROR)
+    return 1 if pending else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
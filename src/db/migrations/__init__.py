@@ -0,0 +1,55 @@
+"""
+Versioned schema migrations. Every module in src.db.migrations.versions defines VERSION, DESCRIPTION
+and upgrade(connection). Scripts are frozen: they describe the schema of their time, never import it from src.models.
+"""
+from importlib import import_module
+from pkgutil import iter_modules
+from typing import Callable
+from sqlalchemy import Connection, text
+
+from src.db.migrations import versions
+
+class Migration:
+    def __init__(self, version: int, description: str, upgrade: Callable[[Connection], None]):
+        self.version: int = version
+        self.description: str = description
+        self.upgrade: Callable[[Connection], None] = upgrade
+
+def load_migrations() -> list[Migration]:
+    migrations = []
+    for module_info in iter_modules(versions.__path__):
+        module = import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(module.VERSION, module.DESCRIPTION, module.upgrade))
+
+    migrations.sort(key=lambda migration: migration.version)
+    if [migration.version for migration in migrations] != list(range(1, len(migrations) + 1)):
+        raise RuntimeError("Migration versions must be unique and continuous starting from 1")
+
+    return migrations
+
+def create_index(connection: Connection, name: str, table: str, columns: list[str], unique: bool = False) -> None:
+    """
+    Builds one index in its own short transaction, so writers wait for a single index build
+    instead of the whole migration. Readers are never blocked under WAL.
+    """
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+    connection.commit()
+
+def backfill(connection: Connection, table: str, assignments: str, condition: str, chunk_size: int = 1000, **params) -> int:
+    """
+    Runs `UPDATE table SET assignments WHERE condition` in chunks of `chunk_size` rows, committing after each chunk.
+    `condition` must stop matching rows once they are updated, or the loop never ends.
+    """
+    updated = 0
+    while True:
+        result = connection.execute(text(
+            f"UPDATE {table} SET {assignments} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {condition} LIMIT :chunk_size)"
+        ), {"chunk_size": chunk_size, **params})
+        connection.commit()
+
+        updated += result.rowcount
+        if result.rowcount < chunk_size:
+            return updated
@@ -0,0 +1,122 @@
+from sqlalchemy import (Connection, MetaData, Table, Column, Integer, String, Text, Float, Boolean, Date, DateTime,
+                        TIMESTAMP, ForeignKey, Index, text, Enum as SQLEnum)
+
+# enum members as they were when this migration was written
+TRANSACTION_TYPES: tuple[str, ...] = ("TRANSFER", "INCOME", "PURCHASE", "BILL", "SAVINGS_TOPUP", "SAVINGS_WITHDRAW")
+CREDENTIAL_PURPOSES: tuple[str, ...] = ("PASSWORD_RESET", "TWOFA")
+OUTBOX_STATUSES: tuple[str, ...] = ("PENDING", "SENDING", "SENT", "FAILED")
+
+VERSION: int = 1
+DESCRIPTION: str = "Initial schema"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("first_name", String, nullable=False),
+    Column("last_name", String, nullable=False),
+    Column("email", String, unique=True, nullable=False, index=True),
+    Column("phone_number", String, unique=True, nullable=False, index=True),
+    Column("date_of_birth", Date, nullable=False),
+    Column("social_security", String, unique=True, nullable=False),
+    Column("address", String, nullable=False),
+    Column("city", String, nullable=False),
+    Column("state", String, nullable=False),
+    Column("post_code", String, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+)
+
+Table(
+    "unverified_users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, nullable=False, index=True),
+    Column("phone_number", String, unique=True, nullable=False, index=True),
+    Column("social_security", String, unique=True, nullable=False),
+    Column("code", String, nullable=False),
+    Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+)
+
+Table(
+    "wallets", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"))
+)
+
+Table(
+    "cards", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("cardholder_name", String, nullable=False),
+    Column("cardholder_surname", String, nullable=False),
+    Column("number", String, nullable=False),
+    Column("expiration_date", String, nullable=False),
+    Column("cvv", String, nullable=False),
+    Column("balance", Float),
+    Column("wallet_id", Integer, ForeignKey("wallets.id"), nullable=False)
+)
+
+Table(
+    "saving_accounts", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("balance", Float),
+    Column("goal", Float),
+    Column("wallet_id", Integer, ForeignKey("wallets.id"), nullable=False)
+)
+
+Table(
+    "bills", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String),
+    Column("amount", Float, nullable=False),
+    Column("due_date", DateTime, nullable=False),
+    Column("paid", Boolean),
+    Column("wallet_id", Integer, ForeignKey("wallets.id"), nullable=False)
+)
+
+Table(
+    "transfer_history", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("transfer_type", SQLEnum(*TRANSACTION_TYPES, name="transactiontype")),
+    Column("from_user_card_number", String),
+    Column("from_user", String),
+    Column("to_user_card_number", String),
+    Column("to_user", String),
+    Column("amount", Float),
+    Column("time", DateTime)
+)
+
+Table(
+    "credential_tokens", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("purpose", SQLEnum(*CREDENTIAL_PURPOSES, name="credentialpurpose"), nullable=False),
+    Column("token_hash", String(64), nullable=False),
+    Column("expires_at", DateTime, nullable=False, index=True),
+    Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP")),
+    Index("ix_credential_tokens_lookup", "purpose", "token_hash"),
+    Index("ix_credential_tokens_owner", "user_id", "purpose")
+)
+
+Table(
+    "email_outbox", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("recipient", String, nullable=False),
+    Column("subject", String, nullable=False),
+    Column("email_type", String, nullable=False),
+    Column("context", Text, nullable=True),
+    Column("status", SQLEnum(*OUTBOX_STATUSES, name="outboxstatus"), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime, nullable=False),
+    Column("locked_until", DateTime, nullable=True),
+    Column("last_error", String, nullable=True),
+    Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP")),
+    Column("sent_at", DateTime, nullable=True),
+    Index("ix_email_outbox_due", "status", "next_attempt_at")
+)
+
+def upgrade(connection: Connection) -> None:
+    # databases created before migrations existed already have (some of) these tables
+    metadata.create_all(bind=connection, checkfirst=True)
+    connection.commit()
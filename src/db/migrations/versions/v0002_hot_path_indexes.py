@@ -0,0 +1,16 @@
+from sqlalchemy import Connection
+
+from src.db.migrations import create_index
+
+VERSION: int = 2
+DESCRIPTION: str = "Indexes for card, wallet and history lookups"
+
+def upgrade(connection: Connection) -> None:
+    create_index(connection, "ix_cards_number", "cards", ["number"], unique=True)
+    create_index(connection, "ix_cards_wallet_id", "cards", ["wallet_id"])
+    create_index(connection, "ix_wallets_user_id", "wallets", ["user_id"])
+    create_index(connection, "ix_bills_wallet_id", "bills", ["wallet_id"])
+    create_index(connection, "ix_saving_accounts_wallet_id", "saving_accounts", ["wallet_id"])
+    create_index(connection, "ix_unverified_users_created_at", "unverified_users", ["created_at"])
+    create_index(connection, "ix_transfer_history_from_card_time", "transfer_history", ["from_user_card_number", "time"])
+    create_index(connection, "ix_transfer_history_to_card_time", "transfer_history", ["to_user_card_number", "time"])
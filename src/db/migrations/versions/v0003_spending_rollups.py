@@ -0,0 +1,37 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String, Float, text, Enum as SQLEnum
+
+# TransactionType members as they were when this migration was written
+TRANSACTION_TYPES: tuple[str, ...] = ("TRANSFER", "INCOME", "PURCHASE", "BILL", "SAVINGS_TOPUP", "SAVINGS_WITHDRAW")
+
+VERSION: int = 3
+DESCRIPTION: str = "Monthly spending rollups per card, transaction type and direction"
+
+CHUNK_SIZE: int = 10000
+
+metadata = MetaData()
+
+Table(
+    "spending_rollups", metadata,
+    Column("card_number", String, primary_key=True),
+    Column("month", String(7), primary_key=True),
+    Column("transfer_type", SQLEnum(*TRANSACTION_TYPES, name="transactiontype"), primary_key=True),
+    Column("direction", String(3), primary_key=True),
+    Column("total", Float, nullable=False),
+    Column("count", Integer, nullable=False)
+)
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(bind=connection, checkfirst=True)
+    connection.commit()
+
+    last_id = connection.scalar(text("SELECT coalesce(max(id), 0) FROM transfer_history"))
+    for start in range(0, last_id, CHUNK_SIZE):
+        for direction, column in (("out", "from_user_card_number"), ("in", "to_user_card_number")):
+            connection.execute(text(
+                f"INSERT INTO spending_rollups (card_number, month, transfer_type, direction, total, count) "
+                f"SELECT {column}, strftime('%Y-%m', time), transfer_type, '{direction}', sum(amount), count(*) "
+                f"FROM transfer_history WHERE id > :start AND id <= :end AND {column} IS NOT NULL "
+                f"GROUP BY {column}, strftime('%Y-%m', time), transfer_type "
+                f"ON CONFLICT DO UPDATE SET total = total + excluded.total, count = count + excluded.count"
+            ), {"start": start, "end": start + CHUNK_SIZE})
+        connection.commit()
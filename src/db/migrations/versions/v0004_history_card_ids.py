@@ -0,0 +1,109 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String, Float, ForeignKey, inspect, text, Enum as SQLEnum
+
+from src.db.migrations import create_index
+
+# TransactionType members as they were when this migration was written
+TRANSACTION_TYPES: tuple[str, ...] = ("TRANSFER", "INCOME", "PURCHASE", "BILL", "SAVINGS_TOPUP", "SAVINGS_WITHDRAW")
+
+VERSION: int = 4
+DESCRIPTION: str = "Card ids and typed counterparty in the transfer history, rollups keyed by card id"
+
+CHUNK_SIZE: int = 10000
+
+COLUMNS: dict[str, str] = {
+    "from_card_id": "INTEGER REFERENCES cards (id)",
+    "to_card_id": "INTEGER REFERENCES cards (id)",
+    "counterparty_type": "VARCHAR(14)",
+    "counterparty_id": "INTEGER"
+}
+
+# (transfer type, history side holding the counterparty label, label prefix, counterparty type, table, card side)
+COUNTERPARTIES: list[tuple[str, str, str, str, str, str]] = [
+    ("SAVINGS_TOPUP", "to_user", "Saving Account - ", "SAVING_ACCOUNT", "saving_accounts", "from_card_id"),
+    ("SAVINGS_WITHDRAW", "from_user", "Saving Account - ", "SAVING_ACCOUNT", "saving_accounts", "to_card_id"),
+    ("BILL", "to_user", "Bill - ", "BILL", "bills", "from_card_id")
+]
+
+metadata = MetaData()
+
+# only the key is needed to reference cards, the table itself is never created here
+Table("cards", metadata, Column("id", Integer, primary_key=True))
+
+spending_rollups = Table(
+    "spending_rollups", metadata,
+    Column("card_id", Integer, ForeignKey("cards.id"), primary_key=True),
+    Column("month", String(7), primary_key=True),
+    Column("transfer_type", SQLEnum(*TRANSACTION_TYPES, name="transactiontype"), primary_key=True),
+    Column("direction", String(3), primary_key=True),
+    Column("total", Float, nullable=False),
+    Column("count", Integer, nullable=False)
+)
+
+def resolve_chunk(connection: Connection, start: int, end: int) -> None:
+    """Fills the ids of one id range and clears the labels which the ids now resolve."""
+    bounds = {"start": start, "end": end}
+    chunk = "id > :start AND id <= :end"
+
+    for side in ("from", "to"):
+        connection.execute(text(
+            f"UPDATE transfer_history SET {side}_card_id = "
+            f"(SELECT cards.id FROM cards WHERE cards.number = transfer_history.{side}_user_card_number) "
+            f"WHERE {chunk} AND {side}_card_id IS NULL AND {side}_user_card_number IS NOT NULL"
+        ), bounds)
+
+    for transfer_type, label, prefix, counterparty_type, table, card_side in COUNTERPARTIES:
+        # names are unique only within a wallet, and not even there: ambiguous labels stay unresolved
+        connection.execute(text(
+            f"UPDATE transfer_history SET counterparty_type = :counterparty_type, counterparty_id = ("
+            f"SELECT min({table}.id) FROM {table} JOIN cards ON cards.wallet_id = {table}.wallet_id "
+            f"WHERE cards.id = transfer_history.{card_side} AND {table}.name = substr(transfer_history.{label}, :offset) "
+            f"HAVING count(*) = 1) "
+            f"WHERE {chunk} AND transfer_type = :transfer_type AND counterparty_type IS NULL AND {label} LIKE :pattern"
+        ), {**bounds, "counterparty_type": counterparty_type, "transfer_type": transfer_type,
+            "offset": len(prefix) + 1, "pattern": f"{prefix}%"})
+
+        connection.execute(text(
+            f"UPDATE transfer_history SET {label} = NULL "
+            f"WHERE {chunk} AND transfer_type = :transfer_type AND counterparty_id IS NOT NULL"
+        ), {**bounds, "transfer_type": transfer_type})
+
+    for side in ("from", "to"):
+        connection.execute(text(
+            f"UPDATE transfer_history SET {side}_user_card_number = NULL, {side}_user = NULL "
+            f"WHERE {chunk} AND {side}_card_id IS NOT NULL"
+        ), bounds)
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("transfer_history")}
+    for name, definition in COLUMNS.items():
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE transfer_history ADD COLUMN {name} {definition}"))
+    connection.commit()
+
+    # every chunk is its own short transaction, the app keeps writing between them
+    last_id = connection.scalar(text("SELECT coalesce(max(id), 0) FROM transfer_history"))
+    for start in range(0, last_id, CHUNK_SIZE):
+        resolve_chunk(connection, start, start + CHUNK_SIZE)
+        connection.commit()
+
+    create_index(connection, "ix_transfer_history_from_card_id_time", "transfer_history", ["from_card_id", "time"])
+    create_index(connection, "ix_transfer_history_to_card_id_time", "transfer_history", ["to_card_id", "time"])
+    create_index(connection, "ix_transfer_history_counterparty", "transfer_history", ["counterparty_type", "counterparty_id"])
+    connection.execute(text("DROP INDEX IF EXISTS ix_transfer_history_from_card_time"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_transfer_history_to_card_time"))
+    connection.commit()
+
+    connection.execute(text("DROP TABLE IF EXISTS spending_rollups"))
+    spending_rollups.create(bind=connection)
+    connection.commit()
+
+    for start in range(0, last_id, CHUNK_SIZE):
+        for direction, column in (("out", "from_card_id"), ("in", "to_card_id")):
+            connection.execute(text(
+                f"INSERT INTO spending_rollups (card_id, month, transfer_type, direction, total, count) "
+                f"SELECT {column}, strftime('%Y-%m', time), transfer_type, '{direction}', sum(amount), count(*) "
+                f"FROM transfer_history WHERE id > :start AND id <= :end AND {column} IS NOT NULL "
+                f"GROUP BY {column}, strftime('%Y-%m', time), transfer_type "
+                f"ON CONFLICT DO UPDATE SET total = total + excluded.total, count = count + excluded.count"
+            ), {"start": start, "end": start + CHUNK_SIZE})
+        connection.commit()
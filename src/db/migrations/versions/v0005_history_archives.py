@@ -0,0 +1,24 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String, DateTime
+
+from src.db.migrations import create_index
+
+VERSION: int = 5
+DESCRIPTION: str = "Registry of transfer history archives, history time index"
+
+metadata = MetaData()
+
+Table(
+    "history_archives", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("table_name", String, unique=True, nullable=False),
+    Column("period_start", DateTime, nullable=False, index=True),
+    Column("period_end", DateTime, nullable=False),
+    Column("rows", Integer, nullable=False),
+    Column("last_id", Integer, nullable=False)
+)
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(bind=connection, checkfirst=True)
+    connection.commit()
+
+    create_index(connection, "ix_transfer_history_time", "transfer_history", ["time"])
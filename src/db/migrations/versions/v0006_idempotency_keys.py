@@ -0,0 +1,25 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String, Text, DateTime, TIMESTAMP, ForeignKey, Index, text
+
+VERSION: int = 6
+DESCRIPTION: str = "Stored responses of idempotent requests"
+
+metadata = MetaData()
+
+# only the key is needed to reference users, the table itself is never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("key", String(255), nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("response", Text, nullable=False),
+    Column("expires_at", DateTime, nullable=False, index=True),
+    Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP")),
+    Index("ix_idempotency_keys_owner", "user_id", "key", unique=True)
+)
+
+def upgrade(connection: Connection) -> None:
+    idempotency_keys.create(bind=connection, checkfirst=True)
+    connection.commit()
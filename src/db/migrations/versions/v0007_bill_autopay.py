@@ -0,0 +1,18 @@
+from sqlalchemy import Connection, inspect, text
+
+from src.db.migrations import create_index, backfill
+
+VERSION: int = 7
+DESCRIPTION: str = "Autopay card of bills, unpaid bills by due date index"
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("bills")}
+    if "autopay_card_id" not in existing:
+        connection.execute(text("ALTER TABLE bills ADD COLUMN autopay_card_id INTEGER REFERENCES cards (id)"))
+        connection.commit()
+
+    # the sweep looks unpaid bills up by paid = 0, rows written before the column default are NULL
+    backfill(connection, "bills", "paid = 0", "paid IS NULL")
+
+    create_index(connection, "ix_bills_paid_due_date", "bills", ["paid", "due_date"])
+    create_index(connection, "ix_bills_autopay_card_id", "bills", ["autopay_card_id"])
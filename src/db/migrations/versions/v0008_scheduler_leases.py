@@ -0,0 +1,17 @@
+from sqlalchemy import Connection, MetaData, Table, Column, String, DateTime
+
+VERSION: int = 8
+DESCRIPTION: str = "Leader lock of the in-app scheduler"
+
+metadata = MetaData()
+
+Table(
+    "scheduler_leases", metadata,
+    Column("name", String(64), primary_key=True),
+    Column("owner", String(255), nullable=False),
+    Column("expires_at", DateTime, nullable=False)
+)
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(bind=connection, checkfirst=True)
+    connection.commit()
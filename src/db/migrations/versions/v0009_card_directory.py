@@ -0,0 +1,33 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String, ForeignKey, text
+
+VERSION: int = 9
+DESCRIPTION: str = "Card directory: card number to card, wallet and owner"
+
+CHUNK_SIZE: int = 10000
+
+metadata = MetaData()
+
+# only the key is needed to reference cards, the table itself is never created here
+Table("cards", metadata, Column("id", Integer, primary_key=True))
+
+card_directory = Table(
+    "card_directory", metadata,
+    Column("number", String, primary_key=True),
+    Column("card_id", Integer, ForeignKey("cards.id"), unique=True, nullable=False),
+    Column("wallet_id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("holder_name", String, nullable=False)
+)
+
+def upgrade(connection: Connection) -> None:
+    card_directory.create(bind=connection, checkfirst=True)
+    connection.commit()
+
+    last_id = connection.scalar(text("SELECT coalesce(max(id), 0) FROM cards"))
+    for start in range(0, last_id, CHUNK_SIZE):
+        connection.execute(text(
+            "INSERT OR IGNORE INTO card_directory (number, card_id, wallet_id, user_id, holder_name) "
+            "SELECT cards.number, cards.id, cards.wallet_id, wallets.user_id, cards.cardholder_name || ' ' || cards.cardholder_surname "
+            "FROM cards JOIN wallets ON wallets.id = cards.wallet_id WHERE cards.id > :start AND cards.id <= :end"
+        ), {"start": start, "end": start + CHUNK_SIZE})
+        connection.commit()
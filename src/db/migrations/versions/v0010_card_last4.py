@@ -0,0 +1,16 @@
+from sqlalchemy import Connection, inspect, text
+
+from src.db.migrations import create_index, backfill
+
+VERSION: int = 10
+DESCRIPTION: str = "Last 4 digits of card numbers, cards by wallet and last 4 digits index"
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("cards")}
+    if "last4" not in existing:
+        connection.execute(text("ALTER TABLE cards ADD COLUMN last4 VARCHAR(4)"))
+        connection.commit()
+
+    backfill(connection, "cards", "last4 = substr(number, -4)", "last4 IS NULL")
+
+    create_index(connection, "ix_cards_wallet_id_last4", "cards", ["wallet_id", "last4"])
@@ -0,0 +1,16 @@
+from sqlalchemy import Connection, MetaData, Table, Column, Integer, String
+
+VERSION: int = 11
+DESCRIPTION: str = "Card number sequences"
+
+metadata = MetaData()
+
+Table(
+    "card_number_sequences", metadata,
+    Column("prefix", String(8), primary_key=True),
+    Column("next_account", Integer, nullable=False)
+)
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(bind=connection, checkfirst=True)
+    connection.commit()
@@ -1,6 +1,7 @@
 from datetime import timedelta, datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import exists, select
+from sqlalchemy import exists, select, insert, update, delete, func, literal, Table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from src.schemas.user import UserCreate, UserLogin
 from src.models.wallet import Wallet
@@ -9,6 +10,11 @@ from src.models.cards import Card
 from src.models.user import User, UnverifiedUser
 from src.models.savings import Saving_account
 from src.models.bills import Bills
+from src.models.credentials import CredentialToken, CredentialPurpose
+from src.models.rollups import SpendingRollup
+from src.models.archive import HistoryArchive
+from src.models.idempotency import IdempotencyRecord
+from src.models.scheduler import SchedulerLease
 
 def is_user_existing(user: UserCreate, db: Session) -> bool:
     return db.query(exists().where(
@@ -22,8 +28,15 @@ def is_user_existing(user: UserCreate, db: Session) -> bool:
         (UnverifiedUser.phone_number == user.phone_number)
     )).scalar()
 
-def get_expired_users(db: Session, threshold: datetime = datetime.now(timezone.utc)) -> list[UnverifiedUser]:
-    return db.query(UnverifiedUser).filter(UnverifiedUser.created_at < threshold).all()
+def delete_expired_users(db: Session, threshold: datetime, limit: int) -> int:
+    expired = (
+        select(UnverifiedUser.id)
+        .where(UnverifiedUser.created_at < threshold)
+        .limit(limit)
+        .scalar_subquery()
+    )
+
+    return db.query(UnverifiedUser).filter(UnverifiedUser.id.in_(expired)).delete(synchronize_session=False)
 
 def get_unverified_user(email: str, db: Session) -> UnverifiedUser:
     return db.query(UnverifiedUser).filter(UnverifiedUser.email == email).first()
@@ -31,14 +44,6 @@ def get_unverified_user(email: str, db: Session) -> UnverifiedUser:
 def get_user_by_email(email: str, db: Session) -> User:
     return db.query(User).filter(User.email == email).first()
 
-def get_user_by_card_number(card_number: str, db: Session) -> User | None:
-    return(
-        db.query(User)
-        .join(Wallet, User.id == Wallet.user_id)
-        .join(Card, Wallet.id == Card.wallet_id)
-        .filter(Card.number == card_number).first()
-    )
-
 def get_user_by_id(id: int, db: Session) -> User:
     return db.query(User).filter(User.id == id).first()
 
@@ -82,22 +87,6 @@ def get_card_by_number(user: User, card_number: str, db: Session) -> Card | None
     )
 
 
-def get_transfer_records_of_id(id: int, db: Session):
-    return db.query(TransferHistory).filter(
-            (TransferHistory.from_user_id == id) |
-            (TransferHistory.to_user_id == id)
-        ).order_by(TransferHistory.time.desc()).all()
-
-def get_card_transfer_history_records(card: Card, db: Session) -> list[TransferHistory]:
-    return (
-        db.query(TransferHistory).filter(
-            (TransferHistory.from_user_card_number == card.number) |
-            (TransferHistory.to_user_card_number == card.number)
-        )
-        .order_by(TransferHistory.time.desc())
-        .all()
-    )
-
 def get_saving_accounts(user: User, db: Session):
     return(
         db.query(Saving_account).join(Wallet, Saving_account.wallet_id == Wallet.id)
@@ -125,11 +114,122 @@ def get_bill_by_id(user, bill_id: int, db: Session):
 def get_all_users(db: Session) -> list[User]:
     return db.execute(select(User)).scalars().all()
 
-def get_user_by_reset_token(reset_token: str, db: Session) -> User:
-    return db.query(User).filter(User.reset_token == reset_token).first()
+def get_credential(purpose: CredentialPurpose, token_hash: str, db: Session, user_id: int | None = None) -> CredentialToken | None:
+    query = db.query(CredentialToken).filter(
+        CredentialToken.purpose == purpose,
+        CredentialToken.token_hash == token_hash,
+        CredentialToken.expires_at > datetime.now(timezone.utc).replace(tzinfo=None)
+    )
+
+    if user_id is not None:
+        query = query.filter(CredentialToken.user_id == user_id)
 
-def validate_token(user: User, db: Session) -> bool:
-    return user != None and(datetime.now(timezone.utc) - user.reset_token_created_at.replace(tzinfo=timezone.utc) <= timedelta(hours=1))
+    return query.first()
+
+def delete_user_credentials(user_id: int, purpose: CredentialPurpose, db: Session) -> int:
+    return (
+        db.query(CredentialToken)
+        .filter(CredentialToken.user_id == user_id, CredentialToken.purpose == purpose)
+        .delete(synchronize_session=False)
+    )
+
+def delete_expired_credentials(db: Session, threshold: datetime, limit: int) -> int:
+    expired = (
+        select(CredentialToken.id)
+        .where(CredentialToken.expires_at <= threshold)
+        .limit(limit)
+        .scalar_subquery()
+    )
+
+    return db.query(CredentialToken).filter(CredentialToken.id.in_(expired)).delete(synchronize_session=False)
+
+def delete_expired_idempotency_records(db: Session, threshold: datetime, limit: int) -> int:
+    expired = (
+        select(IdempotencyRecord.id)
+        .where(IdempotencyRecord.expires_at <= threshold)
+        .limit(limit)
+        .scalar_subquery()
+    )
+
+    return db.query(IdempotencyRecord).filter(IdempotencyRecord.id.in_(expired)).delete(synchronize_session=False)
+
+def reset_rollups(db: Session) -> int:
+    """Empties the rollups and returns the last history id they have to be rebuilt up to."""
+    db.execute(delete(SpendingRollup))
+    return db.scalar(select(func.coalesce(func.max(TransferHistory.id), 0)))
+
+def add_history_range_to_rollups(db: Session, after_id: int, until_id: int, history: Table = TransferHistory.__table__) -> None:
+    month = func.strftime("%Y-%m", history.c.time)
+
+    for direction, card_id in (("out", history.c.from_card_id), ("in", history.c.to_card_id)):
+        totals = (
+            select(card_id, month, history.c.transfer_type, literal(direction),
+                   func.sum(history.c.amount), func.count())
+            .where(history.c.id > after_id, history.c.id <= until_id, card_id.is_not(None))
+            .group_by(card_id, month, history.c.transfer_type)
+        )
+        statement = sqlite_insert(SpendingRollup).from_select(
+            ["card_id", "month", "transfer_type", "direction", "total", "count"], totals
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[SpendingRollup.card_id, SpendingRollup.month, SpendingRollup.transfer_type, SpendingRollup.direction],
+            set_={"total": SpendingRollup.total + statement.excluded.total, "count": SpendingRollup.count + statement.excluded.count}
+        ))
+
+def _newest_history_id():
+    return select(func.max(TransferHistory.id)).scalar_subquery()
+
+def get_oldest_history_time(db: Session) -> datetime | None:
+    """Time of the oldest hot history row which may be archived. The newest row never is: SQLite hands out
+    ids above the current maximum, keeping it in place keeps archived ids from being reused."""
+    return db.scalar(
+        select(TransferHistory.time)
+        .where(TransferHistory.id < _newest_history_id())
+        .order_by(TransferHistory.time)
+        .limit(1)
+    )
+
+def get_history_archive(table_name: str, db: Session) -> HistoryArchive | None:
+    return db.query(HistoryArchive).filter(HistoryArchive.table_name == table_name).first()
+
+def get_history_archives(db: Session) -> list[HistoryArchive]:
+    return db.query(HistoryArchive).order_by(HistoryArchive.period_start).all()
+
+def move_history_to_archive(archive: Table, period_start: datetime, period_end: datetime, limit: int, db: Session) -> list[int]:
+    """Moves up to `limit` hot rows of [period_start, period_end) into the archive table. Returns the moved ids."""
+    ids = list(db.scalars(
+        select(TransferHistory.id)
+        .where(TransferHistory.time >= period_start, TransferHistory.time < period_end,
+               TransferHistory.id < _newest_history_id())
+        .limit(limit)
+    ))
+    if not ids:
+        return ids
+
+    db.execute(insert(archive).from_select(
+        [column.name for column in TransferHistory.__table__.columns],
+        select(*TransferHistory.__table__.columns).where(TransferHistory.id.in_(ids))
+    ))
+    db.execute(delete(TransferHistory).where(TransferHistory.id.in_(ids)).execution_options(synchronize_session=False))
+    return ids
+
+def add_rows_to_history_archive(archive_id: int, rows: int, last_id: int, db: Session) -> None:
+    db.execute(
+        update(HistoryArchive)
+        .where(HistoryArchive.id == archive_id)
+        .values(rows=HistoryArchive.rows + rows, last_id=func.max(HistoryArchive.last_id, last_id))
+    )
 
-def validate_code(user: User, twofa_code: str) -> bool:
-    return user != None and user.last_2fa_code == twofa_code and (datetime.now(timezone.utc) - user.expires_at_2fa.replace(tzinfo=timezone.utc) <= timedelta(hours=1))
\ No newline at end of file
+def acquire_scheduler_lease(db: Session, name: str, owner: str, now: datetime, expires_at: datetime) -> bool:
+    """Takes the lease if it is free, expired or already held by `owner`, and extends it to `expires_at`."""
+    statement = sqlite_insert(SchedulerLease).values(name=name, owner=owner, expires_at=expires_at)
+    return db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[SchedulerLease.name],
+            set_={"owner": owner, "expires_at": expires_at},
+            where=(SchedulerLease.owner == owner) | (SchedulerLease.expires_at <= now)
+        ).returning(SchedulerLease.name)
+    ).first() is not None
+
+def release_scheduler_lease(db: Session, name: str, owner: str) -> None:
+    db.execute(delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.owner == owner))
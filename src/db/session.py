@@ -1,11 +1,53 @@
-from sqlalchemy import create_engine, Engine
+from sqlalchemy import create_engine, Engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
 
-from src.core.config import settings
+from src.core.config import settings, EngineProfile
 
-engine: Engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+def apply_pragmas(engine: Engine, profile: EngineProfile) -> None:
+    if engine.dialect.name != "sqlite":
+        return
 
-SessionLocal: sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in profile.pragmas().items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def _pool_arguments(profile: EngineProfile) -> dict[str, int]:
+    # in-memory databases live in a single connection, sqlalchemy picks a singleton pool for them
+    if ":memory:" in profile.URL:
+        return {}
+    return {"pool_size": profile.POOL_SIZE, "max_overflow": profile.MAX_OVERFLOW}
+
+def build_engine(profile: EngineProfile) -> Engine:
+    sync_engine = create_engine(
+        profile.URL,
+        connect_args={"check_same_thread": False},
+        **_pool_arguments(profile)
+    )
+    apply_pragmas(sync_engine, profile)
+    return sync_engine
+
+def build_async_engine(profile: EngineProfile) -> AsyncEngine:
+    engine = create_async_engine(
+        profile.ASYNC_URL,
+        **_pool_arguments(profile)
+    )
+    apply_pragmas(engine.sync_engine, profile)
+    return engine
+
+engine: Engine = build_engine(settings.ENGINE)
+
+SessionLocal: sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine: AsyncEngine = build_async_engine(settings.ENGINE)
+
+AsyncSessionLocal: async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async_read_engine: AsyncEngine = build_async_engine(settings.READ_ENGINE)
+
+AsyncReadSessionLocal: async_sessionmaker = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, Index
+from datetime import datetime
+
+from src.db.base import Base
+from src.models.wallet_history import TransferHistory
+
+class HistoryArchive(Base):
+    """Registry of archive tables, each holds the transfer history of [period_start, period_end)."""
+    __tablename__ = "history_archives"
+
+    id: Column = Column(Integer, primary_key=True)
+    table_name: Column = Column(String, unique=True, nullable=False)
+    period_start: Column = Column(DateTime, nullable=False, index=True)
+    period_end: Column = Column(DateTime, nullable=False)
+    rows: Column = Column(Integer, nullable=False, default=0)
+    last_id: Column = Column(Integer, nullable=False, default=0)
+
+# archive tables are created at runtime, so they are kept out of Base.metadata and the migrations
+archive_metadata: MetaData = MetaData()
+
+def archive_table_name(period_start: datetime) -> str:
+    return f"transfer_history_{period_start:%Y_%m}"
+
+def history_archive_table(table_name: str) -> Table:
+    """Table with the columns of transfer_history, without foreign keys: archived rows outlive their cards."""
+    if table_name in archive_metadata.tables:
+        return archive_metadata.tables[table_name]
+
+    return Table(
+        table_name, archive_metadata,
+        *(Column(column.name, column.type, primary_key=column.primary_key) for column in TransferHistory.__table__.columns),
+        Index(f"ix_{table_name}_from_card_id_time", "from_card_id", "time"),
+        Index(f"ix_{table_name}_to_card_id_time", "to_card_id", "time"),
+        Index(f"ix_{table_name}_counterparty", "counterparty_type", "counterparty_id")
+    )
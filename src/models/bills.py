@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Boolean, Integer, Float, DateTime, ForeignKey, String, Enum as SQLEnum
+from sqlalchemy import Column, Boolean, Integer, Float, DateTime, ForeignKey, String, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -6,10 +6,15 @@ from src.db.base import Base
 
 class Bills(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # the autopay sweep walks unpaid bills in due order
+        Index("ix_bills_paid_due_date", "paid", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     amount = Column(Float, nullable=False)
     due_date = Column(DateTime, nullable=False)
     paid = Column(Boolean, default=False)
-    wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=False)
\ No newline at end of file
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=False, index=True)
+    autopay_card_id = Column(Integer, ForeignKey("cards.id"), nullable=True, index=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, select, insert, delete, event, literal
+
+from src.db.base import Base
+from src.models.cards import Card
+from src.models.wallet import Wallet
+
+class CardDirectory(Base):
+    """
+    Card number -> card, wallet and owner, one row per card. Lets the transfer path resolve both ends of a transfer
+    with a single-table primary key lookup. Rows follow cards: they are written and removed in the same flush.
+    """
+    __tablename__ = "card_directory"
+
+    number: Column = Column(String, primary_key=True)
+    card_id: Column = Column(Integer, ForeignKey("cards.id"), unique=True, nullable=False)
+    wallet_id: Column = Column(Integer, nullable=False)
+    user_id: Column = Column(Integer, nullable=False)
+    holder_name: Column = Column(String, nullable=False)
+
+@event.listens_for(Card, "after_insert")
+def _add_directory_entry(mapper, connection, card: Card) -> None:
+    connection.execute(insert(CardDirectory).from_select(
+        ["number", "card_id", "wallet_id", "user_id", "holder_name"],
+        select(literal(card.number), literal(card.id), Wallet.id, Wallet.user_id,
+               literal(f"{card.cardholder_name} {card.cardholder_surname}"))
+        .where(Wallet.id == card.wallet_id)
+    ))
+
+@event.listens_for(Card, "after_delete")
+def _remove_directory_entry(mapper, connection, card: Card) -> None:
+    connection.execute(delete(CardDirectory).where(CardDirectory.card_id == card.id))
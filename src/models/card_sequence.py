@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+
+from src.db.base import Base
+
+class CardNumberSequence(Base):
+    """Next free account number of every card number prefix. Issuers reserve blocks of it, so numbers never collide."""
+    __tablename__ = "card_number_sequences"
+
+    prefix: Column = Column(String(8), primary_key=True)
+    next_account: Column = Column(Integer, nullable=False)
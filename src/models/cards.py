@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, TIMESTAMP, text, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Date, TIMESTAMP, text, Boolean, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from typing import Any
 
@@ -6,16 +6,21 @@ from src.db.base import Base
 
 class Card(Base):
     __tablename__ = 'cards'
+    __table_args__ = (
+        Index("ix_cards_wallet_id_last4", "wallet_id", "last4"),
+    )
 
     id: Column = Column(Integer, primary_key=True)
     cardholder_name: Column = Column(String, nullable=False)
     cardholder_surname: Column = Column(String, nullable=False)
-    number: Column = Column(String, nullable=False)
+    number: Column = Column(String, unique=True, nullable=False, index=True)
     expiration_date: Column = Column(String, nullable=False)
     cvv: Column = Column(String, nullable=False)
     balance: Column = Column(Float, default=50.0)
+    # numbers never change, last4 is derived once on insert
+    last4: Column = Column(String(4), default=lambda context: context.get_current_parameters()["number"][-4:])
 
-    wallet_id: Column = Column(Integer, ForeignKey('wallets.id'), nullable=False)
+    wallet_id: Column = Column(Integer, ForeignKey('wallets.id'), nullable=False, index=True)
 
     wallet = relationship("Wallet", back_populates="cards")
 
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, TIMESTAMP, ForeignKey, Index, text, Enum as SQLEnum
+from enum import Enum
+
+from src.db.base import Base
+
+class CredentialPurpose(Enum):
+    PASSWORD_RESET = 0
+    TWOFA = 1
+
+class CredentialToken(Base):
+    __tablename__ = "credential_tokens"
+    __table_args__ = (
+        Index("ix_credential_tokens_lookup", "purpose", "token_hash"),
+        Index("ix_credential_tokens_owner", "user_id", "purpose"),
+    )
+
+    id: Column = Column(Integer, primary_key=True)
+    user_id: Column = Column(Integer, ForeignKey("users.id"), nullable=False)
+    purpose: Column = Column(SQLEnum(CredentialPurpose), nullable=False)
+    token_hash: Column = Column(String(64), nullable=False)
+    expires_at: Column = Column(DateTime, nullable=False, index=True)
+    created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
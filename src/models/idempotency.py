@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, TIMESTAMP, ForeignKey, Index, text
+
+from src.db.base import Base
+
+class IdempotencyRecord(Base):
+    """Response of a money-moving request stored under its Idempotency-Key, written in the transaction of the request"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_owner", "user_id", "key", unique=True),
+    )
+
+    id: Column = Column(Integer, primary_key=True)
+    user_id: Column = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key: Column = Column(String(255), nullable=False)
+    fingerprint: Column = Column(String(64), nullable=False)
+    response: Column = Column(Text, nullable=False)
+    expires_at: Column = Column(DateTime, nullable=False, index=True)
+    created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, TIMESTAMP, Index, text, Enum as SQLEnum
+from enum import Enum
+
+from src.db.base import Base
+
+class OutboxStatus(Enum):
+    PENDING = 0
+    SENDING = 1
+    SENT = 2
+    FAILED = 3
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id: Column = Column(Integer, primary_key=True)
+    recipient: Column = Column(String, nullable=False)
+    subject: Column = Column(String, nullable=False)
+    email_type: Column = Column(String, nullable=False)
+    context: Column = Column(Text, nullable=True)
+
+    status: Column = Column(SQLEnum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts: Column = Column(Integer, nullable=False, default=0)
+    next_attempt_at: Column = Column(DateTime, nullable=False)
+    locked_until: Column = Column(DateTime, nullable=True)
+    last_error: Column = Column(String, nullable=True)
+
+    created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    sent_at: Column = Column(DateTime, nullable=True)
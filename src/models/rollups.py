@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum as SQLEnum
+
+from src.db.base import Base
+from src.models.wallet_history import TransactionType
+
+class SpendingRollup(Base):
+    """Running totals of the card history per month, transaction type and direction ("in"/"out")."""
+    __tablename__ = "spending_rollups"
+
+    card_id: Column = Column(Integer, ForeignKey("cards.id"), primary_key=True)
+    month: Column = Column(String(7), primary_key=True)
+    transfer_type: Column = Column(SQLEnum(TransactionType), primary_key=True)
+    direction: Column = Column(String(3), primary_key=True)
+    total: Column = Column(Float, nullable=False, default=0)
+    count: Column = Column(Integer, nullable=False, default=0)
@@ -11,6 +11,6 @@ class Saving_account(Base):
     balance: Column = Column(Float, default=200.0)
     goal: Column = Column(Float)
 
-    wallet_id: Column = Column(Integer, ForeignKey('wallets.id'), nullable=False)
+    wallet_id: Column = Column(Integer, ForeignKey('wallets.id'), nullable=False, index=True)
 
     wallet = relationship("Wallet", back_populates="saving_account")
\ No newline at end of file
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+
+from src.db.base import Base
+
+class SchedulerLease(Base):
+    """Leader lock of the in-app scheduler. The owner runs the periodic jobs until its lease expires."""
+    __tablename__ = "scheduler_leases"
+
+    name: Column = Column(String(64), primary_key=True)
+    owner: Column = Column(String(255), nullable=False)
+    expires_at: Column = Column(DateTime, nullable=False)
@@ -19,12 +19,6 @@ class User(Base):
     hashed_password: Column = Column(String, nullable=False)
     created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
 
-    last_2fa_code: Column = Column(String, nullable=True, default=None)
-    expires_at_2fa: Column = Column(TIMESTAMP(timezone=True), nullable=True, default=None)
-
-    reset_token: Column = Column(String, nullable=True, default=None)
-    reset_token_created_at: Column = Column(TIMESTAMP(timezone=True), nullable=True, default=None)
-
     wallets = relationship("Wallet", back_populates="user")
 
 class UnverifiedUser(Base):
@@ -36,4 +30,4 @@ class UnverifiedUser(Base):
     social_security: Column = Column(String, unique=True, nullable=False)
     code: Column = Column(String, nullable=False)
 
-    created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
\ No newline at end of file
+    created_at: Column = Column("created_at", TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"), index=True)
\ No newline at end of file
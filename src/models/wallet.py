@@ -6,7 +6,7 @@ class Wallet(Base):
     __tablename__ = 'wallets'
 
     id: Column = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
 
     user = relationship('User', back_populates='wallets')
     cards = relationship("Card", back_populates="wallet")
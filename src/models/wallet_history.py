@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Enum as SQLEnum
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -13,11 +13,30 @@ class TransactionType(Enum):
     SAVINGS_TOPUP = 4
     SAVINGS_WITHDRAW = 5
 
+class CounterpartyType(Enum):
+    SAVING_ACCOUNT = 0
+    BILL = 1
+
 class TransferHistory(Base):
+    """
+    Sides of a transfer are card ids. The side which is not a card (saving account, bill) is the typed counterparty.
+    Display names are resolved from the referenced rows; the string columns hold labels only for sides
+    which no longer resolve, because the card or saving account was deleted.
+    """
     __tablename__ = "transfer_history"
+    __table_args__ = (
+        Index("ix_transfer_history_from_card_id_time", "from_card_id", "time"),
+        Index("ix_transfer_history_to_card_id_time", "to_card_id", "time"),
+        Index("ix_transfer_history_counterparty", "counterparty_type", "counterparty_id"),
+        Index("ix_transfer_history_time", "time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transfer_type = Column(SQLEnum(TransactionType), default=TransactionType.PURCHASE)
+    from_card_id = Column(Integer, ForeignKey("cards.id"))
+    to_card_id = Column(Integer, ForeignKey("cards.id"))
+    counterparty_type = Column(SQLEnum(CounterpartyType))
+    counterparty_id = Column(Integer)
     from_user_card_number = Column(String)
     from_user = Column(String)
     to_user_card_number = Column(String)
@@ -1,10 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class BillCreate(BaseModel):
     name: str
-    amount: float
+    amount: float = Field(..., gt=0, description="Amount must be positive")
     due_date: datetime
+    autopay_card_number: str | None = Field(None, description="Card which pays the bill automatically on due date")
 
 class BillOut(BaseModel):
     id: int
@@ -12,7 +13,12 @@ class BillOut(BaseModel):
     amount: float
     due_date: datetime
     paid: bool
+    autopay_card_id: int | None = None
 
 class BillPay(BaseModel):
     bill_id: int
-    card_number: str
\ No newline at end of file
+    card_number: str
+
+class BillAutopay(BaseModel):
+    bill_id: int
+    card_number: str | None = Field(None, description="Card to pay the bill on due date, null turns autopay off")
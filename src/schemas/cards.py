@@ -1,4 +1,7 @@
 from pydantic import BaseModel, constr, Field
+from typing import Literal
+from typing_extensions import TypedDict
+from datetime import datetime
 
 class CardCreate(BaseModel):
     id: int
@@ -13,8 +16,58 @@ class TransferRequest(BaseModel):
     to_card_number: str
     amount: float = Field(..., gt=0, description="Amount must be positive")
 
+class BatchTransferRequest(BaseModel):
+    transfers: list[TransferRequest] = Field(..., min_length=1, max_length=1000)
+    mode: Literal["atomic", "best_effort"] = Field("atomic", description="atomic posts all transfers or none, best_effort posts every transfer which can be made")
+
+class CardIssueRequest(BaseModel):
+    count: int = Field(..., ge=1, le=500, description="Amount of virtual cards to issue")
+
 class CardHistoryRequest(BaseModel):
     card_number: str
+    limit: int = Field(50, gt=0, le=200, description="Page size")
+    cursor: str | None = Field(None, description="next_cursor of the previous page")
+    transfer_types: list[str] | None = Field(None, description="Names of TransactionType, e.g. TRANSFER, BILL")
+    direction: Literal["in", "out"] | None = None
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+    amount_min: float | None = Field(None, ge=0)
+    amount_max: float | None = Field(None, ge=0)
 
 class CardDelete(BaseModel):
-    card_number: str
\ No newline at end of file
+    card_number: str
+
+class CardHistoryExportRequest(BaseModel):
+    card_number: str
+    format: Literal["csv", "ndjson"] = "csv"
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+
+class CardSummaryRequest(BaseModel):
+    card_number: str
+    month_from: str | None = Field(None, pattern=r"^\d{4}-\d{2}$", description="First month, YYYY-MM")
+    month_to: str | None = Field(None, pattern=r"^\d{4}-\d{2}$", description="Last month, YYYY-MM")
+
+class CardInfo(TypedDict):
+    card_id: int
+    number: str
+    cardholder_name: str
+    cardholder_surname: str
+    expiration_date: str
+    cvv: str
+    balance: float
+
+HistoryRecord = TypedDict("HistoryRecord", {
+    "direction": Literal["in", "out"],
+    "from": str | None,
+    "from_card_number": str | None,
+    "to": str | None,
+    "to_card_number": str | None,
+    "transfer_type": str,
+    "amount": float,
+    "time": str
+})
+
+class HistoryPage(TypedDict):
+    history: list[HistoryRecord]
+    next_cursor: str | None
@@ -15,12 +15,12 @@ class Saving_Account_out(BaseModel):
         from_attributes = True
 
 class Saving_Account_TopUp(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0, description="Amount must be positive")
     saving_account_id: int
     card_id: int
 
 class Saving_Account_decrease(BaseModel):
-    amount: float
+    amount: float = Field(..., gt=0, description="Amount must be positive")
     saving_account_id: int
     card_id: int
 
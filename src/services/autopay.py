@@ -0,0 +1,79 @@
+from datetime import datetime
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.wallet_history import TransactionType, CounterpartyType
+from src.db.async_queries import get_due_autopay_bills, get_card_balances, claim_bills, apply_card_deltas, insert_transfer_history
+from src.core.config import settings
+from src.services.rollups import RollupsService
+
+def plan_autopay(bills: list[Row], balances: dict[int, float]) -> tuple[list[int], int]:
+    """
+    Picks the bills of the chunk which their cards can pay, in due order: an earlier bill is never left unpaid
+    for a later one of the same card. Returns ids of the picked bills and amount of bills left for lack of funds.
+    """
+    available = dict(balances)
+    picked, short = [], 0
+
+    for bill in bills:
+        if available.get(bill.autopay_card_id, 0) < bill.amount:
+            short += 1
+            continue
+
+        available[bill.autopay_card_id] -= bill.amount
+        picked.append(bill.id)
+
+    return picked, short
+
+class AutopayService:
+    """
+    Pays due bills linked to a card. Bills are walked in (due_date, id) chunks over the (paid, due_date) index
+    and every chunk is settled in one transaction: bills, balances, history and rollups change together.
+    Bills are claimed with a conditional update, so sweeps running in several workers never pay a bill twice.
+    """
+
+    @staticmethod
+    async def sweep(db: AsyncSession, now: datetime | None = None, chunk_size: int = settings.AUTOPAY_CHUNK_SIZE) -> dict[str, float]:
+        now = now or datetime.now()
+        result = {"paid": 0, "amount": 0.0, "insufficient_funds": 0, "conflicts": 0}
+        after = None
+
+        while True:
+            bills = await get_due_autopay_bills(now, db, chunk_size, after)
+            if not bills:
+                return result
+            after = (bills[-1].due_date, bills[-1].id)
+
+            balances = await get_card_balances(list({bill.autopay_card_id for bill in bills}), db)
+            picked, short = plan_autopay(bills, balances)
+            result["insufficient_funds"] += short
+
+            if picked:
+                # bills paid by another worker in the meantime are not returned
+                claimed = await claim_bills(picked, db)
+                deltas: dict[int, float] = {}
+                for bill in claimed:
+                    deltas[bill.autopay_card_id] = deltas.get(bill.autopay_card_id, 0) - bill.amount
+
+                if claimed and await apply_card_deltas(deltas, db) != set(deltas):
+                    # a card was drained after it was read, the chunk waits for the next sweep
+                    await db.rollback()
+                    result["conflicts"] += len(picked)
+                    continue
+
+                history_rows = [
+                    {"transfer_type": TransactionType.BILL, "from_card_id": bill.autopay_card_id, "to_card_id": None,
+                     "counterparty_type": CounterpartyType.BILL, "counterparty_id": bill.id, "amount": bill.amount, "time": now}
+                    for bill in claimed
+                ]
+                if history_rows:
+                    await insert_transfer_history(history_rows, db)
+                    await RollupsService.record_many(history_rows, db)
+                await db.commit()
+
+                result["paid"] += len(claimed)
+                result["amount"] += sum(bill.amount for bill in claimed)
+                result["conflicts"] += len(picked) - len(claimed)
+
+            if len(bills) < chunk_size:
+                return result
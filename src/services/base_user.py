@@ -1,29 +1,31 @@
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import Any
 from datetime import datetime, timezone, timedelta
 
 from src.models.user import User
 from src.schemas.user import UserLogin
-from src.db.queries import get_user_by_email, validate_code
-from src.api.utils.auth import create_access_token
+from src.db.queries import get_user_by_email
+from src.models.credentials import CredentialPurpose
+from src.services.credentials import CredentialService
+from src.api.utils.auth import create_access_token, principal_cache
 from src.core.exceptions import credentials_exception
 from src.core.config import settings
-from src.api.utils.mail import send_email, EmailType
+from src.api.utils.mail import queue_email, EmailType
+from src.api.utils.outbox import outbox_workers
 from src.api.utils.auth import create_verification_code
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.api.utils.password import password_hasher
 
 class BaseUserService:
     @staticmethod
-    def validate(user_data: UserLogin, db: Session) -> User:
+    async def validate(user_data: UserLogin, db: Session) -> User:
         if not user_data.email or not user_data.password:
             raise credentials_exception()
 
-        user: User = get_user_by_email(user_data.email, db)
+        user: User = await run_in_threadpool(get_user_by_email, user_data.email, db)
 
-        if not user or not pwd_context.verify(user_data.password, user.hashed_password):
+        if not user or not await password_hasher.verify(user_data.password, user.hashed_password):
             raise credentials_exception()
         
         return user
@@ -49,36 +51,41 @@ class BaseUserService:
     def twofa_confirm(user_data: UserLogin, db: Session) -> JSONResponse:
         user: User = get_user_by_email(user_data.email, db)
 
-        try:
-            if not user_data.twofa_code or not validate_code(user, user_data.twofa_code):
-                raise credentials_exception("Not valid code")
-        except:
+        if not user or not user_data.twofa_code:
             raise credentials_exception("Not valid code or user is not requested")
 
-        user.last_2fa_code = None
-        user.expires_at_2fa = None
+        credential = CredentialService.find(CredentialPurpose.TWOFA, user_data.twofa_code, db, user_id=user.id)
+
+        if not credential or not CredentialService.consume(credential, db):
+            raise credentials_exception("Not valid code")
 
         db.commit()
-        db.refresh(user)
 
         return BaseUserService.login(user_data.email, db)
 
     @staticmethod
-    def twofa_request(user_data: UserLogin, db: Session) -> dict[str, Any]:
-        user: User = BaseUserService.validate(user_data, db)
+    async def twofa_request(user_data: UserLogin, db: Session) -> dict[str, Any]:
+        user: User = await BaseUserService.validate(user_data, db)
 
-        user.last_2fa_code = create_verification_code()
-        user.expires_at_2fa = datetime.now(timezone.utc)
+        return await run_in_threadpool(BaseUserService.send_twofa_code, user, db)
 
+    @staticmethod
+    def send_twofa_code(user: User, db: Session) -> dict[str, Any]:
+        code: str = create_verification_code()
+
+        CredentialService.issue(user.id, CredentialPurpose.TWOFA, code,
+                                timedelta(minutes=settings.TWOFA_CODE_EXPIRE_MINUTES), db)
+        queue_email(user.email, "Login 2FA code", EmailType.TWOFA, db, code=code)
         db.commit()
-        db.refresh(user)
 
-        send_email(user_data.email, "Login 2FA code", EmailType.TWOFA, code=user.last_2fa_code)
+        outbox_workers.notify()
 
         return {"message": "Request sended"}
     
     @staticmethod
-    def logout() -> JSONResponse:
+    def logout(token: str | None = None) -> JSONResponse:
+        principal_cache.invalidate_token(token)
+
         response = JSONResponse({"message": "Goodbye"})
         response.delete_cookie("authorization")
         return response
\ No newline at end of file
@@ -1,84 +1,110 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.bills import Bills
-from src.db.queries import get_wallet, get_card_by_number, get_bill_by_id
-from src.core.exceptions import user_not_found, card_not_found, forbidden_wallet_action
-from src.models.wallet_history import TransferHistory, TransactionType
+from src.db.async_queries import get_wallet, get_card_by_number, get_bill_by_id, mark_bill_paid, debit_card, set_bill_autopay
+from src.core.exceptions import user_not_found, card_not_found, bill_not_found, forbidden_wallet_action
+from src.models.wallet_history import TransferHistory, TransactionType, CounterpartyType
+from src.services.rollups import RollupsService
 
 class BillsService:
     @staticmethod
-    def create_bill(user, data, db: Session):
-        wallet = get_wallet(user, db)
+    async def create_bill(user, data, db: AsyncSession):
+        wallet = await get_wallet(user, db)
         if not wallet:
             raise user_not_found
 
+        autopay_card = None
+        if data.autopay_card_number is not None:
+            autopay_card = await get_card_by_number(user, data.autopay_card_number, db)
+            if not autopay_card:
+                raise card_not_found
+
         bill = Bills(
             name=data.name,
             amount=data.amount,
             due_date=data.due_date,
-            wallet_id=wallet.id
+            wallet_id=wallet.id,
+            autopay_card_id=autopay_card.id if autopay_card else None
         )
 
         db.add(bill)
-        db.commit()
-        db.refresh(bill)
+        await db.commit()
+        await db.refresh(bill)
 
         return {
             "id": bill.id,
             "name": bill.name,
             "amount": bill.amount,
             "due_date": bill.due_date,
-            "paid": bill.paid
+            "paid": bill.paid,
+            "autopay_card_id": bill.autopay_card_id
         }
 
     @staticmethod
-    def get_user_bills(user, db: Session):
-        wallet = get_wallet(user, db)
+    async def get_user_bills(user, db: AsyncSession):
+        wallet = await get_wallet(user, db)
         if not wallet:
             raise user_not_found
 
-        bills = db.query(Bills).filter(Bills.wallet_id == wallet.id).all()
+        # plain rows are encoded straight to JSON, no ORM objects are built
+        bills = await db.execute(
+            select(Bills.id, Bills.name, Bills.amount, Bills.due_date, Bills.paid, Bills.autopay_card_id)
+            .where(Bills.wallet_id == wallet.id)
+        )
 
-        return bills
+        return [bill._asdict() for bill in bills]
 
     @staticmethod
-    def pay_bill(user, bill_id: int, card_number: str, db: Session):
-        wallet = get_wallet(user, db)
-        bill = get_bill_by_id(user, bill_id, db)
-        card = get_card_by_number(user, card_number, db)
+    async def set_autopay(user, bill_id: int, card_number: str | None, db: AsyncSession):
+        card = None
+        if card_number is not None:
+            card = await get_card_by_number(user, card_number, db)
+            if not card:
+                raise card_not_found
 
-        if not wallet or not bill or not card:
-            raise user_not_found
+        bill = await set_bill_autopay(user, bill_id, card.id if card else None, db)
+        if not bill:
+            await db.rollback()
+            raise bill_not_found
+        await db.commit()
 
-        if not card:
-            raise card_not_found
+        return bill._asdict()
 
-        if bill.paid:
+    @staticmethod
+    async def pay_bill(user, bill_id: int, card_number: str, db: AsyncSession, commit: bool = True):
+        bill = await mark_bill_paid(user, bill_id, db)
+        if not bill:
+            await db.rollback()
+            existing = await get_bill_by_id(user, bill_id, db)
+            if not existing:
+                raise user_not_found
             raise forbidden_wallet_action("Bill already paid")
 
-        if card.balance < bill.amount:
+        card = await debit_card(bill.amount, db, number=card_number, owner=user)
+        if not card:
+            await db.rollback()
+            if not await get_card_by_number(user, card_number, db):
+                raise card_not_found
             raise forbidden_wallet_action("Not enough funds")
 
-        card.balance -= bill.amount
-        bill.paid = True
-
         history_record = TransferHistory(
             transfer_type=TransactionType.BILL,
-            from_user_card_number=card.number,
-            from_user=f"{card.cardholder_name} {card.cardholder_surname}",
-            to_user_card_number=None,
-            to_user=f"Bill - {bill.name}",
+            from_card_id=card.id,
+            counterparty_type=CounterpartyType.BILL,
+            counterparty_id=bill.id,
             amount=bill.amount
         )
 
         db.add(history_record)
-
-        db.commit()
-        db.refresh(bill)
-        db.refresh(card)
+        await RollupsService.record(history_record, db)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
 
         return {
             "status": "paid",
             "bill_id": bill.id,
-            "remaining_card_balance": card.balance
+            "remaining_card_balance": float(card.balance)
         }
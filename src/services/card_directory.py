@@ -0,0 +1,40 @@
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.async_queries import get_card_directory_entries
+from src.core.cache import LRUCache
+from src.core.config import settings
+
+card_directory_cache: LRUCache = LRUCache(settings.CARD_DIRECTORY_CACHE_SIZE, settings.CARD_DIRECTORY_CACHE_TTL_SECONDS)
+
+class CardDirectoryService:
+    """
+    Resolves card numbers to (card_id, wallet_id, user_id, holder_name). Entries never change while the card exists,
+    so they are cached until evicted; deletes in this process invalidate them at once, deletes in other processes
+    are noticed when a balance update by a cached id finds no card, or after CARD_DIRECTORY_CACHE_TTL_SECONDS.
+    """
+
+    @staticmethod
+    async def resolve(numbers: list[str], db: AsyncSession) -> dict[str, Row]:
+        found: dict[str, Row] = {}
+        missing: list[str] = []
+
+        for number in dict.fromkeys(numbers):
+            entry = card_directory_cache.get(number)
+            if entry is not None:
+                found[number] = entry
+            else:
+                missing.append(number)
+
+        # unknown numbers are not cached, a card created later must resolve at once
+        if missing:
+            for entry in await get_card_directory_entries(missing, db):
+                card_directory_cache.set(entry.number, entry)
+                found[entry.number] = entry
+
+        return found
+
+    @staticmethod
+    def invalidate(*numbers: str) -> None:
+        for number in numbers:
+            card_directory_cache.pop(number)
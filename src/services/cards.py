@@ -1,23 +1,48 @@
 from random import randint
+from typing import Any, AsyncIterator, Callable
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import exists
-from sqlalchemy.orm import Session
+from csv import writer
+from io import StringIO
+from json import dumps
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.queries import get_wallet
+from src.db.async_queries import get_wallet
 from src.models.user import User
-from src.schemas.cards import TransferRequest
+from src.schemas.cards import TransferRequest, BatchTransferRequest, CardIssueRequest, CardHistoryRequest, CardHistoryExportRequest, CardInfo, HistoryPage
 from src.models.cards import Card
 from src.models.wallet_history import TransferHistory, TransactionType
-from src.core.exceptions import user_not_found, forbidden_wallet_action, card_not_found, cannot_delete_card_with_balance
-from src.db.queries import get_cards, get_user_by_card_number, get_card_transfer_history_records, get_card_by_number
+from src.core.exceptions import user_not_found, forbidden_wallet_action, card_not_found, cannot_delete_card_with_balance, bad_requset, batch_rejected
+from src.db.async_queries import get_cards, reserve_card_accounts, insert_cards, insert_card_directory_entries, get_card_transfer_history_page, get_card_by_number, debit_card, credit_card, stream_card_transfer_history, detach_card_history, detach_card_autopay, delete_rollups, get_cards_by_numbers, apply_card_deltas, insert_transfer_history
+from src.api.utils.cursor import encode_cursor, decode_cursor
+from src.db.session import AsyncReadSessionLocal
+from src.core.config import settings
 from src.core.traceback import traceBack, TrackType
+from src.services.rollups import RollupsService
+from src.services.card_directory import CardDirectoryService
+
+def luhn_check_digit(payload: str) -> str:
+    total = 0
+    # doubled are every second digit from the right of the payload, the check digit follows it
+    for index, digit in enumerate(reversed(payload)):
+        value = int(digit) * (2 if index % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return str(-total % 10)
+
+def card_number(prefix: str, account: int) -> str:
+    payload = f"{prefix}{account:0{15 - len(prefix)}d}"
+    return payload + luhn_check_digit(payload)
+
+async def generate_card_numbers(count: int, db: AsyncSession, prefix: str = settings.CARD_NUMBER_PREFIX) -> list[str]:
+    """Luhn-valid 16 digit numbers from a block reserved in the prefix sequence, no uniqueness check is needed."""
+    first = await reserve_card_accounts(prefix, count, db)
+    if first + count > 10 ** (15 - len(prefix)):
+        await db.rollback()
+        traceBack(f"Card numbers of prefix {prefix} are exhausted", type=TrackType.ERROR)
+        raise bad_requset("Card numbers are exhausted")
+
+    return [card_number(prefix, account) for account in range(first, first + count)]
 
-def generate_card_number(db: Session):
-    while True:
-        number = ''.join(str(randint(0, 9)) for _ in range(16))
-        if not get_user_by_card_number(number, db):
-            return number
-    
 def generate_cvv():
     return ''.join(str(randint(0, 9)) for _ in range(3))
 
@@ -25,14 +50,82 @@ def generate_expiration_date():
     future_date = datetime.now(timezone.utc) + timedelta(days=365 * 5)
     return future_date.strftime("%m/%y")
 
+EXPORT_COLUMNS: tuple[str, ...] = ("id", "time", "transfer_type", "direction", "from", "from_card_number", "to", "to_card_number", "amount")
+
+async def history_export_chunks(card_id: int, export_format: str,
+                                date_from: datetime | None = None, date_to: datetime | None = None,
+                                session_factory: Callable[[], AsyncSession] = AsyncReadSessionLocal,
+                                chunk_size: int = settings.HISTORY_EXPORT_CHUNK_SIZE) -> AsyncIterator[str]:
+    """
+    Yields the card history as CSV or NDJSON text, one chunk per `chunk_size` rows. Rows are column tuples read
+    from a server-side cursor, so memory does not depend on the history length. The generator owns its session
+    because it outlives the request handler.
+    """
+    async with session_factory() as db:
+        if export_format == "csv":
+            buffer = StringIO()
+            writer(buffer).writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+        async for rows in stream_card_transfer_history(card_id, db, chunk_size, date_from, date_to):
+            buffer = StringIO()
+            csv_writer = writer(buffer) if export_format == "csv" else None
+
+            for id, time, transfer_type, from_card_id, from_user, from_card, to_user, to_card, amount in rows:
+                values = (id, time.isoformat(), transfer_type.name, "out" if from_card_id == card_id else "in",
+                          from_user, from_card, to_user, to_card, amount)
+                if csv_writer is not None:
+                    csv_writer.writerow(values)
+                else:
+                    buffer.write(dumps(dict(zip(EXPORT_COLUMNS, values))))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+
+def plan_batch_transfers(transfers: list[TransferRequest], cards: dict[str, Any], user: User,
+                         now: datetime) -> tuple[list[dict], dict[int, float], list[dict]]:
+    """
+    Replays the batch in order against the balances in `cards`, so a card may spend money it receives earlier
+    in the same batch. Returns per-item results, the net balance change of every card and the history rows.
+    """
+    available = {card.id: card.balance for card in cards.values()}
+    results, deltas, history_rows = [], {}, []
+
+    for index, transfer in enumerate(transfers):
+        sender = cards.get(transfer.from_card_number)
+        receiver = cards.get(transfer.to_card_number)
+
+        if sender is None or sender.user_id != user.id:
+            reason = "Sender card not found"
+        elif receiver is None:
+            reason = "Receiver card not found"
+        elif available[sender.id] < transfer.amount:
+            reason = "Not enough funds"
+        else:
+            reason = None
+
+        if reason is not None:
+            results.append({"index": index, "status": "failed", "reason": reason})
+            continue
+
+        available[sender.id] -= transfer.amount
+        available[receiver.id] += transfer.amount
+        deltas[sender.id] = deltas.get(sender.id, 0) - transfer.amount
+        deltas[receiver.id] = deltas.get(receiver.id, 0) + transfer.amount
+        history_rows.append({"transfer_type": TransactionType.TRANSFER, "from_card_id": sender.id,
+                             "to_card_id": receiver.id, "amount": transfer.amount, "time": now})
+        results.append({"index": index, "status": "posted"})
+
+    return results, deltas, history_rows
+
 class CardsService:
     @staticmethod
-    def create_card_logic(user: User, db: Session) -> dict:
-        wallet = get_wallet(user, db)
+    async def create_card_logic(user: User, db: AsyncSession) -> dict:
+        wallet = await get_wallet(user, db)
         if not wallet:
             raise user_not_found
 
-        card_number = generate_card_number(db)
+        [number] = await generate_card_numbers(1, db)
         card_cvv = generate_cvv()
         card_expiry = generate_expiration_date()
 
@@ -40,28 +133,70 @@ class CardsService:
             wallet_id = wallet.id,
             cardholder_name=user.first_name,
             cardholder_surname=user.last_name,
-            number = card_number,
+            number = number,
             expiration_date = card_expiry,
             cvv = card_cvv
         )
 
         db.add(card)
-        db.commit()
-        db.refresh(card)
+        await db.commit()
+        await db.refresh(card)
+        CardDirectoryService.invalidate(card.number)
 
         return card.json()
 
     @staticmethod
-    def delete_card_logic(user: User, card_number:str, db: Session) -> dict:
-        card = get_card_by_number(user, card_number, db)
+    async def issue_cards_logic(request: CardIssueRequest, user: User, db: AsyncSession) -> dict:
+        wallet = await get_wallet(user, db)
+        if not wallet:
+            raise user_not_found
+
+        numbers = await generate_card_numbers(request.count, db)
+        expiration_date = generate_expiration_date()
+
+        # virtual cards are issued empty, money is moved onto them by transfers
+        rows = [
+            {
+                "wallet_id": wallet.id,
+                "cardholder_name": user.first_name,
+                "cardholder_surname": user.last_name,
+                "number": number,
+                "last4": number[-4:],
+                "expiration_date": expiration_date,
+                "cvv": generate_cvv(),
+                "balance": 0.0
+            }
+            for number in numbers
+        ]
+
+        cards = await insert_cards(rows, db)
+        await insert_card_directory_entries([
+            {"number": card.number, "card_id": card.id, "wallet_id": wallet.id, "user_id": user.id,
+             "holder_name": f"{user.first_name} {user.last_name}"}
+            for card in cards
+        ], db)
+        await db.commit()
+
+        return {
+            "issued": len(rows),
+            "cards": [Card(**row).json() for row in rows]
+        }
+
+    @staticmethod
+    async def delete_card_logic(user: User, card_number:str, db: AsyncSession) -> dict:
+        card = await get_card_by_number(user, card_number, db)
         if not card:
             raise card_not_found
 
         if card.balance > 0:
             raise cannot_delete_card_with_balance
 
-        db.delete(card)
-        db.commit()
+        await detach_card_history(card, db)
+        await detach_card_autopay(card.id, db)
+        await delete_rollups(card.id, db)
+        await db.delete(card)
+        await db.commit()
+        CardDirectoryService.invalidate(card_number)
 
         return{
             "status": "deleted",
@@ -70,42 +205,84 @@ class CardsService:
 
 
     @staticmethod
-    def transfer_money_logic(transfer: TransferRequest, user: User, db: Session):
-        receiver = get_user_by_card_number(transfer.to_card_number, db)
-        if not receiver:
-            raise user_not_found
-
-        sender_card: Card = get_card_by_number(user, transfer.from_card_number, db)
-        receiver_card: Card = get_card_by_number(receiver, transfer.to_card_number, db)
-
-        if not sender_card or not receiver_card:
+    async def transfer_money_logic(transfer: TransferRequest, user: User, db: AsyncSession, commit: bool = True):
+        # both ends in one directory lookup (usually none, they are cached), balances are then updated by the resolved id
+        cards = await CardDirectoryService.resolve([transfer.from_card_number, transfer.to_card_number], db)
+        sender = cards.get(transfer.from_card_number)
+        receiver = cards.get(transfer.to_card_number)
+        if sender is None or sender.user_id != user.id or receiver is None:
             raise card_not_found
 
-        if sender_card.balance < transfer.amount:
+        # balances are checked and moved by conditional updates, so concurrent transfers never lose an update
+        sender_card = await debit_card(transfer.amount, db, number=sender.number, card_id=sender.card_id)
+        if not sender_card:
+            await db.rollback()
+            card = await get_card_by_number(user, transfer.from_card_number, db)
+            if not card or card.id != sender.card_id:
+                CardDirectoryService.invalidate(transfer.from_card_number)
+                raise card_not_found
             raise forbidden_wallet_action("Not enough funds")
 
-        sender_card.balance -= transfer.amount
-        receiver_card.balance += transfer.amount
+        receiver_card = await credit_card(transfer.amount, db, number=receiver.number, card_id=receiver.card_id)
+        if not receiver_card:
+            await db.rollback()
+            CardDirectoryService.invalidate(transfer.to_card_number)
+            raise card_not_found
 
         history_record = TransferHistory(
             transfer_type=TransactionType.TRANSFER,
-            from_user_card_number=sender_card.number,
-            from_user=f"{sender_card.cardholder_name} {sender_card.cardholder_surname}",
-            to_user_card_number=receiver_card.number,
-            to_user=f"{receiver_card.cardholder_name} {receiver_card.cardholder_surname}",
+            from_card_id=sender_card.id,
+            to_card_id=receiver_card.id,
             amount=transfer.amount
         )
 
         db.add(history_record)
-        db.commit()
-        db.refresh(sender_card)
-        db.refresh(receiver_card)
+        await RollupsService.record(history_record, db)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
 
         return history_record
 
     @staticmethod
-    def get_card_info_logic(user: User, db: Session) -> list[dict]:
-        cards = get_cards(user, db)
+    async def batch_transfer_logic(request: BatchTransferRequest, user: User, db: AsyncSession, commit: bool = True) -> dict:
+        numbers = list({number for transfer in request.transfers for number in (transfer.from_card_number, transfer.to_card_number)})
+
+        for _ in range(settings.BATCH_TRANSFER_RETRIES):
+            cards = {card.number: card for card in await get_cards_by_numbers(numbers, db)}
+            results, deltas, history_rows = plan_batch_transfers(request.transfers, cards, user, datetime.now())
+            failed = sum(result["status"] == "failed" for result in results)
+
+            if failed and request.mode == "atomic":
+                await db.rollback()
+                raise batch_rejected([result if result["status"] == "failed" else {**result, "status": "skipped"} for result in results])
+
+            # the whole batch is one transaction: balances, history and rollups change together or not at all
+            if history_rows:
+                if await apply_card_deltas(deltas, db) != set(deltas):
+                    # a concurrent operation drained a card after it was read, plan again on fresh balances
+                    await db.rollback()
+                    continue
+
+                await insert_transfer_history(history_rows, db)
+                await RollupsService.record_many(history_rows, db)
+                if commit:
+                    await db.commit()
+
+            return {
+                "mode": request.mode,
+                "posted": len(history_rows),
+                "failed": failed,
+                "results": results
+            }
+
+        traceBack(f"Batch of {len(request.transfers)} transfers gave up after {settings.BATCH_TRANSFER_RETRIES} attempts", type=TrackType.ERROR)
+        raise forbidden_wallet_action("Balances kept changing during the batch, try again")
+
+    @staticmethod
+    async def get_card_info_logic(user: User, db: AsyncSession) -> list[CardInfo]:
+        cards = await get_cards(user, db)
         if not cards:
             raise user_not_found
 
@@ -123,28 +300,63 @@ class CardsService:
         ]
 
     @staticmethod
-    def get_transfer_history_logic(card_number: str, user: User, db: Session) -> dict[str, list]:
-        card = get_card_by_number(user, card_number, db)
+    async def get_transfer_history_logic(request: CardHistoryRequest, user: User, db: AsyncSession) -> HistoryPage:
+        card = await get_card_by_number(user, request.card_number, db)
         if not card:
             raise card_not_found
 
-        records = get_card_transfer_history_records(card, db)
+        try:
+            transfer_types = [TransactionType[name] for name in request.transfer_types or []]
+        except KeyError as e:
+            raise bad_requset(f"Unknown transfer type {e}")
+
+        # one extra row tells whether there is a next page
+        records = await get_card_transfer_history_page(
+            card, db, request.limit + 1,
+            after=decode_cursor(request.cursor) if request.cursor else None,
+            direction=request.direction,
+            transfer_types=transfer_types,
+            date_from=request.date_from,
+            date_to=request.date_to,
+            amount_min=request.amount_min,
+            amount_max=request.amount_max
+        )
+
+        next_cursor = None
+        if len(records) > request.limit:
+            records = records[:request.limit]
+            next_cursor = encode_cursor(records[-1].time, records[-1].id)
 
         result = []
         for record in records:
             direction = (
-                "out" if record.from_user_card_number == card.number else "in"
+                "out" if record.from_card_id == card.id else "in"
             )
 
             result.append({
                 "direction": direction,
                 "from": record.from_user,
-                "from_card_number": record.from_user_card_number,
+                "from_card_number": record.from_card_number,
                 "to": record.to_user,
-                "to_card_number": record.to_user_card_number,
+                "to_card_number": record.to_card_number,
                 "transfer_type": record.transfer_type.name,
                 "amount": record.amount,
                 "time": record.time.isoformat()
             })
 
-        return {"history": result}
\ No newline at end of file
+        return {"history": result, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def export_transfer_history_logic(request: CardHistoryExportRequest, user: User, db: AsyncSession) -> StreamingResponse:
+        card = await get_card_by_number(user, request.card_number, db)
+        if not card:
+            raise card_not_found
+
+        media_type = "text/csv" if request.format == "csv" else "application/x-ndjson"
+        filename = f"history_{card.number[-4:]}.{request.format}"
+
+        return StreamingResponse(
+            history_export_chunks(card.id, request.format, request.date_from, request.date_to),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
@@ -0,0 +1,49 @@
+import hmac
+from hashlib import sha256
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+
+from src.models.credentials import CredentialToken, CredentialPurpose
+from src.db.queries import get_credential, delete_user_credentials, delete_expired_credentials
+from src.core.config import settings
+
+def hash_token(token: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), sha256).hexdigest()
+
+class CredentialService:
+    """Short-lived secrets (password reset tokens, 2FA codes) stored only as keyed hashes."""
+
+    @staticmethod
+    def issue(user_id: int, purpose: CredentialPurpose, token: str, ttl: timedelta, db: Session) -> CredentialToken:
+        delete_user_credentials(user_id, purpose, db)
+
+        credential = CredentialToken(
+            user_id=user_id,
+            purpose=purpose,
+            token_hash=hash_token(token),
+            expires_at=datetime.now(timezone.utc).replace(tzinfo=None) + ttl
+        )
+
+        db.add(credential)
+        return credential
+
+    @staticmethod
+    def find(purpose: CredentialPurpose, token: str, db: Session, user_id: int | None = None) -> CredentialToken | None:
+        return get_credential(purpose, hash_token(token), db, user_id)
+
+    @staticmethod
+    def consume(credential: CredentialToken, db: Session) -> bool:
+        return db.query(CredentialToken).filter(CredentialToken.id == credential.id).delete(synchronize_session=False) == 1
+
+    @staticmethod
+    def sweep_expired(db: Session, chunk_size: int = 1000) -> int:
+        threshold = datetime.now(timezone.utc).replace(tzinfo=None)
+        removed = 0
+
+        while True:
+            deleted = delete_expired_credentials(db, threshold, chunk_size)
+            db.commit()
+            removed += deleted
+
+            if deleted < chunk_size:
+                return removed
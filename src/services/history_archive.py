@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from src.models.archive import HistoryArchive, archive_table_name, history_archive_table
+from src.db.queries import get_oldest_history_time, get_history_archive, move_history_to_archive, add_rows_to_history_archive
+from src.core.config import settings
+from src.core.traceback import traceBack
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(moment: datetime) -> datetime:
+    return month_start(month_start(moment) + timedelta(days=32))
+
+class HistoryArchiveService:
+    """
+    Keeps transfer_history limited to the last HISTORY_HOT_DAYS, so the hot table and its indexes stay in page cache.
+    Whole months older than that move into per-month archive tables listed in history_archives.
+    """
+
+    @staticmethod
+    def archive(db: Session, now: datetime | None = None, hot_days: int = settings.HISTORY_HOT_DAYS,
+                chunk_size: int = settings.HISTORY_ARCHIVE_CHUNK_SIZE) -> int:
+        boundary = month_start((now or datetime.now()) - timedelta(days=hot_days))
+        moved = 0
+
+        while True:
+            oldest = get_oldest_history_time(db)
+            if oldest is None or oldest >= boundary:
+                return moved
+
+            period_start = month_start(oldest)
+            table_name = archive_table_name(period_start)
+            table = history_archive_table(table_name)
+
+            archive = get_history_archive(table_name, db)
+            if archive is None:
+                table.create(bind=db.connection(), checkfirst=True)
+                archive = HistoryArchive(table_name=table_name, period_start=period_start,
+                                         period_end=next_month(period_start), rows=0, last_id=0)
+                db.add(archive)
+                db.commit()
+
+            # every chunk moves in its own transaction: readers see a row either in the hot table or in the archive
+            while True:
+                ids = move_history_to_archive(table, archive.period_start, archive.period_end, chunk_size, db)
+                if ids:
+                    add_rows_to_history_archive(archive.id, len(ids), max(ids), db)
+                db.commit()
+                moved += len(ids)
+
+                if len(ids) < chunk_size:
+                    break
+
+            traceBack(f"Archived transfer history of {period_start:%Y-%m} into {table_name}")
@@ -0,0 +1,79 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.user import User
+from src.models.wallet_history import TransferHistory
+from src.schemas.cards import CardSummaryRequest
+from src.db.queries import reset_rollups, add_history_range_to_rollups, get_history_archives
+from src.models.archive import history_archive_table
+from src.db.async_queries import add_to_rollups, get_rollups, get_card_by_number
+from src.core.exceptions import card_not_found
+
+class RollupsService:
+    """Monthly totals of the card history, kept next to it so summaries cost O(months) instead of O(transfers)."""
+
+    @staticmethod
+    async def record(history_record: TransferHistory, db: AsyncSession) -> None:
+        """Adds a new history record to the rollups. Must run in the transaction which inserts the record."""
+        if history_record.time is None:
+            history_record.time = datetime.now()
+
+        await RollupsService.record_many([{
+            "transfer_type": history_record.transfer_type,
+            "from_card_id": history_record.from_card_id,
+            "to_card_id": history_record.to_card_id,
+            "amount": history_record.amount,
+            "time": history_record.time
+        }], db)
+
+    @staticmethod
+    async def record_many(history_rows: list[dict], db: AsyncSession) -> None:
+        """Adds history rows (dicts with transfer_type, from/to_card_id, amount and time) in one upsert."""
+        totals: dict[tuple, list[float]] = {}
+        for row in history_rows:
+            for direction, card_id in (("out", row["from_card_id"]), ("in", row["to_card_id"])):
+                if card_id is None:
+                    continue
+                total = totals.setdefault((card_id, row["time"].strftime("%Y-%m"), row["transfer_type"], direction), [0, 0])
+                total[0] += row["amount"]
+                total[1] += 1
+
+        if totals:
+            await add_to_rollups([
+                {"card_id": card_id, "month": month, "transfer_type": transfer_type, "direction": direction,
+                 "total": total, "count": count}
+                for (card_id, month, transfer_type, direction), (total, count) in totals.items()
+            ], db)
+
+    @staticmethod
+    def rebuild(db: Session, chunk_size: int = 10000) -> int:
+        # emptying and reading the last id in one transaction: newer records are rolled up by record() only
+        last_id = reset_rollups(db)
+        db.commit()
+
+        for after_id in range(0, last_id, chunk_size):
+            add_history_range_to_rollups(db, after_id, after_id + chunk_size)
+            db.commit()
+
+        # archives are never written after they are filled
+        for archive in get_history_archives(db):
+            for after_id in range(0, archive.last_id, chunk_size):
+                add_history_range_to_rollups(db, after_id, after_id + chunk_size, history_archive_table(archive.table_name))
+                db.commit()
+
+        return last_id
+
+    @staticmethod
+    async def summary(request: CardSummaryRequest, user: User, db: AsyncSession) -> dict:
+        card = await get_card_by_number(user, request.card_number, db)
+        if not card:
+            raise card_not_found
+
+        months: dict[str, dict] = {}
+        for rollup in await get_rollups(card.id, db, request.month_from, request.month_to):
+            month = months.setdefault(rollup.month, {"month": rollup.month, "spent": {}, "received": {}})
+            side = month["spent"] if rollup.direction == "out" else month["received"]
+            side[rollup.transfer_type.name] = rollup.total
+
+        return {"card_number": card.number, "months": list(months.values())}
@@ -1,19 +1,20 @@
-from sqlalchemy import exists
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from src.core.exceptions import user_not_found, forbidden_wallet_action, card_not_found, saving_account_not_found ,cannot_delete_saving_account_with_balance
-from src.db.queries import get_wallet, get_cards, get_card_by_id, get_saving_accounts, get_saving_account_by_id
+from src.db.async_queries import get_wallet, get_cards, get_card_by_id, get_saving_accounts, get_saving_account_by_id, debit_card, credit_card, debit_saving_account, credit_saving_account, detach_saving_account_history
 from src.models.user import User
 from src.models.savings import Saving_account
-from src.models.wallet_history import TransferHistory, TransactionType
+from src.models.wallet_history import TransferHistory, TransactionType, CounterpartyType
 from src.schemas.savings import Saving_Account_creation, Saving_Account_out
+from src.services.rollups import RollupsService
 
 
 class SavingsService:
     @staticmethod
-    def create_saving_account(user: User, data: Saving_Account_creation, db: Session) -> dict:
-        wallet = get_wallet(user, db)
+    async def create_saving_account(user: User, data: Saving_Account_creation, db: AsyncSession) -> dict:
+        wallet = await get_wallet(user, db)
         if not wallet:
             raise user_not_found
 
@@ -24,8 +25,8 @@ class SavingsService:
         )
 
         db.add(new_saving_account)
-        db.commit()
-        db.refresh(new_saving_account)
+        await db.commit()
+        await db.refresh(new_saving_account)
 
         return {
             "id": new_saving_account.id,
@@ -35,115 +36,96 @@ class SavingsService:
         }
 
     @staticmethod
-    def get_user_saving_accounts(user: User, db: Session) -> List[Saving_Account_out]:
-        wallet = get_wallet(user, db)
+    async def get_user_saving_accounts(user: User, db: AsyncSession) -> List[Saving_Account_out]:
+        wallet = await get_wallet(user, db)
         if not wallet:
             raise user_not_found
 
-        accounts = db.query(Saving_account).filter(Saving_account.wallet_id == wallet.id).all()
+        # plain rows are encoded straight to JSON, no ORM objects are built
+        accounts = await db.execute(
+            select(Saving_account.id, Saving_account.name, Saving_account.balance, Saving_account.goal,
+                   (Saving_account.goal - Saving_account.balance).label("remain"))
+            .where(Saving_account.wallet_id == wallet.id)
+        )
 
-        return [
-            {
-                "id": account.id,
-                "name": account.name,
-                "balance": account.balance,
-                "goal": account.goal,
-                "remain": (account.goal - account.balance)
-            }
-            for account in accounts
-        ]
+        return [account._asdict() for account in accounts]
 
 
 
     @staticmethod
-    def add_funds(data, user: User, db: Session) -> dict:
-
-        wallet = get_wallet(user, db)
-        saving_account = get_saving_account_by_id(user, data.saving_account_id, db)
-        card = get_card_by_id(user, data.card_id, db)
-
-        if not wallet:
-            raise user_not_found
-
+    async def add_funds(data, user: User, db: AsyncSession, commit: bool = True) -> dict:
+        card = await debit_card(data.amount, db, card_id=data.card_id, owner=user)
         if not card:
-            raise card_not_found
-
-        if not saving_account:
-            saving_account_not_found
-
-        if card.balance < data.amount:
+            await db.rollback()
+            if not await get_card_by_id(user, data.card_id, db):
+                raise card_not_found
             raise forbidden_wallet_action("Not enough funds")
 
-        card.balance -= data.amount
-        saving_account.balance += data.amount
+        saving_account = await credit_saving_account(user, data.saving_account_id, data.amount, db)
+        if not saving_account:
+            await db.rollback()
+            raise saving_account_not_found
 
         history_record = TransferHistory(
             transfer_type=TransactionType.SAVINGS_TOPUP,
-            from_user_card_number=card.number,
-            from_user=f"{card.cardholder_name} {card.cardholder_surname}",
-            to_user_card_number=None,
-            to_user=f"Saving Account - {saving_account.name}",
+            from_card_id=card.id,
+            counterparty_type=CounterpartyType.SAVING_ACCOUNT,
+            counterparty_id=saving_account.id,
             amount=data.amount
         )
 
         db.add(history_record)
-
-        db.commit()
-        db.refresh(saving_account)
-        db.refresh(card)
+        await RollupsService.record(history_record, db)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
 
         return {"message": f"Top up for {data.amount}"}
 
     @staticmethod
-    def take_funds(data, user: User, db: Session) -> dict:
-
-        wallet = get_wallet(user, db)
-        saving_account = get_saving_account_by_id(user, data.saving_account_id, db)
-        card = get_card_by_id(user, data.card_id, db)
-
-        if not wallet:
-            raise user_not_found
-
-        if not card:
-            raise card_not_found
-
+    async def take_funds(data, user: User, db: AsyncSession, commit: bool = True) -> dict:
+        saving_account = await debit_saving_account(user, data.saving_account_id, data.amount, db)
         if not saving_account:
-            saving_account_not_found
-
-        if saving_account.balance < data.amount:
+            await db.rollback()
+            if not await get_saving_account_by_id(user, data.saving_account_id, db):
+                raise saving_account_not_found
             raise forbidden_wallet_action("Not enough funds")
 
-        card.balance += data.amount
-        saving_account.balance -= data.amount
+        card = await credit_card(data.amount, db, card_id=data.card_id, owner=user)
+        if not card:
+            await db.rollback()
+            raise card_not_found
 
         history_record = TransferHistory(
             transfer_type=TransactionType.SAVINGS_WITHDRAW,
-            from_user_card_number=None,
-            from_user=f"Saving Account - {saving_account.name}",
-            to_user_card_number=card.number,
-            to_user=f"{card.cardholder_name} {card.cardholder_surname}",
+            to_card_id=card.id,
+            counterparty_type=CounterpartyType.SAVING_ACCOUNT,
+            counterparty_id=saving_account.id,
             amount=data.amount
         )
 
         db.add(history_record)
-
-        db.commit()
-        db.refresh(saving_account)
-        db.refresh(card)
+        await RollupsService.record(history_record, db)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
 
         return {"message": f"Decreased by {data.amount}"}
 
-    def delete_saving_account_logic(user: User, saving_account_id: int, db: Session) -> dict:
-        saving_account = get_saving_account_by_id(user, saving_account_id, db)
+    async def delete_saving_account_logic(user: User, saving_account_id: int, db: AsyncSession) -> dict:
+        saving_account = await get_saving_account_by_id(user, saving_account_id, db)
 
         if not saving_account:
-            saving_account_not_found
+            raise saving_account_not_found
 
         if saving_account.balance > 0:
             raise cannot_delete_saving_account_with_balance
 
-        db.delete(saving_account)
-        db.commit()
+        await detach_saving_account_history(saving_account, db)
+        await db.delete(saving_account)
+        await db.commit()
 
         return {
             "status": "deleted",
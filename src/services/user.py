@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from datetime import timedelta, datetime, timezone
 from urllib.parse import urljoin, urlencode
 from secrets import token_urlsafe
 from typing import Any
@@ -8,19 +9,36 @@ from typing import Any
 from src.schemas.user import UserCreate, UserTemp, UserPasswordReset
 from src.models.user import User, UnverifiedUser
 from src.models.wallet import Wallet
-from src.db.queries import is_user_existing, is_code_valid, get_unverified_user
-from src.api.utils.auth import create_verification_code
-from src.api.utils.mail import send_email, EmailType
+from src.db.queries import is_user_existing, is_code_valid, get_unverified_user, delete_expired_users
+from src.api.utils.auth import create_verification_code, principal_cache
+from src.api.utils.mail import queue_email, EmailType
+from src.api.utils.outbox import outbox_workers
+from src.api.utils.password import password_hasher
 from src.models.cards import Card
-from src.db.queries import get_cards, get_user_by_reset_token, validate_token
+from src.db.queries import get_user_by_id
+from src.db import async_queries
+from src.models.credentials import CredentialToken, CredentialPurpose
+from src.services.credentials import CredentialService
 from src.core.exceptions import user_exists_exception, code_verification_exception, credentials_exception, bad_requset
 from src.services.base_user import BaseUserService
 from src.core.traceback import traceBack, TrackType
 from src.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class UserService(BaseUserService):
+    @staticmethod
+    def sweep_unverified(db: Session, chunk_size: int = 1000) -> int:
+        # created_at is filled by sqlite CURRENT_TIMESTAMP, which is UTC
+        threshold = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=settings.UNVERIFIED_USER_TTL_HOURS)
+        removed = 0
+
+        while True:
+            deleted = delete_expired_users(db, threshold, chunk_size)
+            db.commit()
+            removed += deleted
+
+            if deleted < chunk_size:
+                return removed
+
     @staticmethod
     def check_availability(payload: dict[str, str], db: Session) -> dict[str, bool]:
         fields_to_check = {
@@ -55,22 +73,28 @@ class UserService(BaseUserService):
         )
         
         db.add(temp_user)
+        queue_email(temp_user.email, "Email Verification", EmailType.REGISTRATION, db, code=verification_code)
 
         try:
-            send_email(temp_user.email, "Email Verification", EmailType.REGISTRATION, code=verification_code)
+            db.commit()
         except Exception as e:
             traceBack(f"{e}", type=TrackType.ERROR)
             db.rollback()
             raise bad_requset()
 
-        db.commit()
-        db.refresh(temp_user)
+        outbox_workers.notify()
 
     @staticmethod
-    def verify_email(user_data: UserCreate, db: Session):
-        if not is_code_valid(user_data.email, user_data.verification_code, db):
+    async def verify_email(user_data: UserCreate, db: Session):
+        if not await run_in_threadpool(is_code_valid, user_data.email, user_data.verification_code, db):
             raise code_verification_exception
 
+        hashed_password: str = await password_hasher.hash(user_data.password)
+
+        await run_in_threadpool(UserService.create_verified_user, user_data, hashed_password, db)
+
+    @staticmethod
+    def create_verified_user(user_data: UserCreate, hashed_password: str, db: Session):
         temp_user = get_unverified_user(user_data.email, db)
 
         new_user = User(
@@ -84,7 +108,7 @@ class UserService(BaseUserService):
             city=user_data.city,
             state=user_data.state,
             post_code=user_data.post_code,
-            hashed_password=pwd_context.hash(user_data.password)
+            hashed_password=hashed_password
         )
 
         db.add(new_user)
@@ -102,11 +126,11 @@ class UserService(BaseUserService):
         db.refresh(new_wallet)
 
     @staticmethod
-    def get_user_base_data(user: User, db: Session) -> dict[str, Any]:
+    async def get_user_base_data(user: User, db: AsyncSession) -> dict[str, Any]:
         if not user:
             raise credentials_exception()
         
-        cards: list[Card] = get_cards(user, db)
+        cards: list[Card] = await async_queries.get_cards(user, db)
 
         data = {
             "name": user.first_name,
@@ -133,11 +157,8 @@ class UserService(BaseUserService):
         
         reset_token: str = token_urlsafe(32)
 
-        while get_user_by_reset_token(reset_token, db) != None:
-            reset_token: str = token_urlsafe(32)
-        
-        user.reset_token = reset_token
-        user.reset_token_created_at = datetime.now(timezone.utc)
+        CredentialService.issue(user.id, CredentialPurpose.PASSWORD_RESET, reset_token,
+                                timedelta(minutes=settings.RESET_TOKEN_EXPIRE_MINUTES), db)
         base_url: str = None
 
         if settings.IS_DEPLOYED:
@@ -145,26 +166,39 @@ class UserService(BaseUserService):
         else:
             base_url = settings.ORIGINS[0]
             
-        link = urljoin(base_url, "/reset") + "?" + urlencode({"token": user.reset_token})
-
-        send_email(user.email, "Password reset", EmailType.PASSWORD_RESET, link=link)
+        link = urljoin(base_url, "/reset") + "?" + urlencode({"token": reset_token})
 
+        queue_email(user.email, "Password reset", EmailType.PASSWORD_RESET, db, link=link)
         db.commit()
-        db.refresh(user)
+
+        outbox_workers.notify()
 
         return {"message": "Email sended"}
 
     @staticmethod
-    def reset_password_confirm(password_form: UserPasswordReset, db: Session) -> dict[str, Any]:
-        user: User = get_user_by_reset_token(password_form.token, db)
+    async def reset_password_confirm(password_form: UserPasswordReset, db: Session) -> dict[str, Any]:
+        credential: CredentialToken = await run_in_threadpool(CredentialService.find, CredentialPurpose.PASSWORD_RESET,
+                                                              password_form.token, db)
         
-        if not validate_token(user, db):
+        if not credential:
+            raise credentials_exception("Reset token is not valid")
+
+        hashed_password: str = await password_hasher.hash(password_form.new_password)
+
+        return await run_in_threadpool(UserService.change_password, credential, hashed_password, db)
+
+    @staticmethod
+    def change_password(credential: CredentialToken, hashed_password: str, db: Session) -> dict[str, Any]:
+        user: User = get_user_by_id(credential.user_id, db)
+
+        if not user or not CredentialService.consume(credential, db):
+            db.rollback()
             raise credentials_exception("Reset token is not valid")
 
-        user.hashed_password = pwd_context.hash(password_form.new_password)
-        user.reset_token = None
-        user.reset_token_created_at = None
+        user.hashed_password = hashed_password
         db.commit()
         db.refresh(user)
 
+        principal_cache.invalidate_user(user.email)
+
         return {"message": "Password changed"}
\ No newline at end of file
@@ -1,13 +1,25 @@
 import pytest
 import sys
 import os
+import asyncio
+from copy import copy
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Awaitable, Callable, Iterable, Iterator
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from requests import Session
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.core.config import settings
+from sqlalchemy.orm import sessionmaker, Session as ORMSession
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from src.core.config import settings, ENGINE_PROFILES
+from src.db.base import Base
+from src.db.session import build_async_engine
+from src.models.user import User
+from src.models.wallet import Wallet
+from src.models.cards import Card
 
 import utils
 
@@ -44,4 +56,61 @@ def test_user(db):
 
     yield user
 
-    utils.clean_test_user(user, db)
\ No newline at end of file
+    utils.clean_test_user(user, db)
+
+CARD_DEFAULTS: dict[str, Any] = {
+    "cardholder_name": "N", "cardholder_surname": "S", "expiration_date": "01/30", "cvv": "000", "balance": 0, "wallet_id": 1
+}
+
+def seed_database(path: Path, users: int | Iterable[int] = 1, cards: Iterable[dict] = (), rows: Iterable[Any] = ()) -> Path:
+    """
+    Creates a database of the models with users (and a wallet of the same id for each), their cards and any
+    other rows. A card is a dict of Card columns, at least id and number, the rest defaults to CARD_DEFAULTS.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    with sessionmaker(bind=engine)() as db:
+        for user_id in (range(1, users + 1) if isinstance(users, int) else users):
+            db.add(User(id=user_id, first_name="N", last_name="S", email=f"user{user_id}@localhost.me",
+                        phone_number=f"+22{user_id:07d}", date_of_birth=date(1999, 1, 5), social_security=f"{user_id:08d}",
+                        address="A", city="C", state="S", post_code="00-000", hashed_password="-"))
+            db.add(Wallet(id=user_id, user_id=user_id))
+        db.add_all(Card(**{**CARD_DEFAULTS, **card}) for card in cards)
+        db.add_all(rows)
+        db.commit()
+
+    engine.dispose()
+    return path
+
+@pytest.fixture
+def seeded_database(tmp_path) -> Callable[..., Path]:
+    return lambda **seed: seed_database(tmp_path / "bank.db", **seed)
+
+@contextmanager
+def sync_session(path: Path) -> Iterator[ORMSession]:
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with sessionmaker(bind=engine)() as db:
+            yield db
+    finally:
+        engine.dispose()
+
+def async_session_factory(path: Path) -> tuple[AsyncEngine, async_sessionmaker]:
+    """Async engine of the app's WAL profile on the database, busy timeout long enough for concurrent tests."""
+    profile = copy(ENGINE_PROFILES["wal"])
+    profile.URL = f"sqlite:///{path}"
+    profile.BUSY_TIMEOUT = 30000
+    engine = build_async_engine(profile)
+    return engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+def run_async(path: Path, main: Callable[[async_sessionmaker], Awaitable[Any]]) -> Any:
+    """Runs main(SessionLocal) on a fresh async engine of the database and disposes the engine afterwards."""
+    async def runner():
+        engine, SessionLocal = async_session_factory(path)
+        try:
+            return await main(SessionLocal)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(runner())
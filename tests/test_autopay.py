@@ -0,0 +1,106 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from conftest import sync_session, async_session_factory, run_async
+from src.models.user import User
+from src.models.cards import Card
+from src.models.bills import Bills
+from src.models.rollups import SpendingRollup
+from src.models.wallet_history import TransferHistory, TransactionType, CounterpartyType
+from src.services.autopay import AutopayService
+from src.services.cards import CardsService
+
+NOW: datetime = datetime(2026, 6, 15, 12)
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(cards=[
+        {"id": 1, "number": "4000000000000001", "balance": 100},
+        {"id": 2, "number": "4000000000000002", "balance": 5}
+    ])
+
+def add_bills(path, bills: list[dict]) -> None:
+    with sync_session(path) as db:
+        db.add_all(Bills(wallet_id=1, name=f"bill {index}", **bill) for index, bill in enumerate(bills))
+        db.commit()
+
+def sweep(path, workers: int = 1, chunk_size: int = 2) -> list[dict]:
+    async def main():
+        # an engine per worker stands for separate app processes
+        engines = [async_session_factory(path) for _ in range(workers)]
+
+        async def run(SessionLocal):
+            async with SessionLocal() as db:
+                return await AutopayService.sweep(db, now=NOW, chunk_size=chunk_size)
+
+        results = await asyncio.gather(*(run(SessionLocal) for _, SessionLocal in engines))
+        for engine, _ in engines:
+            await engine.dispose()
+        return results
+
+    return asyncio.run(main())
+
+def test_sweep_pays_due_bills_in_due_order(database):
+    due = NOW - timedelta(days=1)
+    add_bills(database, [
+        {"amount": 30, "due_date": due - timedelta(days=3), "autopay_card_id": 1},
+        {"amount": 30, "due_date": due - timedelta(days=2), "autopay_card_id": 1},
+        {"amount": 50, "due_date": due - timedelta(days=1), "autopay_card_id": 1},
+        {"amount": 30, "due_date": due, "autopay_card_id": 1},
+        {"amount": 10, "due_date": due, "autopay_card_id": 2},
+        {"amount": 1, "due_date": NOW + timedelta(days=1), "autopay_card_id": 1},
+        {"amount": 1, "due_date": due, "autopay_card_id": None},
+        {"amount": 1, "due_date": due, "autopay_card_id": 1, "paid": True}
+    ])
+
+    [result] = sweep(database)
+
+    assert result == {"paid": 3, "amount": 90, "insufficient_funds": 2, "conflicts": 0}
+
+    with sync_session(database) as db:
+        paid = db.scalars(select(Bills.id).where(Bills.paid == True).order_by(Bills.id)).all()
+        history = db.scalars(select(TransferHistory).order_by(TransferHistory.id)).all()
+
+        # the 50 bill does not fit after the first two, the later 30 one still does
+        assert paid == [1, 2, 4, 8]
+        assert db.scalar(select(Card.balance).where(Card.id == 1)) == 10
+        assert db.scalar(select(Card.balance).where(Card.id == 2)) == 5
+        assert [(row.transfer_type, row.from_card_id, row.counterparty_type, row.counterparty_id) for row in history] == [
+            (TransactionType.BILL, 1, CounterpartyType.BILL, bill_id) for bill_id in (1, 2, 4)
+        ]
+        assert db.scalar(select(SpendingRollup.total).where(SpendingRollup.card_id == 1)) == 90
+
+    assert sweep(database) == [{"paid": 0, "amount": 0, "insufficient_funds": 2, "conflicts": 0}]
+
+def test_concurrent_sweeps_pay_every_bill_once(database):
+    add_bills(database, [
+        {"amount": 1, "due_date": NOW - timedelta(minutes=index), "autopay_card_id": 1 + index % 2}
+        for index in range(60)
+    ])
+
+    results = sweep(database, workers=4, chunk_size=7)
+
+    with sync_session(database) as db:
+        paid = db.scalar(select(func.count(Bills.id)).where(Bills.paid == True))
+        history = db.scalar(select(func.count(TransferHistory.id)))
+        balances = db.execute(select(Card.id, Card.balance).order_by(Card.id)).all()
+
+    # card 2 affords 5 of its 30 bills, and nobody is charged for a bill twice
+    assert paid == history == sum(result["paid"] for result in results) == 35
+    assert balances == [(1, 70), (2, 0)]
+
+def test_deleted_card_stops_autopay(database):
+    add_bills(database, [{"amount": 1, "due_date": NOW, "autopay_card_id": 2}])
+    async def delete(SessionLocal):
+        async with SessionLocal() as db:
+            card = await db.get(Card, 2)
+            card.balance = 0
+            await db.commit()
+            await CardsService.delete_card_logic(User(id=1), "4000000000000002", db)
+
+    run_async(database, delete)
+
+    assert sweep(database) == [{"paid": 0, "amount": 0, "insufficient_funds": 0, "conflicts": 0}]
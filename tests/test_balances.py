@@ -0,0 +1,99 @@
+import pytest
+import asyncio
+from random import Random
+from types import SimpleNamespace
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.cards import Card
+from src.models.savings import Saving_account
+from src.models.bills import Bills
+from src.models.wallet_history import TransferHistory
+from src.schemas.cards import TransferRequest
+from src.services.cards import CardsService
+from src.services.savings import SavingsService
+from src.services.bills import BillsService
+
+USERS: int = 6
+CARDS_PER_USER: int = 2
+START_BALANCE: int = 1000
+OPERATIONS: int = 600
+CONCURRENCY: int = 24
+
+@pytest.fixture
+def database(seeded_database):
+    users = range(1, USERS + 1)
+    return seeded_database(
+        users=USERS,
+        cards=[{"id": user_id * 10 + index, "number": f"40000000000{user_id:03d}{index:02d}", "cardholder_surname": str(user_id),
+                "balance": START_BALANCE, "wallet_id": user_id} for user_id in users for index in range(CARDS_PER_USER)],
+        rows=[row for user_id in users for row in (
+            Saving_account(id=user_id, name="goal", goal=10 ** 6, balance=0, wallet_id=user_id),
+            Bills(id=user_id, name="power", amount=150, due_date=datetime(2030, 1, 1), paid=False, wallet_id=user_id)
+        )]
+    )
+
+def money_supply(path) -> tuple[float, float]:
+    with sync_session(path) as db:
+        cards = db.scalar(select(func.sum(Card.balance)))
+        savings = db.scalar(select(func.sum(Saving_account.balance)))
+        bills = db.scalar(select(func.coalesce(func.sum(Bills.amount), 0)).where(Bills.paid.is_(True)))
+        lowest = min(db.scalar(select(func.min(Card.balance))), db.scalar(select(func.min(Saving_account.balance))))
+    return cards + savings + bills, lowest
+
+def test_concurrent_money_moves_conserve_supply(database):
+    random = Random(12)
+    card_numbers = {user_id: [f"40000000000{user_id:03d}{index:02d}" for index in range(CARDS_PER_USER)] for user_id in range(1, USERS + 1)}
+    outcome = {"ok": 0, "rejected": 0}
+
+    def operation():
+        user_id = random.randint(1, USERS)
+        user = User(id=user_id)
+        card_index = random.randrange(CARDS_PER_USER)
+        # amounts large enough to drain cards, so "not enough funds" races actually happen
+        amount = random.randint(1, 400)
+        kind = random.random()
+
+        if kind < 0.7:
+            target = random.choice(card_numbers[random.randint(1, USERS)])
+            request = TransferRequest(from_card_number=card_numbers[user_id][card_index], to_card_number=target, amount=amount)
+            return lambda db: CardsService.transfer_money_logic(request, user, db)
+        if kind < 0.85:
+            data = SimpleNamespace(amount=amount, saving_account_id=user_id, card_id=user_id * 10 + card_index)
+            return lambda db: SavingsService.add_funds(data, user, db)
+        if kind < 0.97:
+            data = SimpleNamespace(amount=amount, saving_account_id=user_id, card_id=user_id * 10 + card_index)
+            return lambda db: SavingsService.take_funds(data, user, db)
+        return lambda db: BillsService.pay_bill(user, user_id, card_numbers[user_id][card_index], db)
+
+    operations = [operation() for _ in range(OPERATIONS)]
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def main(SessionLocal):
+        async def run(call):
+            async with semaphore:
+                async with SessionLocal() as db:
+                    try:
+                        await call(db)
+                    except HTTPException as e:
+                        assert e.status_code == 403
+                        outcome["rejected"] += 1
+                        return
+                outcome["ok"] += 1
+
+        await asyncio.gather(*(run(call) for call in operations))
+
+    run_async(database, main)
+
+    supply, lowest = money_supply(database)
+    assert supply == USERS * CARDS_PER_USER * START_BALANCE
+    assert lowest >= 0
+    assert outcome["ok"] + outcome["rejected"] == OPERATIONS
+    assert outcome["ok"] > 0 and outcome["rejected"] > 0
+
+    with sync_session(database) as db:
+        assert db.scalar(select(func.count(TransferHistory.id))) == outcome["ok"]
@@ -0,0 +1,64 @@
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.cards import Card
+from src.models.rollups import SpendingRollup
+from src.models.wallet_history import TransferHistory
+from src.schemas.cards import BatchTransferRequest
+from src.services.cards import CardsService
+
+# card numbers by id, cards 1 and 2 belong to the user, card 3 to somebody else
+CARDS: dict[int, str] = {1: "4000000000000001", 2: "4000000000000002", 3: "4000000000000003"}
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(users=2, cards=[
+        {"id": card_id, "number": number, "balance": 100, "wallet_id": 1 if card_id < 3 else 2} for card_id, number in CARDS.items()
+    ])
+
+def batch(database, transfers: list[tuple[int, int, float]], mode: str) -> dict:
+    request = BatchTransferRequest(mode=mode, transfers=[
+        {"from_card_number": CARDS.get(sender, "4999999999999999"), "to_card_number": CARDS.get(receiver, "4999999999999999"), "amount": amount}
+        for sender, receiver, amount in transfers
+    ])
+
+    async def run(SessionLocal):
+        async with SessionLocal() as db:
+            return await CardsService.batch_transfer_logic(request, User(id=1), db)
+
+    return run_async(database, run)
+
+def state(database) -> tuple[dict[int, float], int, int]:
+    with sync_session(database) as db:
+        balances = dict(db.execute(select(Card.id, Card.balance)).all())
+        history = db.scalar(select(func.count(TransferHistory.id)))
+        rolled_up = db.scalar(select(func.coalesce(func.sum(SpendingRollup.count), 0)))
+    return balances, history, rolled_up
+
+def test_atomic_batch_posts_everything_in_order(database):
+    # card 2 can only pay card 3 with the money it receives earlier in the batch
+    result = batch(database, [(1, 2, 80), (2, 3, 150), (1, 3, 20)], "atomic")
+
+    assert result["posted"] == 3 and result["failed"] == 0
+    assert state(database) == ({1: 0, 2: 30, 3: 270}, 3, 6)
+
+def test_atomic_batch_is_rejected_as_a_whole(database):
+    with pytest.raises(HTTPException) as error:
+        batch(database, [(1, 2, 50), (3, 1, 10), (2, 3, 500), (1, 9, 1)], "atomic")
+
+    assert error.value.status_code == 403
+    assert [item["status"] for item in error.value.detail["results"]] == ["skipped", "failed", "failed", "failed"]
+    assert [item.get("reason") for item in error.value.detail["results"]][1:] == [
+        "Sender card not found", "Not enough funds", "Receiver card not found"
+    ]
+    assert state(database) == ({1: 100, 2: 100, 3: 100}, 0, 0)
+
+def test_best_effort_batch_posts_what_it_can(database):
+    result = batch(database, [(1, 3, 60), (1, 3, 60), (2, 1, 10), (1, 3, 50)], "best_effort")
+
+    assert [item["status"] for item in result["results"]] == ["posted", "failed", "posted", "posted"]
+    assert state(database) == ({1: 0, 2: 90, 3: 210}, 3, 6)
@@ -0,0 +1,88 @@
+import pytest
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import select, event
+
+from conftest import sync_session, async_session_factory
+from src.models.user import User
+from src.models.cards import Card
+from src.models.card_directory import CardDirectory
+from src.schemas.cards import TransferRequest
+from src.services.cards import CardsService
+from src.services.card_directory import card_directory_cache
+
+SENDER: str = "4000000000000001"
+RECEIVER: str = "4000000000000002"
+
+@pytest.fixture
+def database(seeded_database):
+    path = seeded_database(users=2, cards=[
+        {"id": 1, "number": SENDER, "cardholder_surname": "S1", "balance": 100, "wallet_id": 1},
+        {"id": 2, "number": RECEIVER, "cardholder_surname": "S2", "balance": 0, "wallet_id": 2}
+    ])
+    card_directory_cache.clear()
+    yield path
+    card_directory_cache.clear()
+
+def run(path, *operations):
+    engine, SessionLocal = async_session_factory(path)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async def main():
+        results = []
+        async with SessionLocal() as db:
+            for operation in operations:
+                statements.clear()
+                try:
+                    results.append((await operation(db), list(statements)))
+                except HTTPException as e:
+                    results.append((e, list(statements)))
+        await engine.dispose()
+        return results
+
+    return asyncio.run(main())
+
+def transfer(amount: float, sender: str = SENDER, user_id: int = 1):
+    request = TransferRequest(from_card_number=sender, to_card_number=RECEIVER, amount=amount)
+    return lambda db: CardsService.transfer_money_logic(request, User(id=user_id), db)
+
+def balances(path) -> list[float]:
+    with sync_session(path) as db:
+        return list(db.scalars(select(Card.balance).order_by(Card.id)).all())
+
+def test_directory_follows_cards(database):
+    with sync_session(database) as db:
+        rows = db.execute(select(CardDirectory.number, CardDirectory.card_id, CardDirectory.user_id, CardDirectory.holder_name)
+                          .order_by(CardDirectory.card_id)).all()
+        assert [tuple(row) for row in rows] == [(SENDER, 1, 1, "N S1"), (RECEIVER, 2, 2, "N S2")]
+
+        db.delete(db.get(Card, 2))
+        db.commit()
+        assert db.scalars(select(CardDirectory.number)).all() == [SENDER]
+
+def test_transfer_resolves_both_ends_once(database):
+    (first, first_statements), (second, second_statements), (foreign, _) = run(
+        database, transfer(10), transfer(5), transfer(1, sender=RECEIVER)
+    )
+
+    directory_lookups = lambda statements: [statement for statement in statements if "FROM card_directory" in statement]
+    assert first.amount == 10 and second.amount == 5
+    assert len(directory_lookups(first_statements)) == 1
+    # cached: no lookup at all, just the two balance updates and the history
+    assert directory_lookups(second_statements) == []
+    assert not any("JOIN wallets" in statement for statement in second_statements)
+    assert foreign.status_code == 406
+    assert balances(database) == [85, 15]
+
+def test_stale_entry_is_never_charged(database):
+    # another worker deleted the card and its id went to a different card, this process still has the old entry
+    card_directory_cache.set(RECEIVER, SimpleNamespace(number=RECEIVER, card_id=1, wallet_id=2, user_id=2, holder_name="N S2"))
+
+    (stale, _), (retried, _) = run(database, transfer(10), transfer(10))
+
+    assert stale.status_code == 406
+    assert retried.amount == 10
+    assert balances(database) == [90, 10]
@@ -0,0 +1,55 @@
+import pytest
+import asyncio
+
+from sqlalchemy import select, func
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.cards import Card
+from src.models.card_directory import CardDirectory
+from src.schemas.cards import CardIssueRequest
+from src.services.cards import CardsService, luhn_check_digit, card_number
+
+LEGACY_CARD: str = "4000000000012346"
+
+def luhn_valid(number: str) -> bool:
+    return luhn_check_digit(number[:-1]) == number[-1]
+
+@pytest.fixture
+def database(seeded_database):
+    # issued before the sequence existed, under the same prefix
+    return seeded_database(cards=[{"id": 1, "number": LEGACY_CARD}])
+
+def test_luhn_check_digit():
+    assert luhn_check_digit("7992739871") == "3"
+    assert luhn_valid("4111111111111111")
+    assert card_number("400000", 1) == "4000000000000010"
+
+def test_issued_cards_are_unique_and_luhn_valid(database):
+    user = User(id=1, first_name="N", last_name="S")
+
+    async def main(SessionLocal):
+        async def issue(count: int):
+            async with SessionLocal() as db:
+                return await CardsService.issue_cards_logic(CardIssueRequest(count=count), user, db)
+
+        async def create():
+            async with SessionLocal() as db:
+                return await CardsService.create_card_logic(user, db)
+
+        return await asyncio.gather(*(issue(count) for count in (120, 1, 300, 45)), create())
+
+    *batches, single = run_async(database, main)
+    numbers = [card["number"] for batch in batches for card in batch["cards"]] + [single["number"]]
+
+    assert [batch["issued"] for batch in batches] == [120, 1, 300, 45]
+    assert len(set(numbers)) == len(numbers) == 467
+    assert all(len(number) == 16 and number.startswith("400000") and luhn_valid(number) for number in numbers)
+    # the sequence starts after the numbers issued before it
+    assert min(numbers) > LEGACY_CARD
+
+    with sync_session(database) as db:
+        assert db.scalar(select(func.count(Card.id))) == 468
+        assert db.scalar(select(func.count(CardDirectory.number))) == 468
+        assert db.scalar(select(func.count(Card.id)).where(Card.last4 == func.substr(Card.number, -4))) == 468
+        assert db.scalar(select(func.sum(Card.balance)).where(Card.number.in_([number for number in numbers if number != single["number"]]))) == 0
@@ -0,0 +1,44 @@
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from conftest import sync_session, run_async
+from src.db.async_queries import get_card_by_last4
+from src.models.user import User
+from src.models.cards import Card
+from src.api.routes.cards import get_card
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(users=2, cards=[
+        {"id": card_id, "number": number, "wallet_id": wallet_id}
+        for card_id, number, wallet_id in ((1, "4000000000001111", 1), (2, "4000000000002222", 1),
+                                           (3, "5000000000002222", 1), (4, "4000000000003333", 2))
+    ])
+
+def test_last4_is_set_on_insert(database):
+    with sync_session(database) as db:
+        assert db.scalars(select(Card.last4).order_by(Card.id)).all() == ["1111", "2222", "2222", "3333"]
+
+    async def lookup(SessionLocal):
+        async with SessionLocal() as db:
+            return [await get_card_by_last4(User(id=1), last4, db) for last4 in ("2222", "3333")]
+
+    card, missing = run_async(database, lookup)
+
+    assert card.id == 2
+    assert missing is None
+
+def test_route_returns_404_for_unknown_digits(database):
+    async def main(SessionLocal):
+        async with SessionLocal() as db:
+            card = await get_card("1111", User(id=1), db)
+            with pytest.raises(HTTPException) as error:
+                await get_card("3333", User(id=1), db)
+        return card, error.value
+
+    card, error = run_async(database, main)
+
+    assert card["number"] == "4000000000001111"
+    assert error.status_code == 404
@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.rollups import SpendingRollup
+from src.models.archive import HistoryArchive
+from src.models.wallet_history import TransferHistory, TransactionType
+from src.schemas.cards import CardHistoryRequest
+from src.services.cards import CardsService, history_export_chunks
+from src.services.rollups import RollupsService
+from src.services.history_archive import HistoryArchiveService
+
+CARD_NUMBER: str = "4000000000000001"
+OTHER_CARD: str = "4000000000000002"
+NOW: datetime = datetime(2026, 6, 15, 12)
+HOT_DAYS: int = 90
+BOUNDARY: datetime = datetime(2026, 3, 1)
+ROWS: int = 400
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(
+        cards=[{"id": 1, "number": CARD_NUMBER}, {"id": 2, "number": OTHER_CARD, "cardholder_name": "O", "cardholder_surname": "T"}],
+        rows=[
+            TransferHistory(
+                transfer_type=TransactionType.BILL if index % 5 == 0 else TransactionType.TRANSFER,
+                from_card_id=1 if index % 3 != 0 else 2,
+                to_card_id=2 if index % 3 != 0 else 1,
+                amount=index,
+                # oldest first, pairs of rows share a timestamp
+                time=NOW - timedelta(days=(ROWS - index) // 2)
+            )
+            for index in range(ROWS)
+        ]
+    )
+
+def archive(path) -> int:
+    with sync_session(path) as db:
+        return HistoryArchiveService.archive(db, now=NOW, hot_days=HOT_DAYS, chunk_size=16)
+
+def snapshot(path, **filters) -> tuple[list[dict], str]:
+    async def read(SessionLocal):
+        pages, cursor = [], None
+        async with SessionLocal() as db:
+            while True:
+                request = CardHistoryRequest(card_number=CARD_NUMBER, cursor=cursor, limit=7, **filters)
+                page = await CardsService.get_transfer_history_logic(request, User(id=1), db)
+                pages.extend(page["history"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+
+        chunks = [chunk async for chunk in history_export_chunks(
+            1, "csv", filters.get("date_from"), filters.get("date_to"), session_factory=SessionLocal, chunk_size=16
+        )]
+        return pages, "".join(chunks)
+
+    return run_async(path, read)
+
+FILTERS: list[dict] = [
+    {},
+    {"direction": "in", "transfer_types": ["TRANSFER"]},
+    {"date_from": BOUNDARY - timedelta(days=20), "date_to": BOUNDARY + timedelta(days=20)},
+    {"date_to": datetime(2026, 1, 10), "amount_min": 50}
+]
+
+def test_archived_history_reads_the_same(database):
+    before = [snapshot(database, **filters) for filters in FILTERS]
+
+    assert archive(database) > 0
+    assert archive(database) == 0
+
+    with sync_session(database) as db:
+        oldest_hot = db.scalar(select(func.min(TransferHistory.time)))
+        archives = db.query(HistoryArchive).order_by(HistoryArchive.period_start).all()
+        archived = sum(archive.rows for archive in archives)
+
+        assert oldest_hot >= BOUNDARY
+        assert all(archive.period_end <= BOUNDARY for archive in archives)
+        assert archived + db.scalar(select(func.count(TransferHistory.id))) == ROWS
+
+    assert [snapshot(database, **filters) for filters in FILTERS] == before
+
+def test_rollups_and_deletes_reach_archives(database):
+    with sync_session(database) as db:
+        RollupsService.rebuild(db)
+        rollups = set(db.execute(select(SpendingRollup.card_id, SpendingRollup.month, SpendingRollup.total)).all())
+
+    archive(database)
+
+    with sync_session(database) as db:
+        RollupsService.rebuild(db, chunk_size=50)
+        assert set(db.execute(select(SpendingRollup.card_id, SpendingRollup.month, SpendingRollup.total)).all()) == rollups
+
+    async def delete(SessionLocal):
+        async with SessionLocal() as db:
+            await CardsService.delete_card_logic(User(id=1), OTHER_CARD, db)
+
+    run_async(database, delete)
+    rows, _ = snapshot(database)
+
+    assert len(rows) == ROWS
+    assert {(row["to"], row["to_card_number"]) for row in rows if row["direction"] == "out"} == {("O T", OTHER_CARD)}
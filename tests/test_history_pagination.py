@@ -0,0 +1,113 @@
+import pytest
+import csv
+import json
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from conftest import run_async
+from src.models.user import User
+from src.models.wallet_history import TransferHistory, TransactionType
+from src.schemas.cards import CardHistoryRequest
+from src.services.cards import CardsService, history_export_chunks, EXPORT_COLUMNS
+
+CARD_NUMBER: str = "4000000000000001"
+OTHER_CARD: str = "4000000000000002"
+START: datetime = datetime(2025, 1, 1)
+ROWS: int = 130
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(
+        cards=[{"id": 1, "number": CARD_NUMBER}, {"id": 2, "number": OTHER_CARD, "cardholder_name": "O", "cardholder_surname": "T"}],
+        rows=[
+            TransferHistory(
+                transfer_type=TransactionType.BILL if index % 5 == 0 else TransactionType.TRANSFER,
+                from_card_id=1 if index % 3 != 0 else 2,
+                to_card_id=2 if index % 3 != 0 else 1,
+                amount=index,
+                # pairs of rows share a timestamp, so the id tiebreaker matters
+                time=START + timedelta(hours=index // 2)
+            )
+            for index in range(ROWS)
+        ]
+    )
+
+def history(database, **filters) -> list[dict]:
+    async def walk(SessionLocal):
+        pages = []
+        cursor = filters.pop("cursor", None)
+        async with SessionLocal() as db:
+            while True:
+                request = CardHistoryRequest(card_number=CARD_NUMBER, cursor=cursor, **filters)
+                page = await CardsService.get_transfer_history_logic(request, User(id=1), db)
+                assert len(page["history"]) <= request.limit
+                pages.extend(page["history"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+        return pages
+
+    return run_async(database, walk)
+
+def test_pages_cover_history_once_newest_first(database):
+    rows = history(database, limit=17)
+
+    assert len(rows) == ROWS
+    assert sorted(row["amount"] for row in rows) == list(range(ROWS))
+    assert [row["time"] for row in rows] == sorted((row["time"] for row in rows), reverse=True)
+
+def test_filters_are_applied_on_every_page(database):
+    rows = history(database, limit=10, direction="in", transfer_types=["TRANSFER"], amount_min=10, amount_max=100)
+    expected = [index for index in range(10, 101) if index % 3 == 0 and index % 5 != 0]
+    assert sorted(row["amount"] for row in rows) == expected
+    assert all(row["direction"] == "in" and row["transfer_type"] == "TRANSFER" for row in rows)
+
+    rows = history(database, limit=10, date_from=START + timedelta(hours=10), date_to=START + timedelta(hours=20))
+    assert sorted(row["amount"] for row in rows) == list(range(20, 40))
+
+def test_invalid_cursor_and_type_are_rejected(database):
+    with pytest.raises(HTTPException) as error:
+        history(database, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        history(database, transfer_types=["GIFT"])
+    assert error.value.status_code == 400
+
+def export(database, export_format: str, **filters) -> list[str]:
+    async def collect(SessionLocal):
+        return [chunk async for chunk in history_export_chunks(
+            1, export_format, session_factory=SessionLocal, chunk_size=16, **filters
+        )]
+
+    return run_async(database, collect)
+
+def test_export_streams_csv_in_chunks(database):
+    chunks = export(database, "csv")
+    rows = list(csv.reader("".join(chunks).splitlines()))
+
+    assert len(chunks) > ROWS // 16
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert [int(float(row[-1])) for row in rows[1:]] == list(range(ROWS))
+    assert {row[3] for row in rows[1:]} == {"in", "out"}
+    assert {(row[4], row[5]) for row in rows[1:]} == {("N S", CARD_NUMBER), ("O T", OTHER_CARD)}
+
+def test_export_ndjson_respects_period(database):
+    lines = "".join(export(database, "ndjson", date_from=START + timedelta(hours=10), date_to=START + timedelta(hours=20))).splitlines()
+    rows = [json.loads(line) for line in lines]
+
+    assert [row["amount"] for row in rows] == list(range(20, 40))
+    assert rows[0]["from_card_number"] in (CARD_NUMBER, OTHER_CARD)
+
+def test_history_keeps_names_of_deleted_card(database):
+    async def delete(SessionLocal):
+        async with SessionLocal() as db:
+            await CardsService.delete_card_logic(User(id=1), OTHER_CARD, db)
+
+    run_async(database, delete)
+    rows = history(database, limit=50)
+
+    assert len(rows) == ROWS
+    assert {(row["from"], row["from_card_number"]) for row in rows if row["direction"] == "in"} == {("O T", OTHER_CARD)}
+    assert {(row["to"], row["to_card_number"]) for row in rows if row["direction"] == "out"} == {("O T", OTHER_CARD)}
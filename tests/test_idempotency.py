@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+from json import loads
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, insert
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.cards import Card
+from src.models.wallet_history import TransferHistory
+from src.models.idempotency import IdempotencyRecord
+from src.models.bills import Bills
+from src.schemas.bills import BillPay
+from src.api.routes.bills import pay_bill
+from src.schemas.cards import TransferRequest
+from src.services.cards import CardsService
+from src.api.utils.idempotency import IdempotencyStore, fingerprint
+
+SENDER: str = "4000000000000001"
+RECEIVER: str = "4000000000000002"
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(cards=[{"id": 1, "number": SENDER, "balance": 100}, {"id": 2, "number": RECEIVER, "balance": 100}])
+
+def state(path) -> tuple[float, int]:
+    with sync_session(path) as db:
+        return db.scalar(select(Card.balance).where(Card.id == 1)), db.scalar(select(func.count(TransferHistory.id)))
+
+def stored_responses(path) -> list:
+    with sync_session(path) as db:
+        return [loads(response) for response in db.scalars(select(IdempotencyRecord.response)).all()]
+
+def transfer(amount: float) -> TransferRequest:
+    return TransferRequest(from_card_number=SENDER, to_card_number=RECEIVER, amount=amount)
+
+async def run(store: IdempotencyStore, SessionLocal, key: str, request: TransferRequest, before=None):
+    user = User(id=1)
+    async with SessionLocal() as db:
+        async def operation():
+            if before is not None:
+                await before()
+            record = await CardsService.transfer_money_logic(request, user, db, commit=False)
+            return {"amount": record.amount, "history_id": record.id}
+
+        return await store.run(key, user, fingerprint("/card/transfer", request), db, operation)
+
+def test_duplicates_are_coalesced_and_replayed(database):
+    store = IdempotencyStore(max_size=16, ttl=3600)
+
+    async def main(SessionLocal):
+        first = await asyncio.gather(*(run(store, SessionLocal, "payroll-1", transfer(10)) for _ in range(8)))
+        later = await run(store, SessionLocal, "payroll-1", transfer(10))
+        # a fresh store stands for another worker, it finds the response in the table
+        other = await run(IdempotencyStore(max_size=16, ttl=3600), SessionLocal, "payroll-1", transfer(10))
+        with pytest.raises(HTTPException) as error:
+            await run(store, SessionLocal, "payroll-1", transfer(20))
+        return first, later, other, error.value
+
+    first, later, other, error = run_async(database, main)
+
+    assert all(result == first[0] for result in [*first, later, other])
+    assert store.executed == 1 and store.coalesced == 7
+    assert error.status_code == 422
+    assert state(database) == (90, 1)
+    assert stored_responses(database) == [first[0]]
+
+def test_failed_operation_does_not_claim_key(database):
+    store = IdempotencyStore(max_size=16, ttl=3600)
+
+    async def main(SessionLocal):
+        with pytest.raises(HTTPException):
+            await run(store, SessionLocal, "retry-me", transfer(1000))
+        return await run(store, SessionLocal, "retry-me", transfer(1000 - 950))
+
+    assert run_async(database, main)["amount"] == 50
+    assert state(database) == (50, 1)
+
+def test_duplicate_from_another_worker_is_rolled_back(database):
+    store = IdempotencyStore(max_size=16, ttl=3600)
+    request = transfer(10)
+
+    async def main(SessionLocal):
+        async def claim_first():
+            # another worker commits the same key after our lookup and before our commit
+            async with SessionLocal() as other:
+                await other.execute(insert(IdempotencyRecord).values(
+                    user_id=1, key="raced", fingerprint=fingerprint("/card/transfer", request),
+                    response='{"amount": 10.0, "history_id": 999}', expires_at=datetime(2100, 1, 1)
+                ))
+                await other.commit()
+
+        return await run(store, SessionLocal, "raced", request, before=claim_first)
+
+    assert run_async(database, main) == {"amount": 10.0, "history_id": 999}
+    assert state(database) == (100, 0)
+
+def test_routes_keep_idempotency_status_codes(seeded_database):
+    database = seeded_database(
+        cards=[{"id": 1, "number": SENDER, "balance": 100}, {"id": 2, "number": RECEIVER, "balance": 100}],
+        rows=[Bills(id=1, name="rent", amount=5, due_date=datetime(2100, 1, 1), paid=False, wallet_id=1)]
+    )
+
+    async def main(SessionLocal):
+        async with SessionLocal() as db:
+            paid = await pay_bill(BillPay(bill_id=1, card_number=SENDER), User(id=1), db, "bill-1")
+        async with SessionLocal() as db:
+            with pytest.raises(HTTPException) as error:
+                await pay_bill(BillPay(bill_id=1, card_number=RECEIVER), User(id=1), db, "bill-1")
+        return paid, error.value
+
+    paid, error = run_async(database, main)
+
+    assert paid["status"] == "paid"
+    assert error.status_code == 422
@@ -0,0 +1,136 @@
+import pytest
+
+from sqlalchemy import create_engine, inspect, text
+
+from src.db.base import Base
+from src.db.migrate import upgrade, current_version, check_schema, SchemaOutdatedError
+from src.db.migrations import load_migrations, backfill
+from src.db.migrations.versions import v0001_initial
+from src.models import user, wallet, cards, savings, bills, wallet_history, credentials, outbox, rollups, archive, idempotency, scheduler, card_directory, card_sequence
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+def schema(engine) -> dict[str, tuple]:
+    inspector = inspect(engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {(index["name"], tuple(index["column_names"]), bool(index["unique"])) for index in inspector.get_indexes(table)}
+        )
+        for table in inspector.get_table_names() if table != "schema_version"
+    }
+
+def test_migrations_reproduce_models(engine, tmp_path):
+    upgrade(engine)
+
+    models = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(bind=models)
+
+    assert schema(engine) == schema(models)
+    models.dispose()
+
+def test_upgrade_is_idempotent(engine):
+    latest = load_migrations()[-1].version
+
+    assert upgrade(engine) == list(range(1, latest + 1))
+    assert upgrade(engine) == []
+    assert current_version(engine) == latest
+
+def test_upgrade_adopts_database_created_before_migrations(engine):
+    v0001_initial.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO wallets (id, user_id) VALUES (1, 1)"))
+        connection.execute(text(
+            "INSERT INTO cards (cardholder_name, cardholder_surname, number, expiration_date, cvv, balance, wallet_id) "
+            "VALUES ('N', 'S', '4000000000000001', '01/30', '000', 50, 1)"
+        ))
+
+    upgrade(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("cards")}
+    assert {"ix_cards_number", "ix_cards_wallet_id"} <= indexes
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT count(*) FROM cards")) == 1
+
+def test_history_labels_become_ids(engine):
+    upgrade(engine, target=3)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO wallets (id, user_id) VALUES (1, 1)"))
+        connection.execute(text("INSERT INTO saving_accounts (id, name, balance, goal, wallet_id) VALUES (7, 'goal', 0, 100, 1)"))
+        connection.execute(text(
+            "INSERT INTO cards (id, cardholder_name, cardholder_surname, number, expiration_date, cvv, balance, wallet_id) "
+            "VALUES (3, 'N', 'S', '4000000000000001', '01/30', '000', 50, 1)"
+        ))
+        connection.execute(text(
+            "INSERT INTO transfer_history (id, transfer_type, from_user_card_number, from_user, to_user_card_number, to_user, amount, time) VALUES "
+            "(1, 'TRANSFER', '4000000000000001', 'N S', '4999999999999999', 'Deleted Card', 10, '2025-01-01 00:00:00'), "
+            "(2, 'SAVINGS_TOPUP', '4000000000000001', 'N S', NULL, 'Saving Account - goal', 5, '2025-01-02 00:00:00'), "
+            "(3, 'BILL', '4000000000000001', 'N S', NULL, 'Bill - gone', 1, '2025-01-03 00:00:00')"
+        ))
+
+    upgrade(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT from_card_id, to_card_id, counterparty_type, counterparty_id, from_user, to_user_card_number, to_user "
+            "FROM transfer_history ORDER BY id"
+        )).all()
+        rollups = connection.execute(text("SELECT card_id, direction, total FROM spending_rollups ORDER BY transfer_type")).all()
+
+    assert [tuple(row) for row in rows] == [
+        (3, None, None, None, None, "4999999999999999", "Deleted Card"),
+        (3, None, "SAVING_ACCOUNT", 7, None, None, None),
+        (3, None, "BILL", None, None, None, "Bill - gone")
+    ]
+    assert [tuple(row) for row in rollups] == [(3, "out", 1), (3, "out", 5), (3, "out", 10)]
+
+def test_card_directory_is_filled_from_cards(engine):
+    upgrade(engine, target=8)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO wallets (id, user_id) VALUES (4, 9)"))
+        connection.execute(text(
+            "INSERT INTO cards (id, cardholder_name, cardholder_surname, number, expiration_date, cvv, balance, wallet_id) "
+            "VALUES (3, 'N', 'S', '4000000000000001', '01/30', '000', 50, 4)"
+        ))
+
+    upgrade(engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT number, card_id, wallet_id, user_id, holder_name FROM card_directory")).all()
+    assert [tuple(row) for row in rows] == [("4000000000000001", 3, 4, 9, "N S")]
+
+def test_card_last4_is_filled(engine):
+    upgrade(engine, target=9)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO wallets (id, user_id) VALUES (1, 1)"))
+        connection.execute(text(
+            "INSERT INTO cards (cardholder_name, cardholder_surname, number, expiration_date, cvv, balance, wallet_id) "
+            "VALUES ('N', 'S', '4000000000000443', '01/30', '000', 50, 1)"
+        ))
+
+    upgrade(engine)
+
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT last4 FROM cards")) == "0443"
+
+def test_check_schema_refuses_outdated_database(engine):
+    upgrade(engine, target=1)
+
+    with pytest.raises(SchemaOutdatedError):
+        check_schema(engine)
+
+    check_schema(engine, auto_upgrade=True)
+    assert current_version(engine) == load_migrations()[-1].version
+
+def test_backfill_commits_in_chunks(engine):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER)"))
+        connection.execute(text("INSERT INTO items (value) VALUES " + ", ".join(["(NULL)"] * 25)))
+
+    with engine.connect() as connection:
+        assert backfill(connection, "items", "value = id * :factor", "value IS NULL", chunk_size=10, factor=2) == 25
+        assert connection.scalar(text("SELECT count(*) FROM items WHERE value = id * 2")) == 25
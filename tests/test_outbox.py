@@ -0,0 +1,158 @@
+import pytest
+import socket
+from threading import Thread
+from datetime import datetime
+from email import message_from_bytes
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.db.base import Base
+from src.models.outbox import EmailOutbox, OutboxStatus
+from src.api.utils.mail import SMTPConnectionPool, CircuitBreaker, MailCircuitOpenError, InMemoryTransport, FileSpoolTransport, EmailType, queue_email, build_email, seal_context, open_context
+from src.core.config import settings
+from src.api.utils.outbox import OutboxWorkerPool
+
+class MailboxHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+class BrokenSender:
+    def send_message(self, msg):
+        raise ConnectionError("SMTP is down")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = MailboxHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_outbox_delivers_committed_mail(smtp_server, session_factory):
+    controller, mailbox = smtp_server
+
+    with session_factory() as db:
+        queue_email("user@localhost.me", "Login 2FA code", EmailType.TWOFA, db, code="AB12CD34")
+        db.commit()
+        # the code is never stored in plain text
+        assert "AB12CD34" not in db.query(EmailOutbox.context).scalar()
+
+    sender = SMTPConnectionPool(size=2, host=controller.hostname, port=controller.port, starttls=False, username=None)
+    workers = OutboxWorkerPool(workers=2, session_factory=session_factory, sender=sender)
+    assert workers.drain() == 1
+
+    assert len(mailbox.messages) == 1
+    assert mailbox.messages[0].rcpt_tos == ["user@localhost.me"]
+    html = message_from_bytes(mailbox.messages[0].content).get_payload()[0].get_payload(decode=True)
+    assert b"AB12CD34" in html
+
+    with session_factory() as db:
+        entry = db.query(EmailOutbox).one()
+        assert entry.status == OutboxStatus.SENT
+        assert entry.context is None and entry.sent_at is not None
+
+def test_outbox_rolled_back_mail_is_never_sent(smtp_server, session_factory):
+    controller, mailbox = smtp_server
+
+    with session_factory() as db:
+        queue_email("user@localhost.me", "Email Verification", EmailType.REGISTRATION, db, code="AB12CD34")
+        db.rollback()
+
+    sender = SMTPConnectionPool(size=2, host=controller.hostname, port=controller.port, starttls=False, username=None)
+    assert OutboxWorkerPool(session_factory=session_factory, sender=sender).drain() == 0
+    assert mailbox.messages == []
+
+def test_outbox_retries_with_backoff_then_fails(session_factory):
+    with session_factory() as db:
+        queue_email("user@localhost.me", "Password reset", EmailType.PASSWORD_RESET, db, link="http://localhost/reset")
+        db.commit()
+
+    workers = OutboxWorkerPool(session_factory=session_factory, sender=BrokenSender(), max_attempts=2, backoff=0)
+
+    assert workers.process_next()
+    with session_factory() as db:
+        entry = db.query(EmailOutbox).one()
+        assert entry.status == OutboxStatus.PENDING and entry.attempts == 1
+        assert entry.next_attempt_at <= datetime.utcnow()
+
+    assert workers.process_next()
+    assert not workers.process_next()
+    with session_factory() as db:
+        entry = db.query(EmailOutbox).one()
+        assert entry.status == OutboxStatus.FAILED and entry.attempts == 2
+        assert "SMTP is down" in entry.last_error and entry.context is None
+
+    assert workers.stats()["retried"] == 1 and workers.stats()["failed"] == 1
+
+def test_smtp_pool_sends_concurrently_and_reports_metrics(smtp_server):
+    controller, mailbox = smtp_server
+    pool = SMTPConnectionPool(size=3, host=controller.hostname, port=controller.port, starttls=False, username=None)
+    message = build_email("user@localhost.me", "Login 2FA code", EmailType.TWOFA, code="AB12CD34")
+
+    threads = [Thread(target=pool.send_message, args=(message,)) for _ in range(9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert len(mailbox.messages) == 9
+    assert sum(connection["sends"] for connection in stats["connections"]) == 9
+    assert stats["idle"] == 3 and stats["circuit"] == CircuitBreaker.CLOSED
+    pool.close()
+
+def test_smtp_pool_opens_circuit_on_repeated_failures():
+    pool = SMTPConnectionPool(size=1, host="127.0.0.1", port=free_port(), starttls=False, username=None,
+                              breaker=CircuitBreaker(threshold=2, reset_timeout=60))
+    message = build_email("user@localhost.me", "Login 2FA code", EmailType.TWOFA, code="AB12CD34")
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            pool.send_message(message)
+
+    with pytest.raises(MailCircuitOpenError):
+        pool.send_message(message)
+
+    assert pool.stats()["circuit"] == CircuitBreaker.OPEN
+
+def test_outbox_delivers_through_local_transports(session_factory, tmp_path):
+    with session_factory() as db:
+        queue_email("user@localhost.me", "Login 2FA code", EmailType.TWOFA, db, code="AB12CD34")
+        queue_email("user@localhost.me", "Password reset", EmailType.PASSWORD_RESET, db, link="http://localhost/reset")
+        db.commit()
+
+    memory = InMemoryTransport()
+    assert OutboxWorkerPool(session_factory=session_factory, sender=memory).drain() == 2
+    assert [message["Subject"] for message in memory.messages] == ["Login 2FA code", "Password reset"]
+
+    spool = FileSpoolTransport(tmp_path / "spool")
+    spool.send_message(memory.messages[0])
+    assert len(list((tmp_path / "spool").glob("*.eml"))) == 1
+
+def test_outbox_lease_outlasts_slowest_send():
+    workers = OutboxWorkerPool()
+    assert workers.lease_seconds > settings.SMTP_ACQUIRE_TIMEOUT_SECONDS + 2 * settings.SMTP_TIMEOUT_SECONDS
+
+def test_outbox_reads_plain_json_context_queued_before_encryption():
+    assert open_context('{"code": "AB12CD34"}') == {"code": "AB12CD34"}
+    assert open_context(seal_context({"link": "http://localhost/reset"})) == {"link": "http://localhost/reset"}
@@ -0,0 +1,202 @@
+import pytest
+import re
+import asyncio
+import inspect
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from conftest import seed_database, sync_session
+from src.db import queries, async_queries
+from src.models.user import User
+from src.models.cards import Card
+from src.models.savings import Saving_account
+from src.models.credentials import CredentialPurpose
+from src.models.wallet_history import TransactionType
+from src.models.outbox import EmailOutbox
+from src.models.wallet_history import TransferHistory
+from src.models.archive import history_archive_table
+from src.services.history_archive import HistoryArchiveService
+
+# helpers which read a whole table by design
+FULL_SCAN_ALLOWED: set[str] = {"get_all_users", "reset_rollups"}
+
+CARD_NUMBER: str = "4000000000000001"
+USER: User = User(id=1, email="user1@localhost.me")
+CARD: Card = Card(id=1, number=CARD_NUMBER)
+ARCHIVE: str = "transfer_history_2020_01"
+CANDIDATE = SimpleNamespace(email=USER.email, social_security="00000001", phone_number="+220000001")
+
+QUERY_CASES = {
+    "is_user_existing": lambda db: queries.is_user_existing(CANDIDATE, db),
+    "delete_expired_users": lambda db: queries.delete_expired_users(db, datetime.now() - timedelta(days=1), 100),
+    "get_unverified_user": lambda db: queries.get_unverified_user(USER.email, db),
+    "get_user_by_email": lambda db: queries.get_user_by_email(USER.email, db),
+    "get_user_by_id": lambda db: queries.get_user_by_id(USER.id, db),
+    "is_code_valid": lambda db: queries.is_code_valid(USER.email, "AB12CD34", db),
+    "get_wallet": lambda db: queries.get_wallet(USER, db),
+    "get_cards": lambda db: queries.get_cards(USER, db),
+    "get_card_by_id": lambda db: queries.get_card_by_id(USER, CARD.id, db),
+    "get_card_by_number": lambda db: queries.get_card_by_number(USER, CARD_NUMBER, db),
+    "get_saving_accounts": lambda db: queries.get_saving_accounts(USER, db),
+    "get_saving_account_by_id": lambda db: queries.get_saving_account_by_id(USER, 1, db),
+    "get_bill_by_id": lambda db: queries.get_bill_by_id(USER, 1, db),
+    "get_all_users": lambda db: queries.get_all_users(db),
+    "get_credential": lambda db: queries.get_credential(CredentialPurpose.TWOFA, "0" * 64, db, USER.id),
+    "delete_user_credentials": lambda db: queries.delete_user_credentials(USER.id, CredentialPurpose.TWOFA, db),
+    "delete_expired_credentials": lambda db: queries.delete_expired_credentials(db, datetime.now(), 100),
+    "reset_rollups": lambda db: queries.reset_rollups(db),
+    "add_history_range_to_rollups": lambda db: queries.add_history_range_to_rollups(db, 0, 1000),
+    "get_oldest_history_time": lambda db: queries.get_oldest_history_time(db),
+    "get_history_archive": lambda db: queries.get_history_archive(ARCHIVE, db),
+    "get_history_archives": lambda db: queries.get_history_archives(db),
+    "move_history_to_archive": lambda db: queries.move_history_to_archive(
+        history_archive_table(ARCHIVE), datetime(2020, 1, 1), datetime(2020, 2, 1), 100, db
+    ),
+    "add_rows_to_history_archive": lambda db: queries.add_rows_to_history_archive(1, 10, 100, db),
+    "delete_expired_idempotency_records": lambda db: queries.delete_expired_idempotency_records(db, datetime.now(), 100),
+    "acquire_scheduler_lease": lambda db: queries.acquire_scheduler_lease(db, "scheduler", "owner", datetime.now(), datetime.now() + timedelta(seconds=30)),
+    "release_scheduler_lease": lambda db: queries.release_scheduler_lease(db, "scheduler", "owner"),
+}
+
+async def drain(iterator) -> None:
+    async for _ in iterator:
+        pass
+
+ASYNC_QUERY_CASES = {
+    "get_user_by_email": lambda db: async_queries.get_user_by_email(USER.email, db),
+    "get_card_by_last4": lambda db: async_queries.get_card_by_last4(USER, CARD_NUMBER[-4:], db),
+    "reserve_card_accounts": lambda db: async_queries.reserve_card_accounts("400000", 10, db),
+    "insert_cards": lambda db: async_queries.insert_cards([{"wallet_id": 1, "cardholder_name": "Plan", "cardholder_surname": "User",
+                                                            "number": "4000000000000002", "last4": "0002", "expiration_date": "01/30", "cvv": "000", "balance": 0}], db),
+    "insert_card_directory_entries": lambda db: async_queries.insert_card_directory_entries([{"number": "4000000000000002", "card_id": 2, "wallet_id": 1,
+                                                                                              "user_id": USER.id, "holder_name": "Plan User"}], db),
+    "get_card_directory_entries": lambda db: async_queries.get_card_directory_entries([CARD_NUMBER, "4000000000000002"], db),
+    "get_wallet": lambda db: async_queries.get_wallet(USER, db),
+    "get_cards": lambda db: async_queries.get_cards(USER, db),
+    "get_card_by_id": lambda db: async_queries.get_card_by_id(USER, CARD.id, db),
+    "get_card_by_number": lambda db: async_queries.get_card_by_number(USER, CARD_NUMBER, db),
+    "get_history_archives": lambda db: async_queries.get_history_archives(db, datetime(2019, 1, 1), datetime.now()),
+    # reaches back into the archive
+    "get_card_transfer_history_page": lambda db: async_queries.get_card_transfer_history_page(
+        CARD, db, 50, after=(datetime.now(), 10), transfer_types=[TransactionType.TRANSFER],
+        date_from=datetime(2019, 1, 1), amount_min=1
+    ),
+    "get_transfer_history_rows": lambda db: async_queries.get_transfer_history_rows([1, 2, 3], db),
+    "stream_card_transfer_history": lambda db: drain(async_queries.stream_card_transfer_history(
+        CARD.id, db, 100, date_from=datetime(2019, 1, 1)
+    )),
+    "detach_card_history": lambda db: async_queries.detach_card_history(CARD, db),
+    "detach_saving_account_history": lambda db: async_queries.detach_saving_account_history(Saving_account(id=1, name="goal"), db),
+    "get_saving_accounts": lambda db: async_queries.get_saving_accounts(USER, db),
+    "get_saving_account_by_id": lambda db: async_queries.get_saving_account_by_id(USER, 1, db),
+    "get_bill_by_id": lambda db: async_queries.get_bill_by_id(USER, 1, db),
+    "get_bills": lambda db: async_queries.get_bills(USER, db),
+    "debit_card": lambda db: async_queries.debit_card(1, db, number=CARD_NUMBER, owner=USER),
+    "credit_card": lambda db: async_queries.credit_card(1, db, card_id=CARD.id, owner=USER),
+    "get_cards_by_numbers": lambda db: async_queries.get_cards_by_numbers([CARD_NUMBER, "4000000000000002"], db),
+    "apply_card_deltas": lambda db: async_queries.apply_card_deltas({CARD.id: -1, 2: 1}, db),
+    "insert_transfer_history": lambda db: async_queries.insert_transfer_history([
+        {"transfer_type": TransactionType.TRANSFER, "from_card_id": CARD.id, "to_card_id": 2, "amount": 1, "time": datetime.now()}
+    ], db),
+    "debit_saving_account": lambda db: async_queries.debit_saving_account(USER, 1, 1, db),
+    "credit_saving_account": lambda db: async_queries.credit_saving_account(USER, 1, 1, db),
+    "mark_bill_paid": lambda db: async_queries.mark_bill_paid(USER, 1, db),
+    "set_bill_autopay": lambda db: async_queries.set_bill_autopay(USER, 1, CARD.id, db),
+    "detach_card_autopay": lambda db: async_queries.detach_card_autopay(CARD.id, db),
+    "get_due_autopay_bills": lambda db: async_queries.get_due_autopay_bills(datetime.now(), db, 100, after=(datetime(2020, 1, 1), 1)),
+    "get_card_balances": lambda db: async_queries.get_card_balances([1, 2], db),
+    "claim_bills": lambda db: async_queries.claim_bills([1, 2], db),
+    "add_to_rollups": lambda db: async_queries.add_to_rollups([{
+        "card_id": CARD.id, "month": "2026-01", "transfer_type": TransactionType.BILL, "direction": "out", "total": 1, "count": 1
+    }], db),
+    "get_rollups": lambda db: async_queries.get_rollups(CARD.id, db, "2025-01", "2026-01"),
+    "delete_rollups": lambda db: async_queries.delete_rollups(CARD.id, db),
+    "get_idempotency_record": lambda db: async_queries.get_idempotency_record(USER.id, "key", db),
+    "delete_idempotency_record": lambda db: async_queries.delete_idempotency_record(USER.id, "key", db),
+}
+
+# "SCAN cards" is a full table scan, "SCAN cards USING INDEX ..." walks an index in order
+TABLE_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)$")
+
+def helpers(module) -> set[str]:
+    return {
+        name for name, function in inspect.getmembers(module, inspect.isfunction)
+        if function.__module__ == module.__name__ and not name.startswith("_")
+    }
+
+def table_scans(database, statements: list[tuple[str, tuple]]) -> list[str]:
+    engine = create_engine(f"sqlite:///{database}")
+    scans = []
+
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                if TABLE_SCAN.match(row[-1]):
+                    scans.append(f"{row[-1]} in: {statement}")
+
+    engine.dispose()
+    return scans
+
+def capture(engine) -> list[tuple[str, tuple]]:
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    return statements
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = seed_database(tmp_path_factory.mktemp("plans") / "plans.db", cards=[{"id": CARD.id, "number": CARD_NUMBER}], rows=[
+        TransferHistory(transfer_type=TransactionType.TRANSFER, from_card_id=CARD.id, amount=1, time=time)
+        for time in (datetime(2020, 1, 15), datetime.now())
+    ])
+
+    with sync_session(path) as db:
+        HistoryArchiveService.archive(db)
+
+    return path
+
+def test_every_query_helper_is_covered():
+    assert helpers(queries) == set(QUERY_CASES)
+    assert helpers(async_queries) == set(ASYNC_QUERY_CASES)
+
+@pytest.mark.parametrize("name", QUERY_CASES)
+def test_query_helper_uses_indexes(name, database):
+    engine = create_engine(f"sqlite:///{database}")
+    statements = capture(engine)
+
+    with sessionmaker(bind=engine)() as db:
+        QUERY_CASES[name](db)
+        db.rollback()
+
+    engine.dispose()
+
+    assert statements
+    if name not in FULL_SCAN_ALLOWED:
+        assert table_scans(database, statements) == []
+
+@pytest.mark.parametrize("name", ASYNC_QUERY_CASES)
+def test_async_query_helper_uses_indexes(name, database):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    statements = capture(engine.sync_engine)
+
+    async def run():
+        async with async_sessionmaker(engine)() as db:
+            await ASYNC_QUERY_CASES[name](db)
+            await db.rollback()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+    assert statements
+    assert table_scans(database, statements) == []
+
+def test_table_scan_detection(database):
+    assert table_scans(database, [(f"SELECT * FROM {EmailOutbox.__tablename__} WHERE recipient = ?", ("a",))])
+    assert not table_scans(database, [("SELECT * FROM users WHERE email = ?", ("a",))])
@@ -0,0 +1,70 @@
+import pytest
+from types import SimpleNamespace
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import sync_session, run_async
+from src.models.user import User
+from src.models.savings import Saving_account
+from src.models.wallet_history import TransferHistory, TransactionType
+from src.models.rollups import SpendingRollup
+from src.schemas.cards import TransferRequest, CardSummaryRequest
+from src.services.cards import CardsService
+from src.services.savings import SavingsService
+from src.services.rollups import RollupsService
+
+CARD_NUMBER: str = "4000000000000001"
+OTHER_CARD: str = "4000000000000002"
+
+@pytest.fixture
+def database(seeded_database):
+    return seeded_database(
+        cards=[{"id": 1, "number": CARD_NUMBER, "balance": 1000}, {"id": 2, "number": OTHER_CARD, "balance": 1000}],
+        rows=[
+            Saving_account(id=1, name="goal", goal=10 ** 6, balance=0, wallet_id=1),
+            # history older than the live path, only a rebuild knows about it
+            TransferHistory(transfer_type=TransactionType.TRANSFER, from_card_id=2, to_card_id=1,
+                            amount=40, time=datetime(2024, 12, 31))
+        ]
+    )
+
+def rollups(path) -> set[tuple]:
+    with sync_session(path) as db:
+        return set(db.execute(select(
+            SpendingRollup.card_id, SpendingRollup.month, SpendingRollup.transfer_type,
+            SpendingRollup.direction, SpendingRollup.total, SpendingRollup.count
+        )).all())
+
+def rebuild(path, chunk_size: int) -> None:
+    with sync_session(path) as db:
+        RollupsService.rebuild(db, chunk_size=chunk_size)
+
+def test_live_rollups_match_rebuild_and_summary(database):
+    user = User(id=1)
+
+    async def operations(SessionLocal):
+        for amount in (10, 20, 30):
+            async with SessionLocal() as db:
+                request = TransferRequest(from_card_number=CARD_NUMBER, to_card_number=OTHER_CARD, amount=amount)
+                await CardsService.transfer_money_logic(request, user, db)
+        async with SessionLocal() as db:
+            await SavingsService.add_funds(SimpleNamespace(amount=5, saving_account_id=1, card_id=1), user, db)
+        async with SessionLocal() as db:
+            return await RollupsService.summary(CardSummaryRequest(card_number=CARD_NUMBER), user, db)
+
+    summary = run_async(database, operations)
+
+    month = datetime.now().strftime("%Y-%m")
+    assert summary["months"][0] == {"month": month, "spent": {"TRANSFER": 60, "SAVINGS_TOPUP": 5}, "received": {}}
+    assert [row["month"] for row in summary["months"]] == [month]
+
+    live = rollups(database)
+    rebuild(database, chunk_size=2)
+    rebuilt = rollups(database)
+
+    assert live <= rebuilt
+    assert rebuilt - live == {
+        (2, "2024-12", TransactionType.TRANSFER, "out", 40, 1),
+        (1, "2024-12", TransactionType.TRANSFER, "in", 40, 1)
+    }
@@ -0,0 +1,90 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select, func, update
+from sqlalchemy.orm import sessionmaker
+
+from src.db.base import Base
+from src.models.user import UnverifiedUser
+from src.models.scheduler import SchedulerLease
+from src.services.user import UserService
+from src.api.utils.scheduler import Scheduler
+
+@pytest.fixture
+def SessionLocal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_unverified_users_are_removed_in_chunks(SessionLocal):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with SessionLocal() as db:
+        for index in range(25):
+            db.add(UnverifiedUser(email=f"user{index}@localhost.me", phone_number=f"+22{index:07}", social_security=f"{index:08}",
+                                  code="000000", created_at=now - timedelta(hours=30 if index < 20 else 1)))
+        db.commit()
+
+        assert UserService.sweep_unverified(db, chunk_size=6) == 20
+        assert UserService.sweep_unverified(db, chunk_size=6) == 0
+        assert db.scalar(select(func.count(UnverifiedUser.id))) == 5
+
+def test_only_the_leader_runs_jobs(SessionLocal):
+    runs: list[str] = []
+
+    def scheduler(name: str, fail: bool = False) -> Scheduler:
+        instance = Scheduler(session_factory=SessionLocal, tick=0.01, lease_seconds=30, jitter=0.5)
+
+        def job():
+            runs.append(name)
+            if fail:
+                raise RuntimeError("job failed")
+            return len(runs)
+
+        instance.add_job("job", 0.05, job)
+        return instance
+
+    first, second = scheduler("first", fail=True), scheduler("second")
+
+    async def main():
+        first.start()
+        await asyncio.sleep(0.1)
+        second.start()
+        await asyncio.sleep(0.4)
+        assert set(runs) == {"first"}
+
+        # the leader leaves cleanly, the other worker takes over on its next tick
+        await first.stop()
+        runs.clear()
+        await asyncio.sleep(0.3)
+        await second.stop()
+
+    asyncio.run(main())
+
+    assert first.jobs["job"].runs > 1 and first.jobs["job"].failures == first.jobs["job"].runs
+    assert first.jobs["job"].last_error == "job failed"
+    assert second.jobs["job"].runs > 0 and set(runs) == {"second"}
+    assert second.stats()["jobs"]["job"]["last_result"] is not None
+
+def test_expired_lease_is_taken_over(SessionLocal):
+    crashed = Scheduler(session_factory=SessionLocal, lease_seconds=30)
+    standby = Scheduler(session_factory=SessionLocal, lease_seconds=30)
+
+    async def main():
+        await crashed.tick()
+        await standby.tick()
+        leaders = (crashed.is_leader, standby.is_leader)
+
+        with SessionLocal() as db:
+            db.execute(update(SchedulerLease).values(expires_at=datetime(2000, 1, 1)))
+            db.commit()
+
+        await standby.tick()
+        return leaders
+
+    assert asyncio.run(main()) == (True, False)
+    assert standby.is_leader
+
+    with SessionLocal() as db:
+        assert db.scalar(select(SchedulerLease.owner)) == standby.owner
@@ -0,0 +1,58 @@
+import pytest
+from json import loads
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+
+from conftest import run_async
+from src.api.utils.serialization import ResponseEncoder
+from src.api.routes.bills import get_user_bills
+from src.api.routes.savings import get_saving_accounts
+from src.schemas.cards import HistoryPage
+from src.schemas.bills import BillOut
+from src.models.user import User
+from src.models.bills import Bills
+from src.models.savings import Saving_account
+
+PAGE: dict = {
+    "history": [
+        {"direction": "out", "from": "N S", "from_card_number": "4000000000000001", "to": None, "to_card_number": "4000000000000002",
+         "transfer_type": "TRANSFER", "amount": 10.5, "time": "2025-01-01T00:00:00.000123"},
+        {"direction": "in", "from": None, "from_card_number": None, "to": "Ž S", "to_card_number": None,
+         "transfer_type": "BILL", "amount": 1e-05, "time": "2025-01-02T00:00:00"}
+    ],
+    "next_cursor": None
+}
+
+def test_encoding_matches_default_response():
+    page = ResponseEncoder(HistoryPage)
+    response = page.response(PAGE)
+
+    assert response.media_type == "application/json"
+    assert loads(page.encode(PAGE)) == loads(response.body) == jsonable_encoder(PAGE)
+
+    bills = ResponseEncoder(list[BillOut])
+    rows = [{"id": 1, "name": "rent", "amount": 40, "due_date": datetime(2025, 3, 1, 12, 30), "paid": False}]
+    assert loads(bills.encode(rows)) == jsonable_encoder([BillOut(**row) for row in rows])
+
+def test_encoding_rejects_rows_not_matching_the_model():
+    with pytest.raises(ValidationError):
+        ResponseEncoder(list[BillOut]).encode([{"id": 1, "name": "rent"}])
+
+def test_list_routes_encode_rows(seeded_database):
+    database = seeded_database(cards=[{"id": 1, "number": "4000000000000001", "balance": 50}], rows=[
+        Bills(id=1, name="rent", amount=40, due_date=datetime(2025, 3, 1), wallet_id=1, autopay_card_id=1),
+        Saving_account(id=1, name="goal", balance=25, goal=100, wallet_id=1)
+    ])
+
+    async def main(SessionLocal):
+        async with SessionLocal() as db:
+            return await get_user_bills(User(id=1), db), await get_saving_accounts(User(id=1), db)
+
+    bills, savings = run_async(database, main)
+
+    assert loads(bills.body) == [
+        {"id": 1, "name": "rent", "amount": 40.0, "due_date": "2025-03-01T00:00:00", "paid": False, "autopay_card_id": 1}
+    ]
+    assert loads(savings.body) == [{"id": 1, "name": "goal", "balance": 25.0, "goal": 100.0, "remain": 75.0}]
@@ -7,6 +7,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from sqlalchemy.orm import Session as ORM
 import random
 import string
+from datetime import timedelta
 
 from src.core.config import settings
 from src.core.traceback import traceBack
@@ -17,6 +18,8 @@ from src.models.wallet_history import TransferHistory
 from src.models.bills import Bills
 from src.models.cards import Card
 from src.models.savings import Saving_account 
+from src.models.credentials import CredentialToken, CredentialPurpose
+from src.services.credentials import CredentialService
 
 def change_balance(card_id: int, balance: int, db: ORM):
     card: Card = db.query(Card).filter(Card.id == card_id).first()
@@ -57,15 +60,29 @@ def get_verification_code(email: str, db: ORM):
     assert user and user.code, "No code found"
     return user.code
 
-def get_reset_token(email: str, db: ORM):
+def reissue_credential(email: str, purpose: CredentialPurpose, db: ORM):
+    """
+    Credentials are stored hashed, so the one sent by mail cannot be read back.
+    Checks that the server issued one and replaces it with a known token.
+    """
+    db.expire_all()
     user = db.query(User).filter(User.email == email).first()
-    assert user and user.reset_token, "No reset token found"
-    return user.reset_token
+    assert user, "User not found"
+
+    issued = db.query(CredentialToken).filter(CredentialToken.user_id == user.id, CredentialToken.purpose == purpose).first()
+    assert issued, f"No {purpose.name} credential found"
+
+    token = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    CredentialService.issue(user.id, purpose, token, timedelta(minutes=5), db)
+    db.commit()
+
+    return token
+
+def get_reset_token(email: str, db: ORM):
+    return reissue_credential(email, CredentialPurpose.PASSWORD_RESET, db)
 
 def get_2fa_code(email: str, db: ORM):
-    user = db.query(User).filter(User.email == email).first()
-    assert user and user.last_2fa_code, "No 2FA code found"
-    return user.last_2fa_code
+    return reissue_credential(email, CredentialPurpose.TWOFA, db)
 
 def clean_test_user(user_data: dict, db: ORM):
     print()